@@ -0,0 +1,36 @@
+"""create file_search_gram table
+
+Revision ID: 3f1c9a7e52d4
+Revises: ddbdad262a65
+Create Date: 2025-12-15 10:30:12.418305
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from remarkable.common.migrate_util import create_timestamp_field
+
+# revision identifiers, used by Alembic.
+revision = "3f1c9a7e52d4"
+down_revision = "ddbdad262a65"
+branch_labels = None
+depends_on = None
+
+table_name = "file_search_gram"
+
+
+def upgrade():
+    op.create_table(
+        table_name,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("file_hash", sa.String(64), nullable=False),
+        sa.Column("gram", sa.String(8), nullable=False),
+        sa.Column("tf", sa.Integer, nullable=False),
+        create_timestamp_field("created_utc", sa.Integer, server_default=sa.text("extract(epoch from now())::int")),
+    )
+    op.create_index(f"idx_{table_name}_gram_file_hash", table_name, ["gram", "file_hash"], unique=True)
+    op.create_index(f"idx_{table_name}_file_hash", table_name, ["file_hash"])
+
+
+def downgrade():
+    op.drop_table(table_name)
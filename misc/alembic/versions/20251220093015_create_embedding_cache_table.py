@@ -0,0 +1,40 @@
+"""create embedding_cache table
+
+Revision ID: 8b2e4d17c0a9
+Revises: 3f1c9a7e52d4
+Create Date: 2025-12-20 09:30:15.204718
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from pgvector.sqlalchemy.vector import VECTOR
+
+from remarkable.common.migrate_util import create_timestamp_field
+from remarkable.config import get_config
+
+# revision identifiers, used by Alembic.
+revision = "8b2e4d17c0a9"
+down_revision = "3f1c9a7e52d4"
+branch_labels = None
+depends_on = None
+
+table_name = "embedding_cache"
+
+
+def upgrade():
+    if get_config("client.name") != "scriber":
+        return
+    op.execute("create extension if not exists vector;")
+    op.create_table(
+        table_name,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("model", sa.String(255), nullable=False),
+        sa.Column("text_hash", sa.String(64), nullable=False),
+        sa.Column("embedding", VECTOR),
+        create_timestamp_field("created_utc", sa.Integer, server_default=sa.text("extract(epoch from now())::int")),
+    )
+    op.create_index(f"idx_{table_name}_model_text_hash", table_name, ["model", "text_hash"], unique=True)
+
+
+def downgrade():
+    op.execute(f"drop table if exists {table_name}")
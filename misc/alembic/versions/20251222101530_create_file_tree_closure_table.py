@@ -0,0 +1,172 @@
+"""create file_tree_closure table
+
+Revision ID: 5d9a3c61e2f8
+Revises: 8b2e4d17c0a9
+Create Date: 2025-12-22 10:15:30.527143
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from remarkable.db import IS_MYSQL
+
+# revision identifiers, used by Alembic.
+revision = "5d9a3c61e2f8"
+down_revision = "8b2e4d17c0a9"
+branch_labels = None
+depends_on = None
+
+table_name = "file_tree_closure"
+
+
+def upgrade():
+    op.create_table(
+        table_name,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("ancestor_id", sa.Integer, nullable=False),
+        sa.Column("descendant_id", sa.Integer, nullable=False),
+        sa.Column("depth", sa.Integer, nullable=False),
+    )
+    op.create_index(f"idx_{table_name}_ancestor_descendant", table_name, ["ancestor_id", "descendant_id"], unique=True)
+    op.create_index(f"idx_{table_name}_descendant_depth", table_name, ["descendant_id", "depth"])
+
+    if IS_MYSQL:
+        create_mysql_triggers()
+    else:
+        create_postgresql_triggers()
+
+    # 已有目录
+    closure_cte = """
+WITH RECURSIVE closure (ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM file_tree
+    UNION ALL
+    SELECT t.ptree_id, closure.descendant_id, closure.depth + 1
+    FROM closure JOIN file_tree t ON t.id = closure.ancestor_id
+    WHERE t.ptree_id IN (SELECT id FROM file_tree)
+)"""
+    if IS_MYSQL:
+        op.execute(f"""
+INSERT INTO file_tree_closure (ancestor_id, descendant_id, depth)
+{closure_cte}
+SELECT ancestor_id, descendant_id, depth FROM closure;
+""")
+    else:
+        op.execute(f"""
+{closure_cte}
+INSERT INTO file_tree_closure (ancestor_id, descendant_id, depth)
+SELECT ancestor_id, descendant_id, depth FROM closure;
+""")
+
+
+def create_postgresql_triggers():
+    # 新建目录: 自身一条, 再继承父目录的所有上级
+    op.execute("""
+CREATE OR REPLACE FUNCTION file_tree_closure_insert() RETURNS TRIGGER AS $BODY$
+BEGIN
+    INSERT INTO file_tree_closure (ancestor_id, descendant_id, depth)
+    SELECT NEW.id, NEW.id, 0
+    UNION ALL
+    SELECT ancestor_id, NEW.id, depth + 1 FROM file_tree_closure WHERE descendant_id = NEW.ptree_id;
+    RETURN NULL;
+END;
+$BODY$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS file_tree_closure_insert ON file_tree;
+CREATE TRIGGER file_tree_closure_insert
+    AFTER INSERT
+    ON file_tree
+    FOR EACH ROW
+EXECUTE PROCEDURE file_tree_closure_insert();
+""")
+    # 移动目录: 断开整棵子树与原上级的关系, 再连到新的上级
+    op.execute("""
+CREATE OR REPLACE FUNCTION file_tree_closure_move() RETURNS TRIGGER AS $BODY$
+BEGIN
+    DELETE FROM file_tree_closure
+    WHERE descendant_id IN (SELECT descendant_id FROM file_tree_closure WHERE ancestor_id = NEW.id)
+      AND ancestor_id IN (SELECT ancestor_id FROM file_tree_closure WHERE descendant_id = NEW.id AND depth > 0);
+
+    INSERT INTO file_tree_closure (ancestor_id, descendant_id, depth)
+    SELECT p.ancestor_id, c.descendant_id, p.depth + c.depth + 1
+    FROM file_tree_closure p CROSS JOIN file_tree_closure c
+    WHERE p.descendant_id = NEW.ptree_id AND c.ancestor_id = NEW.id;
+    RETURN NULL;
+END;
+$BODY$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS file_tree_closure_move ON file_tree;
+CREATE TRIGGER file_tree_closure_move
+    AFTER UPDATE OF ptree_id
+    ON file_tree
+    FOR EACH ROW
+    WHEN (OLD.ptree_id IS DISTINCT FROM NEW.ptree_id)
+EXECUTE PROCEDURE file_tree_closure_move();
+""")
+    # 物理删除目录(软删除只修改 deleted_utc, 查询时过滤)
+    op.execute("""
+CREATE OR REPLACE FUNCTION file_tree_closure_delete() RETURNS TRIGGER AS $BODY$
+BEGIN
+    DELETE FROM file_tree_closure WHERE descendant_id = OLD.id OR ancestor_id = OLD.id;
+    RETURN NULL;
+END;
+$BODY$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS file_tree_closure_delete ON file_tree;
+CREATE TRIGGER file_tree_closure_delete
+    AFTER DELETE
+    ON file_tree
+    FOR EACH ROW
+EXECUTE PROCEDURE file_tree_closure_delete();
+""")
+
+
+def create_mysql_triggers():
+    # 新建目录: 自身一条, 再继承父目录的所有上级
+    op.execute("""
+CREATE TRIGGER file_tree_closure_insert
+    AFTER INSERT
+    ON file_tree
+    FOR EACH ROW
+    INSERT INTO file_tree_closure (ancestor_id, descendant_id, depth)
+    SELECT NEW.id, NEW.id, 0
+    UNION ALL
+    SELECT ancestor_id, NEW.id, depth + 1 FROM file_tree_closure WHERE descendant_id = NEW.ptree_id;
+""")
+    # 移动目录: MySQL 不能在 DELETE 的子查询中直接读同一张表, 用 DISTINCT 派生表强制物化
+    op.execute("""
+CREATE TRIGGER file_tree_closure_move
+    AFTER UPDATE
+    ON file_tree
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.ptree_id <=> NEW.ptree_id) THEN
+        DELETE c FROM file_tree_closure c
+        JOIN (SELECT DISTINCT descendant_id FROM file_tree_closure WHERE ancestor_id = NEW.id) d
+            ON c.descendant_id = d.descendant_id
+        JOIN (SELECT DISTINCT ancestor_id FROM file_tree_closure WHERE descendant_id = NEW.id AND depth > 0) a
+            ON c.ancestor_id = a.ancestor_id;
+
+        INSERT INTO file_tree_closure (ancestor_id, descendant_id, depth)
+        SELECT p.ancestor_id, c.descendant_id, p.depth + c.depth + 1
+        FROM file_tree_closure p CROSS JOIN file_tree_closure c
+        WHERE p.descendant_id = NEW.ptree_id AND c.ancestor_id = NEW.id;
+    END IF;
+END
+""")
+    op.execute("""
+CREATE TRIGGER file_tree_closure_delete
+    AFTER DELETE
+    ON file_tree
+    FOR EACH ROW
+    DELETE FROM file_tree_closure WHERE descendant_id = OLD.id OR ancestor_id = OLD.id;
+""")
+
+
+def downgrade():
+    for name in ("file_tree_closure_insert", "file_tree_closure_move", "file_tree_closure_delete"):
+        if IS_MYSQL:
+            op.execute(f"DROP TRIGGER IF EXISTS {name};")
+        else:
+            op.execute(f"DROP TRIGGER IF EXISTS {name} ON file_tree;")
+            op.execute(f"DROP FUNCTION IF EXISTS {name}();")
+    op.drop_table(table_name)
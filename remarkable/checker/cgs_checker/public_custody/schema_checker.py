@@ -361,11 +361,13 @@ class CustodyFundCataloguePageNumberChecker(PublicCustodySchemaChecker):
             return self.result
 
         catalog_paragraph_dict = {}
-        for paragraph in paragraphs:
-            paragraph_text = clean_txt(paragraph["text"])
-            if P_LANDLINE_NUMBER.nexts(paragraph_text):
+        paragraph_texts = [clean_txt(paragraph["text"]) for paragraph in paragraphs]
+        for paragraph, landline, match in zip(
+            paragraphs, P_LANDLINE_NUMBER.nexts_batch(paragraph_texts), P_CATALOG_TITLE.nexts_batch(paragraph_texts)
+        ):
+            if landline:
                 continue
-            if match := P_CATALOG_TITLE.nexts(paragraph_text):
+            if match:
                 if no := match.group("no"):
                     catalog_paragraph_dict[clean_txt(match.group("content"))] = {
                         "no": int(no),
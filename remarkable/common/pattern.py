@@ -9,14 +9,116 @@ from attrs import define, field
 
 from remarkable.common.protocol import SearchPatternLike
 
+try:
+    from re import _parser
+except ImportError:  # re._parser 是私有模块, 取不到时不做字面量预筛
+    _parser = None
+
 RE_TYPE = re.Pattern
 
 
+def _required_literals(items, ignore_case=False) -> tuple[str, ...] | None:
+    """
+    从正则的语法树中找出匹配时必须出现的字面量: 返回的字符串中至少有一个会出现在任何匹配到的文本里,
+    无法确定时返回 None. 取最长的连续字面量, 分支取各分支字面量的并集
+    """
+    best, run = None, []
+
+    def _better(candidate):
+        nonlocal best
+        if candidate and all(candidate) and (best is None or min(map(len, candidate)) > min(map(len, best))):
+            best = candidate
+
+    for op, av in items:
+        if op is _parser.LITERAL and not ignore_case:
+            run.append(chr(av))
+            continue
+        _better(("".join(run),) if run else None)
+        run = []
+        if op is _parser.SUBPATTERN:
+            _, add_flags, del_flags, sub_items = av
+            sub_ignore_case = (ignore_case or add_flags & re.IGNORECASE) and not del_flags & re.IGNORECASE
+            _better(_required_literals(sub_items, sub_ignore_case))
+        elif op in (_parser.MAX_REPEAT, _parser.MIN_REPEAT, _parser.POSSESSIVE_REPEAT) and av[0] >= 1:
+            _better(_required_literals(av[2], ignore_case))
+        elif op is _parser.BRANCH:
+            branches = [_required_literals(branch, ignore_case) for branch in av[1]]
+            if all(branches):
+                _better(tuple({literal for branch in branches for literal in branch}))
+    _better(("".join(run),) if run else None)
+    return best
+
+
+def required_literals(pattern: Pattern) -> tuple[str, ...] | None:
+    if _parser is None or not isinstance(pattern.pattern, str):
+        return None
+    # 依赖私有的 re._parser, 语法树结构变化等任何异常都退化为不预筛, 不影响匹配结果
+    try:
+        parsed = _parser.parse(pattern.pattern, pattern.flags)
+        return _required_literals(parsed.data, bool(parsed.state.flags & re.IGNORECASE))
+    except Exception:
+        return None
+
+
+class CombinedPattern:
+    """
+    PatternCollection 的组合模式, 编译时为每个正则提取必须出现的字面量(required_literals),
+    匹配时先用字符串查找排除不可能命中的正则, 剩下的按原顺序逐个匹配, 结果与逐个匹配一致.
+
+    标准库 re 没有多模式自动机, 把多个正则拼成一个分支正则会失去各自的字面量前缀优化, 实测比逐个匹配更慢, 故不采用.
+    """
+
+    def __init__(self, pattern_objects: list[Pattern]):
+        self.pattern_objects = pattern_objects
+        self.literals = [required_literals(pattern) for pattern in pattern_objects]
+
+    def candidates(self, text, pairs=None) -> Iterable[Pattern]:
+        for pattern, literals in zip(self.pattern_objects, self.literals) if pairs is None else pairs:
+            if literals is None or any(literal in text for literal in literals):
+                yield pattern
+
+    def nexts_batch(self, texts: list[str]) -> list[Match | None]:
+        """先在整篇文本上一次排除全文都不可能命中的正则, 再对每段文本在剩下的正则里取第一个匹配"""
+        joined = "\n".join(texts)
+        pairs = [
+            (pattern, literals)
+            for pattern, literals in zip(self.pattern_objects, self.literals)
+            if literals is None or any(literal in joined for literal in literals)
+        ]
+        return [
+            next(filter(None, (pattern.search(text) for pattern in self.candidates(text, pairs))), None)
+            if text
+            else None
+            for text in texts
+        ]
+
+    def search(self, text) -> Iterable[Match]:
+        for pattern in self.candidates(text):
+            if match := pattern.search(text):
+                yield match
+
+    def match(self, text) -> Iterable[Match]:
+        for pattern in self.candidates(text):
+            if match := pattern.match(text):
+                yield match
+
+    def finditer(self, text) -> Iterable[Match]:
+        for pattern in self.candidates(text):
+            yield from pattern.finditer(text)
+
+
 @define(slots=True, eq=False)
 class PatternCollection:
+    """
+    combine=True 时启用组合模式(CombinedPattern), 适合正则较多且需要对大量文本(如整篇文档的元素块)做匹配的场景,
+    search/nexts/match/finditer 的结果与逐个匹配一致
+    """
+
     patterns: None | str | list[str | Pattern] = field(default=None)
     flags: int = field(default=0)
     _pattern_objects: list[Pattern] = field(default=None)
+    combine: bool = field(default=False, kw_only=True)
+    _combined: CombinedPattern | None = field(default=None, init=False)
 
     def __bool__(self):
         return bool(self.patterns)
@@ -27,6 +129,12 @@ class PatternCollection:
             self._pattern_objects = self._compile(self.patterns, self.flags)
         return self._pattern_objects
 
+    @property
+    def combined(self) -> CombinedPattern | None:
+        if self.combine and self._combined is None:
+            self._combined = CombinedPattern(self.pattern_objects)
+        return self._combined
+
     @classmethod
     def _compile(cls, patterns, flags=0) -> list[Pattern]:
         pattern_list = []
@@ -42,6 +150,9 @@ class PatternCollection:
         return pattern_list
 
     def search(self, text):
+        if self.combined:
+            yield from self.combined.search(text)
+            return
         for pattern in self.pattern_objects:
             match = pattern.search(text)
             if match:
@@ -51,18 +162,39 @@ class PatternCollection:
         return next(self.search(text), None)
 
     def match(self, text):
+        if self.combined:
+            yield from self.combined.match(text)
+            return
         for pattern in self.pattern_objects:
             match = pattern.match(text)
             if match:
                 yield match
 
     def finditer(self, text):
+        if self.combined:
+            yield from self.combined.finditer(text)
+            return
         for pattern in self.pattern_objects:
             match = pattern.finditer(text)
             for item in match:
                 if item:
                     yield item
 
+    def nexts_batch(self, texts: Iterable[str]) -> list[Match | None]:
+        """对一批文本(如整篇文档的元素块)逐个取 nexts, 结果与 texts 一一对应; 组合模式下整批只做一次字面量预筛"""
+        texts = list(texts)
+        if self.combined:
+            return self.combined.nexts_batch(texts)
+        return [self.nexts(text) if text else None for text in texts]
+
+    def scan_elements(
+        self, elements: Iterable[dict], text_func: Callable[[dict], str] | None = None
+    ) -> dict[int, Match]:
+        """扫描整篇文档的元素块, 返回 {元素块 index: 第一个匹配}, 只包含命中的元素块"""
+        elements = list(elements)
+        texts = [text_func(elt) if text_func else elt.get("text", "") for elt in elements]
+        return {elt["index"]: match for elt, match in zip(elements, self.nexts_batch(texts)) if match}
+
     def sub(self, repl, text):
         for pattern in self.pattern_objects:
             text = pattern.sub(repl, text)
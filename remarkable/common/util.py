@@ -277,23 +277,30 @@ def md5(_str):
     return _md5.hexdigest()
 
 
-@functools.lru_cache(1000)
+P_SPACES = re.compile(r"\s+")
+P_EN_LINE_BREAKS = re.compile(r"[\r\t\f\v\n]+")
+P_MULTI_SPACES = re.compile(r"\s{2,}")
+P_CN_CHARS = re.compile(r"[\u4e00-\u9fa5]")
+
+
+# 文档中的段落/单元格文本优先用 PdfinsightReader.normalize, 按文档缓存且不受缓存容量限制
+@functools.lru_cache(8192)
 def clean_txt(text, language=None, remove_cn_text=False, lstrip=False):
     if not language:
         language = get_config("client.content_language") or "zh_CN"
     if language == Language.ZH_CN.value:
-        text = re.sub(r"\s+", "", text)
+        text = P_SPACES.sub("", text)
     elif language == Language.EN_US.value:
         # 英文内容换行需要用空格链接,且不能去空格
-        text = re.sub(r"[\r\t\f\v\n]+", " ", text)
-        text = re.sub(r"\s{2,}", " ", text)
+        text = P_EN_LINE_BREAKS.sub(" ", text)
+        text = P_MULTI_SPACES.sub(" ", text)
         if lstrip:
             text = text.lstrip()
         else:
             text = text.strip()
 
     if remove_cn_text:
-        text = re.sub(r"[\u4e00-\u9fa5]", "", text)
+        text = P_CN_CHARS.sub("", text)
     return text
 
 
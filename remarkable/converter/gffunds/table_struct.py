@@ -235,8 +235,13 @@ class TExcelParsingResult(SQLMixin):
         return ex_attr
 
     @classmethod
-    def query_row_sql(cls, file_id, vc_seq_no, l_sheet_no, l_table_line):
-        return f"SELECT vc_id FROM {cls.table_name} WHERE file_id ={file_id} AND vc_seq_no ={vc_seq_no} AND l_sheet_no ={l_sheet_no} AND l_table_line={l_table_line}"
+    def query_rows_sql(cls, file_id, vc_seq_no, positions: list[tuple[int, int]]):
+        """positions: (l_sheet_no, l_table_line) 列表, 一次查出这些行的 vc_id"""
+        values = ",".join(f"({int(l_sheet_no)},{int(l_table_line)})" for l_sheet_no, l_table_line in positions)
+        return (
+            f"SELECT vc_id, l_sheet_no, l_table_line FROM {cls.table_name} "
+            f"WHERE file_id ={file_id} AND vc_seq_no ={vc_seq_no} AND (l_sheet_no, l_table_line) IN ({values})"
+        )
 
 
 @dataclass
@@ -26,10 +26,10 @@ def sync_email(ctx):
 
 
 @task()
-def sync_disk(ctx):
+def sync_disk(ctx, full=False):
     from remarkable.plugins.cmfchina.tasks import sync_shared_disk
 
-    sync_shared_disk()
+    sync_shared_disk(full)
 
 
 @task(klass=InvokeWrapper)
@@ -39,6 +39,15 @@ def make_pdf_cache(ctx, start, end, force=False, sync=False):
             cache_pdf_file.delay(fid, force=force)
 
 
+@task(klass=InvokeWrapper)
+async def make_search_index(ctx, start=0, end=0, force=False):
+    """为已有文件补建全文检索索引(依赖 pdf 缓存)"""
+    from remarkable.service.fulltext_search import backfill_search_index
+
+    count = await backfill_search_index(int(start), int(end), force=force)
+    logging.info(f"search index updated for {count} files")
+
+
 @task(klass=InvokeWrapper)
 async def make_questions(ctx, start, end):
     """批量生成题目（用于修复生成题目失败的文档）"""
@@ -33,11 +33,11 @@ from remarkable.devtools import InvokeWrapper, int_or_none
 
 
 @task
-def load_data_v2(ctx, schema_id, vid=0, update=False, clear=False, limit=0, start=None, end=None):
+def load_data_v2(ctx, schema_id, vid=0, update=False, clear=False, limit=0, start=None, end=None, incremental=False):
     schema_id = int(schema_id)
     from remarkable.service.prompter import load_data_v2 as _load_data_v2
 
-    IOLoop().run_sync(lambda: _load_data_v2(schema_id, vid, update, clear, limit, start, end))
+    IOLoop().run_sync(lambda: _load_data_v2(schema_id, vid, update, clear, limit, start, end, incremental=incremental))
 
 
 @task
@@ -50,6 +50,15 @@ def extract_feature_v2(ctx, schema_id, vid=0, start=0, end=0, for_test=False):
     _extract_feature_v2(schema_id, vid=vid, start=start, end=end, for_test=for_test)
 
 
+@task
+def predict_v2(ctx, schema_id, vid=0, start=0, end=0, save_path=None):
+    """按 elements 目录中的文档逐个预测初步定位结果, 需先执行 load_data_v2"""
+    from remarkable.service.prompter import predict_v2 as _predict_v2
+
+    end = float(end or "Inf")
+    print(_predict_v2(int(schema_id), vid=int(vid), start=int(start), end=end, save_path=save_path))
+
+
 @task
 def train_v2(ctx, schema_id, vid=0):
     schema_id = int(schema_id)
@@ -58,6 +67,23 @@ def train_v2(ctx, schema_id, vid=0):
     _train_v2(schema_id, vid=vid)
 
 
+@task
+def train_incremental_v2(ctx, schema_id, vid=0):
+    """增量训练, 需先执行 load_data_v2 --update --incremental"""
+    from remarkable.service.prompter import train_incremental_v2 as _train_incremental_v2
+
+    print(_train_incremental_v2(int(schema_id), vid=int(vid)))
+
+
+@task
+def check_fused_parity(ctx, schema_id, vid=0):
+    """比对合并推理与逐字段模型的预测结果, 需先执行 extract_feature_v2 --for-test 生成 pred_data.npz"""
+    from remarkable.prompter.utils import check_fused_parity as _check_fused_parity
+
+    for rule, diff in _check_fused_parity(int(schema_id), vid=int(vid)).items():
+        print(f"{diff:.2e}\t{rule}")
+
+
 @task
 def archive_modelv2_for(ctx, schema_id, vid=0, name="szse"):
     from remarkable.service.prompter import PROMPTER_MODEL_FILES, archive_model, model_v2_path
@@ -101,6 +101,9 @@ class NewFile(BaseModel):
             localstorage.delete_file(ccxi_path)
         if self.pdf_cache_path():
             localstorage.delete_dir(self.pdf_cache_path())
+        from remarkable.service.fulltext_search import delete_search_index
+
+        await delete_search_index(self.hash)
         # 如果没有相同文件, 则删除db关联的PDFinsight hash记录
         await self.update_(pdfinsight=None)
 
@@ -0,0 +1,173 @@
+"""
+PdfinsightReader 解析结果的本机共享缓存
+
+interdoc zip 解压、json 解码、_pretreat 的结果以 msgpack 序列化后按 interdoc hash 存到本地目录,
+同一台机器上的 web/worker 进程共用; 读取时反序列化得到一份独立的数据, 调用方可以随意修改.
+目录总大小按字节数限制, 超出时按最近使用时间(mtime)淘汰.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import msgspec
+
+from remarkable.common.exceptions import PDFInsightNotFound
+from remarkable.common.util import read_zip_first_file
+from remarkable.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# _pretreat 的逻辑有变化时需要修改, 使旧缓存失效
+CACHE_VERSION = 1
+P_HASH_PATH = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{30}$")
+
+
+class InterdocCacheStats(msgspec.Struct):
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    load_seconds: float = 0
+    parse_seconds: float = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+
+class InterdocCache:
+    def __init__(self, cache_dir: str | None, max_bytes: int):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_bytes = max_bytes
+        self.stats = InterdocCacheStats()
+        self._encoder = msgspec.msgpack.Encoder()
+        self._decoder = msgspec.msgpack.Decoder()
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            get_config("web.interdoc_cache.dir"),
+            int((get_config("web.interdoc_cache.max_size") or 0) * 1024 * 1024),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cache_dir) and self.max_bytes > 0
+
+    @staticmethod
+    def cache_key(zip_path: str) -> str:
+        """优先使用存储路径中的 interdoc hash, 否则退化为 路径+大小+修改时间"""
+        thin_path = zip_path + ".thin"
+        real_path = thin_path if os.path.exists(thin_path) else zip_path
+        stat = os.stat(real_path)
+        parts = Path(zip_path).parts[-2:]
+        if P_HASH_PATH.match("/".join(parts)):
+            key = "".join(parts) + (".thin" if real_path == thin_path else "")
+        else:
+            key = f"{os.path.realpath(real_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return hashlib.md5(f"{CACHE_VERSION}:{key}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key[2:]
+
+    def get(self, zip_path: str, pretreat: Callable[[dict], dict]) -> dict:
+        if not os.path.isfile(zip_path):
+            raise PDFInsightNotFound("file {} not exists".format(zip_path))
+
+        if not self.enabled:
+            return self._parse(zip_path, pretreat)
+
+        path = self._path(self.cache_key(zip_path))
+        start = time.time()
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            pass
+        else:
+            try:
+                data = self._decoder.decode(raw)
+            except msgspec.DecodeError:
+                logger.warning(f"broken interdoc cache: {path}, reparsing")
+            else:
+                # 读完后文件可能已被其他进程淘汰
+                with contextlib.suppress(FileNotFoundError):
+                    os.utime(path)
+                self.stats.hits += 1
+                self.stats.load_seconds += time.time() - start
+                return data
+
+        self.stats.misses += 1
+        data = self._parse(zip_path, pretreat)
+        try:
+            self._write(path, self._encoder.encode(data))
+        except (OSError, TypeError, msgspec.EncodeError) as exp:
+            logger.warning(f"failed to write interdoc cache {path}: {exp}")
+        return data
+
+    def _parse(self, zip_path: str, pretreat: Callable[[dict], dict]) -> dict:
+        start = time.time()
+        data = pretreat(msgspec.json.decode(read_zip_first_file(zip_path)))
+        self.stats.parse_seconds += time.time() - start
+        return data
+
+    def _write(self, path: Path, raw: bytes):
+        if len(raw) > self.max_bytes:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再 rename, 其他进程不会读到写了一半的文件
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file_obj:
+            file_obj.write(raw)
+        os.replace(file_obj.name, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for sub_dir in self.cache_dir.iterdir():
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.stats.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        if not self.enabled or not self.cache_dir.exists():
+            return
+        for sub_dir in self.cache_dir.iterdir():
+            if sub_dir.is_dir():
+                for entry in os.scandir(sub_dir):
+                    os.remove(entry.path)
+
+
+_cache: InterdocCache | None = None
+
+
+def get_interdoc_cache() -> InterdocCache:
+    global _cache
+    if _cache is None:
+        _cache = InterdocCache.from_config()
+    return _cache
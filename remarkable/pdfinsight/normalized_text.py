@@ -0,0 +1,82 @@
+"""
+元素块/单元格文本的规范化结果
+
+clean_txt 的结果与逐字符的位置映射一起算出并按文档缓存(PdfinsightReader.normalize),
+同一段文字在各字段、各模型间只清洗一次; 清洗后文本中的区间通过 offsets 直接换算回原文区间,
+不必再调用 index_in_space_string 逐字符扫描. offsets 用 array 存储, 每个字符 4 字节.
+"""
+
+from array import array
+
+from remarkable.common.constants import Language
+from remarkable.common.util import P_SPACES
+from remarkable.config import get_config
+
+EN_LINE_BREAKS = frozenset("\r\t\f\v\n")
+
+
+def content_language() -> str:
+    return get_config("client.content_language") or Language.ZH_CN.value
+
+
+class NormalizedText:
+    """
+    text: 与 clean_txt(raw, language=language) 相同
+    offsets: text 中第 i 个字符在 raw 中的位置; 英文中连续空白合并成的空格对应空白的起始位置
+    """
+
+    __slots__ = ("raw", "language", "text", "offsets")
+
+    def __init__(self, raw: str, language: str | None = None):
+        self.raw = raw
+        self.language = language or content_language()
+        if self.language == Language.EN_US.value:
+            self.text, self.offsets = self._clean_en(raw)
+        else:
+            self.text, self.offsets = self._clean_zh(raw)
+
+    @staticmethod
+    def _clean_zh(raw: str) -> tuple[str, array]:
+        parts, offsets, cursor = [], array("I"), 0
+        for space in P_SPACES.finditer(raw):
+            parts.append(raw[cursor : space.start()])
+            offsets.extend(range(cursor, space.start()))
+            cursor = space.end()
+        parts.append(raw[cursor:])
+        offsets.extend(range(cursor, len(raw)))
+        return "".join(parts), offsets
+
+    @staticmethod
+    def _clean_en(raw: str) -> tuple[str, array]:
+        # 换行等先替换为空格, 之后两个以上的连续空白合并为一个空格, 最后去掉首尾空白
+        parts, offsets, cursor = [], array("I"), 0
+        for space in P_SPACES.finditer(raw):
+            if space.start() == 0 or space.end() == len(raw):
+                replacement = ""
+            elif space.end() - space.start() > 1 or space.group() in EN_LINE_BREAKS:
+                replacement = " "
+            else:
+                replacement = space.group()
+            parts.append(raw[cursor : space.start()])
+            offsets.extend(range(cursor, space.start()))
+            if replacement:
+                parts.append(replacement)
+                offsets.append(space.start())
+            cursor = space.end()
+        parts.append(raw[cursor:])
+        offsets.extend(range(cursor, len(raw)))
+        return "".join(parts), offsets
+
+    def __len__(self):
+        return len(self.text)
+
+    def __str__(self):
+        return self.text
+
+    def span(self, start: int, end: int) -> tuple[int, int]:
+        """清洗后文本的区间 [start, end) 换算为原文区间, 越界时返回 (-1, -1)"""
+        if start < 0 or end > len(self.offsets) or start > end:
+            return -1, -1
+        if start == end:
+            return (self.offsets[start], self.offsets[start]) if start < len(self.offsets) else (-1, -1)
+        return self.offsets[start], self.offsets[end - 1] + 1
@@ -42,7 +42,8 @@ header_cell_unit_patterns = PatternCollection(
         r"人民币(?P<dst>元)",
         rf"[（（\(]?(?P<dst>{PERCENT_PATTERN})[\)）]?",
         rf"[（\(](?P<dst>{UNIT_PATTERN})[\)）]",
-    ]
+    ],
+    combine=True,
 )
 data_cell_unit_patterns = PatternCollection(
     [rf"[（\(]?(?P<dst>{UNIT_PATTERN})[\)）]?", rf"[（（\(]?(?P<dst>{PERCENT_PATTERN})[\)）]?"]
@@ -69,6 +70,8 @@ class ParsedTable:
     row_tags: list[str]
     regions: list["ParsedTableRegion"]
 
+    _frozen = False
+
     def __init__(
         self,
         pdfinsight_table: PdfinsightTable,
@@ -92,6 +95,16 @@ class ParsedTable:
         self.row_tags = self.parse_row_tags()
         self.regions = self.parse_regions(self.row_tags, width_from_all_rows=width_from_all_rows)
 
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"ParsedTable is shared by predictors and read-only, can't set {name!r}")
+        super().__setattr__(name, value)
+
+    def freeze(self) -> "ParsedTable":
+        """放入文档级缓存前调用, 之后不允许再修改属性"""
+        self._frozen = True
+        return self
+
     @property
     def rows(self) -> list[list["ParsedTableCell"]]:
         return [row for region in self.regions for row in region.rows]
@@ -119,11 +132,12 @@ class ParsedTable:
     def cell(self, ridx, cidx) -> "ParsedTableCell":
         return self.rows[ridx][cidx]
 
+    @cached_property
+    def row_texts(self) -> list[str]:
+        return [clean_txt("".join(cell.text for cell in row)) if row else "" for row in self.rows]
+
     def get_row_text(self, row_idx):
-        row = self.rows[row_idx]
-        if not row:
-            return ""
-        return clean_txt("".join(cell.text for cell in row))
+        return self.row_texts[row_idx]
 
     def parse_title(self, special_title_patterns=None):
         def is_title(ele, table) -> bool:
@@ -790,9 +804,21 @@ def parse_table(
 ) -> ParsedTable:
     if isinstance(element, dict):
         element = PdfinsightTable(element)
-    if pdfinsight_reader:
-        if elements_above is None:
-            elements_above = pdfinsight_reader.find_elements_near_by(element.index, amount=5, step=-1)
+    if pdfinsight_reader and elements_above is None:
+        key = _parsed_table_key(pdfinsight_reader, element, tabletype, width_from_all_rows, special_title_patterns)
+
+        def _parse():
+            return ParsedTable(
+                element,
+                tabletype=tabletype,
+                elements_above=pdfinsight_reader.find_elements_near_by(element.index, amount=5, step=-1),
+                width_from_all_rows=width_from_all_rows,
+                special_title_patterns=special_title_patterns,
+            )
+
+        if key is None:
+            return _parse()
+        return pdfinsight_reader.parse_cache.get_or_create(key, lambda: _parse().freeze())
     return ParsedTable(
         element,
         tabletype=tabletype,
@@ -800,3 +826,23 @@ def parse_table(
         width_from_all_rows=width_from_all_rows,
         special_title_patterns=special_title_patterns,
     )
+
+
+def _parsed_table_key(
+    pdfinsight_reader, table: PdfinsightTable, tabletype, width_from_all_rows, special_title_patterns
+):
+    """
+    同一文档内相同参数解析出的表格可以共用, 以下情况不缓存(返回 None):
+    - 传入的元素块不是文档中的原始元素块(如 regroup/拼接后的副本)
+    - special_title_patterns 不是 PatternCollection
+    """
+    _, origin = pdfinsight_reader.find_element_by_index(table.index)
+    if origin is not table.element:
+        return None
+    if special_title_patterns is None:
+        title_key = None
+    elif isinstance(special_title_patterns, PatternCollection):
+        title_key = tuple((p.pattern, p.flags) for p in special_title_patterns.pattern_objects)
+    else:
+        return None
+    return "parsed_table", table.index, tabletype, bool(width_from_all_rows), title_key
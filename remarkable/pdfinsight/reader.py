@@ -1,6 +1,5 @@
 import copy
 import logging
-import os
 import re
 from collections import Counter, OrderedDict, defaultdict
 from copy import deepcopy
@@ -10,25 +9,31 @@ from itertools import groupby
 from typing import Callable, Iterable, Pattern
 
 import attr
-import msgspec
+import numpy as np
 from pdfparser.pdftools.interdoc import Interdoc
 from pdfparser.pdftools.pdf_util import PDFUtil
 
 from remarkable.common.box_util import get_bound_box
-from remarkable.common.exceptions import PDFInsightNotFound
 from remarkable.common.pattern import RE_TYPE
 from remarkable.common.rectangle import Rectangle, merge_box
+from remarkable.common.util import box_in_box as box_in_box_common
 from remarkable.common.util import (
-    Singleton,
     clean_txt,
     fix_ele_type,
     group_cells,
     is_aim_element,
     is_consecutive,
-    read_zip_first_file,
 )
-from remarkable.common.util import box_in_box as box_in_box_common
+from remarkable.pdfinsight.interdoc_cache import get_interdoc_cache
 from remarkable.pdfinsight.itable import ITable
+from remarkable.pdfinsight.normalized_text import NormalizedText
+from remarkable.pdfinsight.spatial_index import (
+    SpatialIndex,
+    centers_in_box,
+    first_max,
+    normalize_outline,
+    overlap_ratios,
+)
 from remarkable.pdfinsight.text_util import clear_syl_title
 from remarkable.predictor.eltype import ElementClassifier, ElementType
 
@@ -61,7 +66,7 @@ class Index:
         return attr.astuple(self)[index]
 
 
-def _pretreat(data):
+def _pretreat_doc(data):
     # https://mm.paodingai.com/cheftin/pl/oia5cdfogtd1ty6ncjbjycznzr
     data = Interdoc.restore_page_merged_table(data)
     for group_name, class_name in PDFINSIGHT_CLASS_MAPPING.items():
@@ -88,7 +93,10 @@ def _pretreat(data):
             table["is_nested"] = True
             data["tables"].append(table)
     data["contain_index_nested_tables"] = nested_tables
+    return data
 
+
+def _build_index(data):
     items = {}
     index_keys = list(PDFINSIGHT_CLASS_MAPPING.keys())
     index_keys.remove("syllabuses")
@@ -100,55 +108,8 @@ def _pretreat(data):
     return data
 
 
-class Cacher(Singleton):
-    def __init__(self, size=0):
-        if not self._inited:
-            self.size = size
-            self.keys = []
-            self.data = {}
-            self._inited = True
-
-    def __reinit__(
-        self,
-    ):
-        self.keys = []
-        self.data = {}
-
-    def get(self, zip_path):
-        if not os.path.isfile(zip_path):
-            raise PDFInsightNotFound("file {} not exists".format(zip_path))
-
-        if zip_path not in self.data:
-            data = msgspec.json.decode(read_zip_first_file(zip_path))
-            _pretreat(data)
-            if self.size > 0:
-                self.data[zip_path] = data
-                self._push(zip_path)
-        else:
-            data = self.data[zip_path]
-            self._push(zip_path)
-
-        return data
-
-    def close(self, zip_path):
-        if not zip_path:
-            self.__reinit__()
-
-        if not os.path.isfile(zip_path):
-            return
-
-        if zip_path in self.keys and zip_path in self.data:
-            self.keys.remove(zip_path)
-            self.data.pop(zip_path, None)
-
-    def _push(self, key):
-        if key in self.keys:
-            self.keys.remove(key)
-
-        self.keys.insert(0, key)
-        while len(self.keys) > self.size:
-            key_ = self.keys.pop()
-            self.data.pop(key_, None)
+def _pretreat(data):
+    return _build_index(_pretreat_doc(data))
 
 
 def fill_merged_cells(table):
@@ -170,18 +131,46 @@ def fill_merged_cells(table):
     return table
 
 
+class ParseCache:
+    """文档级的解析结果缓存(如 ParsedTable), 与 PdfinsightReader 同生命周期, 各字段/模型共用"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._items = {}
+
+    def get_or_create(self, key, factory: Callable):
+        if key in self._items:
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        self._items[key] = value = factory()
+        return value
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
 class PdfinsightReader:
-    def __init__(self, path, cachesize=0, data=None, include_special_table=False):
+    def __init__(self, path, data=None, include_special_table=False):
         self.path = path
-        # TODO: remove the Cacher
-        self.cacher = Cacher(size=cachesize)
-        self.data = self.cacher.get(path) if not data else _pretreat(data)
+        self.parse_cache = ParseCache()
+        self._normalized_texts = {}
+        if data:
+            self.data = _pretreat(data)
+        else:
+            self.data = _build_index(get_interdoc_cache().get(path, _pretreat_doc))
         self.syllabus_dict = {syl["index"]: syl for syl in self.syllabuses}
         self.syllabus_reader = PdfinsightSyllabus(self.syllabuses)
         self.element_dict = {}
         for _, elt in sorted(self.data["_index"].items(), key=lambda x: x[0]):
             self.element_dict.setdefault(elt.page, []).append(elt)
 
+        self.spatial_index = SpatialIndex(self.element_dict)
+
         self.table_dict = {}
         if combo_tables := self.data.get("combo_tables"):
             # use attr 'combo_tables' for merged_table
@@ -193,6 +182,17 @@ class PdfinsightReader:
             for item in table.tables:
                 self.table_dict[item["index"]] = table
 
+    def normalize(self, text: str, language: str | None = None) -> NormalizedText:
+        """文档内的段落/单元格文本只清洗一次, 见 NormalizedText"""
+        key = (text, language)
+        if key not in self._normalized_texts:
+            self._normalized_texts[key] = NormalizedText(text, language)
+        return self._normalized_texts[key]
+
+    def clean_text(self, element: dict) -> str:
+        """与 clean_txt(element["text"]) 相同"""
+        return self.normalize(element.get("text") or "").text
+
     def __getattr__(self, name):
         """
         id, name, path,
@@ -246,40 +246,14 @@ class PdfinsightReader:
         return elt.get("class"), elt
 
     def find_cell_idx_by_outline(self, tbl, outline, box_page):
-        def inter_x(*outlines):
-            overlap_length = min(outlines[0][2], outlines[1][2]) - max(outlines[0][0], outlines[1][0])
-            return overlap_length if overlap_length > 0 else 0
-
-        def inter_y(*outlines):
-            overlap_length = min(outlines[0][3], outlines[1][3]) - max(outlines[0][1], outlines[1][1])
-            return overlap_length if overlap_length > 0 else 0
-
-        def area(*outlines):
-            return (outlines[1][3] - outlines[1][1]) * (outlines[1][2] - outlines[1][0])
-
-        def overlap_percent(*outlines):
-            _area = area(*outlines)
-            if _area == 0:
-                return 0
-            return inter_y(*outlines) * inter_x(*outlines) / _area
-
         if not tbl:
-            _type, elt = self.reader.find_element_by_outline(box_page, outline)
+            _type, elt = self.find_element_by_outline(box_page, outline)
             tbl = elt if elt is not None and _type == "TABLE" else {}
 
-        max_overlap = None
-        for cell_idx, cell in tbl.get("cells", {}).items():
-            if int(cell["page"]) != int(box_page):
-                continue
-            if cell.get("dummy"):
-                continue
-            overlap = overlap_percent(outline, cell["box"])
-            if overlap <= 0:
-                continue
-            if max_overlap is None or max_overlap[1] < overlap:
-                max_overlap = (cell_idx, overlap)
-        if max_overlap is not None:
-            return max_overlap[0]
+        cell_index = self.spatial_index.cells(tbl, int(box_page))
+        overlaps = overlap_ratios(outline, cell_index.boxes)
+        if (idx := first_max(overlaps, overlaps > 0)) is not None:
+            return cell_index.cell_idxes[idx]
         return None
 
     def find_cell_idxes_by_outline(self, tbl, outline, box_page):
@@ -311,36 +285,12 @@ class PdfinsightReader:
         return res
 
     def find_element_by_outline(self, page, outline):
-        def inter_x(*outlines):
-            overlap_length = min(outlines[0][2], outlines[1][2]) - max(outlines[0][0], outlines[1][0])
-            return overlap_length if overlap_length > 0 else 0
-
-        def inter_y(*outlines):
-            overlap_length = min(outlines[0][3], outlines[1][3]) - max(outlines[0][1], outlines[1][1])
-            return overlap_length if overlap_length > 0 else 0
-
-        def area(*outlines):
-            return (outlines[1][3] - outlines[1][1]) * (outlines[1][2] - outlines[1][0])
-
-        def overlap_percent(*outlines):
-            try:
-                return inter_y(*outlines) * inter_x(*outlines) / area(*outlines)
-            except ZeroDivisionError:
-                return 0
-
-        max_overlap = None
-        elements = self.find_elements_by_page(page)
-        # logger.debug("find outline: %s", outline)
-        for elt in elements:
-            overlap = overlap_percent(outline, elt["outline"])
-            # logger.debug("%.2f, %s", overlap, elt['outline'])
-            if overlap == 0:
-                continue
-            if max_overlap is None or max_overlap[1] < overlap:
-                max_overlap = (elt, overlap)
-
-        if max_overlap is not None:
-            return self._return(max_overlap[0])
+        if not outline:
+            return None, None
+        page_index = self.spatial_index.page(page)
+        idx = first_max(overlap_ratios(outline, page_index.boxes))
+        if idx is not None:
+            return self._return(page_index.elements[idx])
 
         return None, None
 
@@ -405,12 +355,21 @@ class PdfinsightReader:
         return box_in_box_common(element_outline, box_outline)
 
     def box_in_table(self, box, page):
-        elements = self.find_elements_by_page(page)
-        for ele in elements:
-            if ele.get("class") == "TABLE":
-                if self.box_in_box(box, ele["outline"]):
-                    return True
-        return False
+        page_index = self.spatial_index.page(page)
+        if not page_index.is_table.any():
+            return False
+        left, top, right, bottom = normalize_outline(box)[:4]
+        h_center, v_center = (left + right) / 2, (top + bottom) / 2
+        tables = page_index.boxes[page_index.is_table]
+        # box 的中心点落在表格内
+        return bool(
+            (
+                (tables[:, 0] <= h_center)
+                & (h_center <= tables[:, 2])
+                & (tables[:, 1] <= v_center)
+                & (v_center <= tables[:, 3])
+            ).any()
+        )
 
     @staticmethod
     def filter_table_cross_page(elements):
@@ -430,25 +389,12 @@ class PdfinsightReader:
         overlap_threshold = 0.618
 
         res = []
-        max_overlap = None
-        elements = self.find_elements_by_page(page)
-        # logger.debug("find outline: %s", outline)
-        for elt in elements:
-            overlap = self.overlap_percent(outline, elt["outline"], base="min")
-            # logger.debug("%.2f, %s", overlap, elt['outline'])
-            if overlap == 0:
-                continue
-
-            if max_overlap is None or max_overlap[1] < overlap:
-                max_overlap = (elt, overlap)
-
-            if overlap > overlap_threshold:
-                res.append(self._return(elt))
-
-        if not res and max_overlap is not None:
-            res.append(self._return(max_overlap[0]))
-
-        # logger.info("find %s elements", len(res))
+        page_index = self.spatial_index.page(page)
+        if outline:
+            overlaps = overlap_ratios(outline, page_index.boxes, base="min")
+            res = [self._return(page_index.elements[idx]) for idx in np.flatnonzero(overlaps > overlap_threshold)]
+            if not res and (idx := first_max(overlaps)) is not None:
+                res.append(self._return(page_index.elements[idx]))
 
         if not res:
             logger.warning("can't find elements by outline %s, in page %s", outline, page)
@@ -462,27 +408,13 @@ class PdfinsightReader:
         :param outline:
         :return:
         """
-        chars = []
-        may_chars = []
         etype, element = self.find_element_by_outline(page, outline)
         if not element:
-            return element, chars
+            return element, []
 
-        if "chars" in element:
-            may_chars = element["chars"]
-        elif "cells" in element:
-            for cell in element["cells"].values():
-                if cell.get("dummy"):
-                    continue
-                may_chars.extend(cell["chars"])
-
-        for char in may_chars:
-            if char["page"] != page:
-                continue
-            if self.is_box_in_box_by_center(char["box"], outline):
-                chars.append(char)
-
-        return element, chars
+        char_index = self.spatial_index.chars(element)
+        mask = (char_index.pages == page) & centers_in_box(char_index.boxes, outline)
+        return element, [char_index.chars[idx] for idx in np.flatnonzero(mask)]
 
     def find_chars_before_outline(self, page, outline):
         """
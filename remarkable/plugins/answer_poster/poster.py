@@ -46,16 +46,64 @@ class AnswerPoster:
         self.conn.commit()
         return record.id
 
+    def post_many(self, items) -> int:
+        """
+        items: [(record_key, file_name, file_meta, schema, answer_version, answer), ...]
+        一批记录在同一个事务中写入: 一次查出已有记录, 结果版本未变的跳过, 各答案表按 record_id 批量删除旧数据
+        返回写入的记录数
+        """
+        items = list({item[0]: item for item in items}.values())  # 同一记录只保留最后一次
+        if not items:
+            return 0
+        existing = {
+            record.key: record for record in self.conn.query(Record).filter(Record.key.in_([i[0] for i in items]))
+        }
+        changed = []
+        for record_key, file_name, file_meta, schema, answer_version, answer in items:
+            record = existing.get(record_key)
+            if record is not None and record.result_version == str(answer_version):
+                logging.debug("record(%s) no need to update", record_key)
+                continue
+            if record is None:
+                record = Record()
+                record.key = record_key
+                self.conn.add(record)
+            record.filename = file_name
+            record.filemeta = file_meta
+            record.schema = schema
+            record.result_version = answer_version
+            changed.append((record, answer))
+        if not changed:
+            return 0
+
+        try:
+            self.conn.flush()  # 为新记录分配 id
+            record_ids = [record.id for record, _ in changed]
+            for orm in self.orm_classes.values():
+                self.conn.query(orm).filter(orm.record_id.in_(record_ids)).delete(synchronize_session=False)
+            for record, answer in changed:
+                self._add_answer_data(record.id, answer)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return len(changed)
+
     def _post_answer_data(self, record_id, answer):
+        if self._add_answer_data(record_id, answer):
+            self.conn.commit()
+
+    def _add_answer_data(self, record_id, answer) -> bool:
         reader = AnswerReader(answer)
         schema = Schema(answer["schema"])
         answer_root, _ = reader.build_answer_tree()
         meta = {"record_id": record_id, "schema": schema}
         root_name = reader.main_schema["name"]
         root_type = root_name
-        if root_name in answer_root:
-            self._post_answer_node_recursively(answer_root[root_name, 0], root_type, **meta)
-            self.conn.commit()
+        if root_name not in answer_root:
+            return False
+        self._post_answer_node_recursively(answer_root[root_name, 0], root_type, **meta)
+        return True
 
     def _post_answer_node_recursively(self, node, _type, foreign_key_name=None, foreign_key_value=None, **meta):
         record_id = meta.get("record_id")
@@ -1,10 +1,12 @@
+import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
 
 from sqlalchemy.engine.url import URL
 
 from remarkable.common.util import loop_wrapper, name2driver
-from remarkable.db import init_rdb, peewee_transaction_wrapper
+from remarkable.db import init_rdb, peewee_transaction_wrapper, pw_db
 from remarkable.models.new_file import NewFile
 from remarkable.plugins.answer_poster.builder import TableBuilder
 from remarkable.plugins.answer_poster.poster import AnswerPoster
@@ -13,6 +15,11 @@ from remarkable.pw_models.question import NewQuestion
 from remarkable.worker.app import app
 
 CONFIG_NAME = "answer_sync_db"
+# 每批读取的题目数, 每批在目标库中一个事务内写入
+SYNC_BATCH_SIZE = 200
+# 每次同步从水位往前回退的秒数: updated_utc 精度为秒, 与水位同一秒但 id 更小的题目, 以及提交较晚、
+# updated_utc 早于水位的事务都会落在水位之前, 重读这段时间内的题目, 结果版本未变的记录 post_many 会跳过
+SYNC_OVERLAP_SECONDS = 300
 
 
 @app.task
@@ -52,32 +59,99 @@ async def answer_sync():
         if not mold:
             logging.error(f"can't find mold {mold}, stop sync answer")
             return
-        questions = await NewQuestion.list_by_range(mold=mold.id)
-        if not questions:
-            continue
         try:
             builder = TableBuilder()
             orm_classes = builder.build(mold.data, dsn_url)
             poster = AnswerPoster(dsn_url, orm_classes)
-            for question in questions:
-                file = await NewFile.find_by_id(question.fid)
-                answer = (
-                    question.answer
-                    if question.answer and question.answer["userAnswer"]["items"]
-                    else question.preset_answer
-                )
-                if not answer:
-                    continue
-                if answer["schema"]["version"] != mold.checksum:
-                    logging.debug("file %s, answer version is different from mold, pass", question.fid)
-                    continue
-                question_key = "%s_%s" % (question.fid, question.mold)
-                logging.info("sync record %s", question_key)
-                poster.post(question_key, file.name, None, question.mold, question.updated_utc, answer)
+            await sync_changed_answers(poster, mold, AnswerSyncWatermark(sync_config.index, mold.checksum))
         except Exception as exp:
             logging.exception(exp)
 
 
+class AnswerSyncWatermark:
+    """
+    每个同步配置已同步到的位置 (question.updated_utc, question.id), 存在 redis 中
+    schema 变化后答案版本不再匹配, 位置随 mold.checksum 一起重置为全量同步
+    """
+
+    redis_key = "answer_sync_watermark"
+
+    def __init__(self, config_index, checksum):
+        self.field = f"{config_index}:{checksum}"
+        self.rdb = init_rdb()
+
+    def get(self) -> tuple[int, int]:
+        value = self.rdb.hget(self.redis_key, self.field)
+        if not value:
+            return 0, 0
+        updated_utc, qid = (value.decode() if isinstance(value, bytes) else value).split(":")
+        return int(updated_utc), int(qid)
+
+    def set(self, updated_utc: int, qid: int):
+        self.rdb.hset(self.redis_key, self.field, f"{updated_utc}:{qid}")
+
+
+def changed_questions_query(mold_id: int, updated_utc: int, qid: int, limit: int):
+    """按 (updated_utc, id) 顺序取水位之后的下一批题目, 文件名随题目一起查出"""
+    return (
+        NewQuestion.select(
+            NewQuestion.id,
+            NewQuestion.fid,
+            NewQuestion.mold,
+            NewQuestion.answer,
+            NewQuestion.preset_answer,
+            NewQuestion.updated_utc,
+            NewFile.name.alias("file_name"),
+        )
+        .join(NewFile, on=(NewQuestion.fid == NewFile.id))
+        .where(
+            NewQuestion.mold == mold_id,
+            (NewQuestion.updated_utc > updated_utc)
+            | ((NewQuestion.updated_utc == updated_utc) & (NewQuestion.id > qid)),
+        )
+        .order_by(NewQuestion.updated_utc, NewQuestion.id)
+        .limit(limit)
+        .dicts()
+    )
+
+
+async def sync_changed_answers(poster: AnswerPoster, mold: NewMold, watermark: AnswerSyncWatermark):
+    """
+    只同步水位之后有变化的题目: 按 (updated_utc, id) 分批读取, 每批在目标库中一个事务内写入,
+    写入成功后推进水位, 失败时下次从失败的批次重新开始. 每次从水位前 SYNC_OVERLAP_SECONDS 秒开始读取
+    """
+    updated_utc, qid = watermark.get()
+    if updated_utc:
+        updated_utc, qid = max(updated_utc - SYNC_OVERLAP_SECONDS, 0), 0
+    started = time.time()
+    scanned = posted = 0
+    while True:
+        rows = list(await pw_db.execute(changed_questions_query(mold.id, updated_utc, qid, SYNC_BATCH_SIZE)))
+        if not rows:
+            break
+        items = []
+        for row in rows:
+            answer = row["answer"] if row["answer"] and row["answer"]["userAnswer"]["items"] else row["preset_answer"]
+            if not answer:
+                continue
+            if answer["schema"]["version"] != mold.checksum:
+                logging.debug("file %s, answer version is different from mold, pass", row["fid"])
+                continue
+            question_key = "%s_%s" % (row["fid"], row["mold"])
+            items.append((question_key, row["file_name"], None, row["mold"], row["updated_utc"], answer))
+        posted += await asyncio.to_thread(poster.post_many, items)
+        scanned += len(rows)
+        updated_utc, qid = rows[-1]["updated_utc"], rows[-1]["id"]
+        watermark.set(updated_utc, qid)
+
+    elapsed = time.time() - started
+    lag = int(time.time()) - updated_utc if updated_utc else 0
+    logging.info(
+        f"answer sync for mold {mold.id}: {scanned} changed questions, {posted} records posted, "
+        f"{elapsed:.2f}s, {scanned / elapsed if elapsed else 0:.1f} rows/s, watermark lag {lag}s"
+    )
+
+
 class ScheduleTaskMonitor:
     schedule_lock_key = "schedule_lock"
 
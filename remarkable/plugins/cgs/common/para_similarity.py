@@ -18,6 +18,7 @@ from remarkable.plugins.cgs.common.patterns_util import (
     P_PERCENTAGE,
     P_PERFECTLY_NUMBER,
 )
+from remarkable.plugins.cgs.common.sentence_index import CharOverlapIndex
 from remarkable.plugins.cgs.common.utils import convert_table_to_sentences_by_row, get_outlines
 from remarkable.plugins.predict.common import is_table_elt
 
@@ -1639,7 +1640,16 @@ class ParagraphSimilarity:
         diff_mapping = {}
         left_count = len(sentences_left)
         left_mapping = {}
-        for sentence_right in sentences_right:
+        _min_ratio = min(cls.MIN_RATIO, min_ratio)
+        # 按字符倒排索引一次算出各组合的公共字符数, 只逐对比较可能包含或相似度可能达到阈值的组合
+        candidates = (
+            CharOverlapIndex([sentence.cleaned_text for sentence in sentences_right]).candidates(
+                [sentence.cleaned_text for sentence in sentences_left], _min_ratio
+            )
+            if _min_ratio > 0
+            else None
+        )
+        for right_pos, sentence_right in enumerate(sentences_right):
             if P_IGNORE_TEXT.search(sentence_right.text):
                 continue
             matcher.set_seq2(sentence_right.cleaned_text)
@@ -1647,7 +1657,9 @@ class ParagraphSimilarity:
             right = None
             new_matcher = None
 
-            for sentence_left in sentences_left:
+            for sentence_left in (
+                sentences_left if candidates is None else [sentences_left[pos] for pos in candidates[right_pos]]
+            ):
                 left_text_len = len(sentence_left.cleaned_text)
                 if left_text_len == 0:
                     continue
@@ -1692,7 +1704,6 @@ class ParagraphSimilarity:
                     )
                 else:
                     # 长度比例小于最小相似度阈值，直接跳过
-                    _min_ratio = min(cls.MIN_RATIO, min_ratio)
                     numerator, denominator = (
                         (left_text_len, right_text_len)
                         if left_text_len < right_text_len
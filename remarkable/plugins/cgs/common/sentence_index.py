@@ -0,0 +1,52 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+
+
+class CharOverlapIndex:
+    """
+    一组句子按字符建立的倒排索引, 一次算出某句与所有句子的公共字符数(按多重集合计数)
+
+    第 k 次出现的字符 c 记为 (c, k), 两句的公共字符数即两句共有的 (c, k) 个数,
+    与 difflib.SequenceMatcher.quick_ratio 中的匹配数相同
+    """
+
+    def __init__(self, texts: list[str]):
+        self.lengths = np.array([len(text) for text in texts], dtype=np.int64)
+        postings = defaultdict(list)
+        for pos, text in enumerate(texts):
+            for char, count in Counter(text).items():
+                for nth in range(count):
+                    postings[(char, nth)].append(pos)
+        self.postings = {key: np.array(positions, dtype=np.int64) for key, positions in postings.items()}
+
+    def overlaps(self, text: str) -> np.ndarray:
+        arrays = [
+            positions
+            for char, count in Counter(text).items()
+            for nth in range(count)
+            if (positions := self.postings.get((char, nth))) is not None
+        ]
+        if not arrays:
+            return np.zeros(len(self.lengths), dtype=np.int64)
+        return np.bincount(np.concatenate(arrays), minlength=len(self.lengths))
+
+    def candidates(self, texts: list[str], min_ratio: float) -> list[list[int]]:
+        """
+        返回索引中每句对应的 texts 下标列表, 只包含以下组合:
+        - texts 中的句子可能是索引中句子的子串(公共字符数等于其长度)
+        - 长度比例和 quick_ratio 都不低于 min_ratio
+        其余组合的 quick_ratio 或长度比例一定低于 min_ratio, 无需逐对比较
+        """
+        result = [[] for _ in range(len(self.lengths))]
+        for idx, text in enumerate(texts):
+            if not text:
+                continue
+            length = len(text)
+            overlaps = self.overlaps(text)
+            total = self.lengths + length
+            length_ratio = np.minimum(self.lengths, length) / np.maximum(self.lengths, length)
+            matched = (overlaps == length) | ((length_ratio >= min_ratio) & (2.0 * overlaps / total >= min_ratio))
+            for pos in np.flatnonzero(matched):
+                result[pos].append(idx)
+        return result
@@ -1616,11 +1616,11 @@ class SummaryHandler(PermCheckHandler):
         每个用户的标注数量, 登录访问次数
         """
 
-        tree_ids = await NewFileTreeService.get_related_tree_ids(tree_id)
+        tree_ids = NewFileTreeService.related_tree_ids_query([tree_id])
         mold_ids = None
         if not self.current_user.is_admin:
             file_tree_ids = await CMFGroupService.get_user_group_file_trees(self.current_user.id)
-            tree_ids = list(set(file_tree_ids) & set(tree_ids))
+            tree_ids = tree_ids.where(NewFileTree.id.in_(file_tree_ids))
             mold_ids = await CMFGroupService.get_user_group_molds(self.current_user.id)
 
         count_obj = await NewFileTreeService.get_ai_status_summary(prj_id, tree_ids, mold_ids)
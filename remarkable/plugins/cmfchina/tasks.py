@@ -1,4 +1,6 @@
 import datetime
+import functools
+import hashlib
 import logging
 from pathlib import Path
 
@@ -11,6 +13,7 @@ from remarkable.config import get_config
 from remarkable.db import pw_db
 from remarkable.models.cmf_china import (
     CmfChinaEmail,
+    CmfChinaEmailFileInfo,
     CmfFiledFileInfo,
     CmfModel,
     CmfModelAuditAccuracy,
@@ -23,7 +26,7 @@ from remarkable.pw_models.model import MoldWithFK, NewFileProject
 from remarkable.service.cmfchina.cmf_sync_file_service import CmfSyncFileService
 from remarkable.service.cmfchina.common import CMF_CHINA_VERIFY_FILED_PROJECT_NAME
 from remarkable.service.cmfchina.imap_email_receiver import IMAPEmailReceiver
-from remarkable.service.comment import is_hidden_file
+from remarkable.service.cmfchina.shared_disk_manifest import SharedDiskManifest
 from remarkable.worker.app import app
 
 logger = logging.getLogger(__name__)
@@ -102,14 +105,24 @@ async def delete_verify_filed_file():
     logger.info("end delete verify filed file")
 
 
+async def processed_email_ids(host: str, account: str, email_ids: list[int]) -> set[int]:
+    query = CmfChinaEmailFileInfo.select(CmfChinaEmailFileInfo.email_id).where(
+        CmfChinaEmailFileInfo.host == host,
+        CmfChinaEmailFileInfo.account == account,
+        CmfChinaEmailFileInfo.email_id.in_(email_ids),
+    )
+    return {row.email_id for row in await pw_db.execute(query)}
+
+
 @app.task
 @sync
 async def sync_file_from_email():
     cmf_emails = await pw_db.execute(CmfChinaEmail.select())
     for cmf_email in cmf_emails:
         logger.info(f"start sync email: host={cmf_email.host}, account={cmf_email.account}")
+        filter_processed = functools.partial(processed_email_ids, cmf_email.host, cmf_email.account)
         with IMAPEmailReceiver(cmf_email.host, cmf_email.account, cmf_email.password) as receiver:
-            async for email in receiver.email_iter():
+            async for email in receiver.email_iter(filter_processed=filter_processed):
                 await CmfSyncFileService.upload_file_from_email(email, ADMIN_ID)
 
         logger.info(f"end sync email: host={cmf_email.host}, account={cmf_email.account}")
@@ -150,17 +163,24 @@ async def save_audit_result_statistic():
 
 @app.task
 @sync
-async def sync_shared_disk():
+async def sync_shared_disk(full_scan: bool = False):
+    """按清单增量同步, 只读取新增或大小/mtime 变化的文件; full_scan 时比对所有文件的内容"""
     paths = get_config("cmfchina.shared_disk_paths", [])
     for path in paths:
         logger.info(f"start syncing shared disk: {path}")
-        folder_path = Path(path)
-        for f in folder_path.rglob("*"):
-            if f.is_file() and not is_hidden_file(f):
-                logger.info(f"start syncing file <{f.name}>")
-                await CmfSyncFileService.upload_file_from_shared_disk(f, ADMIN_ID)
-
-        logger.info(f"end syncing shared disk: {path}")
+        manifest = SharedDiskManifest(Path(path))
+        checked = synced = 0
+        for file_path, rel, stat in manifest.scan(full=full_scan):
+            checked += 1
+            body = file_path.read_bytes()
+            file_hash = hashlib.md5(body).hexdigest()
+            if file_hash != manifest.file_hash(rel):
+                logger.info(f"start syncing file <{file_path.name}>")
+                await CmfSyncFileService.upload_file_from_shared_disk(file_path, ADMIN_ID, body=body)
+                synced += 1
+            manifest.record_file(rel, stat, file_hash)
+
+        logger.info(f"end syncing shared disk: {path}, {checked} files checked, {synced} files synced")
 
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ from http import HTTPStatus
 from pathlib import Path
 from zipfile import ZipFile
 
+import msgspec
 from webargs import fields
 
 from remarkable.base_handler import Auth, BaseHandler, route
@@ -20,6 +21,7 @@ from remarkable.db import pw_db
 from remarkable.models.cmf_china import CmfModelAuditAccuracy, CmfMoldModelRef
 from remarkable.models.model_version import NewModelVersion
 from remarkable.models.new_file import NewFile
+from remarkable.pdfinsight.interdoc_cache import get_interdoc_cache
 from remarkable.pdfinsight.parser import parse_table
 from remarkable.pdfinsight.reader import PdfinsightReader
 from remarkable.plugins import Plugin
@@ -274,6 +276,15 @@ class RelatedFilesHandler(BaseHandler):
         return self.data(fids)
 
 
+@plugin.route(r"/interdoc-cache/stats")
+class InterdocCacheStatsHandler(BaseHandler):
+    @Auth("browse")
+    async def get(self):
+        """当前进程的 interdoc 缓存命中统计"""
+        cache = get_interdoc_cache()
+        return self.data({**msgspec.structs.asdict(cache.stats), "hit_rate": cache.stats.hit_rate})
+
+
 @plugin.route(r"/tree/(?P<tree_id>\d+)/file_ids")
 class TreeFilesHandler(BaseHandler):
     @Auth("browse")
@@ -105,15 +105,11 @@ async def sync_data_from_email():
     logger.info(f"开始从中信证券DCM邮箱中同步数据:{date}")
     dcm_projects = await DcmProject.find_by_kwargs(delegate="all", publish_start_date=date)
     for dcm_project in dcm_projects:
-        mails = await sync_data_from_email_by_project(dcm_project)
-        # mail = get_fake_email()  # only for test
-        # mails = [mail]
         project = await DcmProjectService.get_file_project_by_dcm_project_id(dcm_project.id)
-        for mail in mails:  # TODO 如何去重
-            await upload_file_from_mail(project, mail)
+        await sync_data_from_email_by_project(dcm_project, project)
 
 
-async def sync_data_from_email_by_project(dcm_project):
+async def sync_data_from_email_by_project(dcm_project, project: NewFileProject):
     email_host = dcm_project.email_host or get_config("citics_dcm.email_host")
     service = EmailReceiver(email_host)
     logger.info(f"开始同步项目:{dcm_project.project_name}")
@@ -121,8 +117,9 @@ async def sync_data_from_email_by_project(dcm_project):
     password = EmailPasswordCryptor.decrypt(dcm_project.email_password)
     with service.with_user(address, password):
         target_datetime = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=1)
-        mails = service.get_available_emails(target_datetime)
-        return mails
+        # 上传成功后才取下一封, 此时才将上一封记为已处理
+        for mail in service.iter_available_emails(target_datetime):
+            await upload_file_from_mail(project, mail)
 
 
 async def upload_file_from_mail(project: NewFileProject, mail: Email):
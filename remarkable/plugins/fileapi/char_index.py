@@ -0,0 +1,159 @@
+"""
+PDF 字符索引的列式存储
+
+所有字符按元素所在页分组后连续存放在一个文件中，每列一段：
+    boxes     float32 (N, 4)
+    codes     uint32  (N,)    字符 codepoint
+    elements  int32   (N,)    字符所属元素 index
+    pages     int32   (N,)    字符自身所在页
+    etypes    uint8   (N,)    元素类型，见 ELEMENT_TYPES
+另存一份页偏移表 {page: [start, end)}，读取时 mmap 整个文件，按页切片无需拷贝。
+行号即 search string 中的位置，search string 可由 codes 直接还原。
+两个文件都先写临时文件再 rename，已 mmap 旧文件的进程不受影响；偏移表最后替换，
+读到新偏移表时字符文件一定也是新的。
+"""
+
+import os
+import tempfile
+from array import array
+from contextlib import contextmanager
+
+import numpy as np
+
+SEPARATOR = 0
+PARAGRAPH = 1
+TABLE = 2
+ELEMENT_TYPES = {PARAGRAPH: "PARAGRAPH", TABLE: "TABLE"}
+
+_COLUMNS = (
+    ("boxes", np.dtype("<f4"), 4),
+    ("codes", np.dtype("<u4"), 1),
+    ("elements", np.dtype("<i4"), 1),
+    ("pages", np.dtype("<i4"), 1),
+    ("etypes", np.dtype("u1"), 1),
+)
+_NAN_BOX = (float("nan"),) * 4
+_ROW_BYTES = sum(dtype.itemsize * width for _, dtype, width in _COLUMNS)
+
+
+@contextmanager
+def atomic_write(path):
+    """写入同目录下的临时文件，成功后 rename 为 path；不能原地截断正被 mmap 的文件，否则读取方会 SIGBUS"""
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as file_obj:
+        try:
+            yield file_obj
+        except BaseException:
+            file_obj.close()
+            os.unlink(file_obj.name)
+            raise
+    os.replace(file_obj.name, path)
+
+
+class CharIndexBuilder:
+    def __init__(self):
+        self._boxes = array("f")
+        self._codes = array("I")
+        self._elements = array("i")
+        self._pages = array("i")
+        self._etypes = array("B")
+        self._element_pages = array("i")
+
+    def __len__(self):
+        return len(self._codes)
+
+    def add(self, text, box, element_index, element_page, page, etype):
+        # 多 codepoint 的字符按 codepoint 拆成多行，共用同一个 box，保证行号与 search string 位置一致
+        for char in text:
+            self._codes.append(ord(char))
+            self._boxes.extend(box)
+            self._elements.append(element_index)
+            self._pages.append(page)
+            self._etypes.append(etype)
+            self._element_pages.append(element_page)
+
+    def add_separator(self, separator, element_index, element_page):
+        self.add(separator, _NAN_BOX, element_index, element_page, element_page, SEPARATOR)
+
+    def dump(self, path):
+        """按元素所在页稳定排序后写入 path，返回页偏移表"""
+        element_pages = np.frombuffer(self._element_pages, dtype=np.int32)
+        order = np.argsort(element_pages, kind="stable")
+        columns = {
+            "boxes": np.frombuffer(self._boxes, dtype=np.float32).reshape(-1, 4),
+            "codes": np.frombuffer(self._codes, dtype=np.uint32),
+            "elements": np.frombuffer(self._elements, dtype=np.int32),
+            "pages": np.frombuffer(self._pages, dtype=np.int32),
+            "etypes": np.frombuffer(self._etypes, dtype=np.uint8),
+        }
+        with atomic_write(path) as file_obj:
+            for name, dtype, _ in _COLUMNS:
+                file_obj.write(np.ascontiguousarray(columns[name][order], dtype=dtype).tobytes())
+
+        sorted_pages = element_pages[order]
+        page_numbers = np.unique(sorted_pages)
+        starts = np.searchsorted(sorted_pages, page_numbers, side="left")
+        ends = np.searchsorted(sorted_pages, page_numbers, side="right")
+        return {
+            "count": len(order),
+            "pages": {str(page): [int(start), int(end)] for page, start, end in zip(page_numbers, starts, ends)},
+        }
+
+
+class CharIndex:
+    def __init__(self, path, offsets):
+        self.count = offsets["count"]
+        self.page_ranges = offsets["pages"]
+        if self.count:
+            raw = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            raw = np.empty(0, dtype=np.uint8)
+        pos = 0
+        for name, dtype, width in _COLUMNS:
+            size = self.count * width * dtype.itemsize
+            column = raw[pos : pos + size].view(dtype)
+            setattr(self, name, column.reshape(-1, width) if width > 1 else column)
+            pos += size
+
+    @classmethod
+    def load(cls, path, offsets):
+        if not os.path.exists(path):
+            return None
+        if os.path.getsize(path) != offsets["count"] * _ROW_BYTES:
+            # 字符文件与偏移表不是同一次生成的(正在重建)
+            return None
+        return cls(path, offsets)
+
+    def page_range(self, page):
+        return self.page_ranges.get(str(page))
+
+    def search_string(self):
+        return self.codes.tobytes().decode("utf-32-le")
+
+    def rows_in_box(self, page, box):
+        """页内中心点落在 box 中的字符行号（全局行号），分隔符的 box 为 NaN，不会被选中"""
+        page_range = self.page_range(page)
+        if not page_range:
+            return np.empty(0, dtype=np.intp)
+        start, end = page_range
+        boxes = self.boxes[start:end]
+        h_center = (boxes[:, 0] + boxes[:, 2]) / 2
+        v_center = (boxes[:, 1] + boxes[:, 3]) / 2
+        mask = (h_center >= box[0]) & (h_center <= box[2]) & (v_center >= box[1]) & (v_center <= box[3])
+        return np.flatnonzero(mask) + start
+
+    def chars(self, rows, skip_separator=True):
+        res = []
+        for row in rows:
+            etype = int(self.etypes[row])
+            if skip_separator and etype == SEPARATOR:
+                continue
+            res.append(
+                {
+                    "page": int(self.pages[row]),
+                    "text": chr(self.codes[row]),
+                    "box": [round(float(i), 4) for i in self.boxes[row]],
+                    "index": int(self.elements[row]),
+                    "index_type": ELEMENT_TYPES.get(etype),
+                }
+            )
+        return res
@@ -1,13 +1,13 @@
+import asyncio
 import http
-import io
 import logging
 import os
 from collections import defaultdict
+from pathlib import Path
 
 import speedy.peewee_plus.orm
 from marshmallow import Schema, fields
 from pdfparser.pdftools.pdf_util import PDFUtil
-from pdfparser.pdftools.pdfium_util import PDFiumUtil
 from peewee import JOIN
 from tornado.httputil import HTTPFile
 
@@ -49,6 +49,7 @@ from remarkable.plugins.fileapi.common import (
     is_valid_key_path_in_molds,
     predict_element,
 )
+from remarkable.plugins.fileapi.page_image import get_page_image, prefetch_page_images
 from remarkable.plugins.fileapi.schema import TreeSchema
 from remarkable.plugins.fileapi.upload_zip_file_handler import UploadZipFileBaseHandler
 from remarkable.plugins.fileapi.worker import ChapterNode, PDFCache, create_pdf_cache, optimize_outline
@@ -67,6 +68,7 @@ from remarkable.pw_models.model import (
 )
 from remarkable.pw_models.question import NewQuestion
 from remarkable.service.api_cleaner import post_pipe_after_api
+from remarkable.service.fulltext_search import find_candidates, normalize_keyword, search_in_files
 from remarkable.service.new_file import NewFileService
 from remarkable.service.new_file_project import NewFileProjectService
 from remarkable.service.new_file_tree import NewFileTreeService, get_crumbs
@@ -937,14 +939,17 @@ class JpgImageHandler(PermCheckHandler):
         if not file.pdf:
             raise CustomError(_("the pdf file is not ready"))
 
-        pdf_path = localstorage.mount(file.pdf_path())
-        params = {"format": "jpg", "scale_to_x": int(width)}
-        image = PDFiumUtil.get_page_bitmap(pdf_path, int(page), **params)
-        image = image.convert("RGB")
-        b_image = io.BytesIO()
-        image.save(b_image, format="JPEG")
+        page, width = int(page), int(width)
+        # 图片内容只由 pdf 内容、页码和宽度决定
+        self.set_header("Etag", f'"{file.pdf}-{page}-{width}"')
+        if self.check_etag_header():
+            self.set_status(304)
+            return
 
-        return await self.export(b_image.getvalue(), content_type="image/jpeg")
+        pdf_path = localstorage.mount(file.pdf_path())
+        image_path = await get_page_image(pdf_path, file.pdf, page, width)
+        prefetch_page_images(pdf_path, file.pdf, page, width, page_count=file.page)
+        return await self.export(await asyncio.to_thread(Path(image_path).read_bytes), content_type="image/jpeg")
 
 
 @plugin.route(r"/file/(\d+)/pageinfo")
@@ -1027,15 +1032,48 @@ class PdfFileSearchHandler(PermCheckHandler):
             raise CustomError(_("not found file"))
         await self.check_file_permission(fid, file=file)
         pdf_cache = PDFCache(file)
-        search_string_path = pdf_cache.search_string_path
-        if not localstorage.exists(search_string_path):
-            logger.warning(f"search_string_path: {search_string_path} not found, rebuilding...")
+        char_page_offset_path = pdf_cache.char_page_offset_path
+        if not localstorage.exists(char_page_offset_path):
+            logger.warning(f"char_page_offset_path: {char_page_offset_path} not found, rebuilding...")
             await create_pdf_cache(file, force=True)
-            logger.info(f"search_string_path: {search_string_path} rebuilt")
+            logger.info(f"char_page_offset_path: {char_page_offset_path} rebuilt")
         find_res = pdf_cache.search(keyword)
         return self.data({"keyword": keyword, "results": find_res})
 
 
+@plugin.route(r"/files/fulltext-search")
+class FullTextSearchHandler(PermCheckHandler):
+    args = {
+        "keyword": fields.Str(required=True, validate=field_validate.Length(min=1)),
+        "project_id": fields.Int(load_default=0),
+        "tree_id": fields.Int(load_default=0),
+        "limit": fields.Int(load_default=20, validate=field_validate.Range(min=1, max=200)),
+    }
+
+    @Auth("browse")
+    @use_kwargs(args, location="query")
+    async def get(self, keyword, project_id, tree_id, limit):
+        """跨文档全文检索: 先用 n-gram 倒排索引筛选候选文件, 再在候选文件的 PDF 缓存中精确定位"""
+        keyword = normalize_keyword(keyword)
+        if not keyword:
+            raise CustomError(_("The input search criteria is invalid"))
+        if tree_id:
+            await self.check_tree_permission(tree_id)
+            cond = NewFile.tree_id.in_(NewFileTreeService.related_tree_ids_query([tree_id]))
+        elif project_id:
+            await self.check_project_permission(project_id)
+            cond = NewFile.pid == project_id
+        else:
+            raise CustomError(_("The input search criteria is invalid"))
+
+        files = list(
+            await pw_db.execute(NewFile.select(NewFile.id, NewFile.name, NewFile.hash, NewFile.tree_id).where(cond))
+        )
+        candidates = await find_candidates(keyword, list({file.hash for file in files}))
+        results = await self.run_in_executor(search_in_files, keyword, files, candidates, limit)
+        return self.data({"keyword": keyword, "results": results})
+
+
 @plugin.route(r"/(?:project|file|tree)s/(\d+)/run")
 class RunTaskHandler(BaseHandler):
     task_schema = {
@@ -1213,11 +1251,11 @@ class PDFTocTextInBoxHandler(PermCheckHandler):
             get_text = get_text_from_chars_with_white
 
         pdf_cache = PDFCache(file)
-        char_idx_range_path = pdf_cache.char_idx_range_path
-        if not localstorage.exists(char_idx_range_path):
-            logger.warning(f"char_idx_range_path: {char_idx_range_path} not found, rebuilding...")
+        char_page_offset_path = pdf_cache.char_page_offset_path
+        if not localstorage.exists(char_page_offset_path):
+            logger.warning(f"char_page_offset_path: {char_page_offset_path} not found, rebuilding...")
             await create_pdf_cache(file, force=True)
-            logger.info(f"char_idx_range_path: {char_idx_range_path} rebuilt")
+            logger.info(f"char_page_offset_path: {char_page_offset_path} rebuilt")
         text, chars = await self.run_in_executor(pdf_cache.get_text_in_box, box, get_text)
 
         if not text and (config.get_config("client.ocr.enable")):
@@ -1331,7 +1369,7 @@ class SummaryHandler(PermCheckHandler):
         每个用户的标注数量, 登录访问次数
         """
 
-        tree_ids = await NewFileTreeService.get_related_tree_ids(tree_id)
+        tree_ids = NewFileTreeService.related_tree_ids_query([tree_id])
         count_obj = await NewFileTreeService.get_ai_status_summary(prj_id, tree_ids)
         mark_summary = await NewQuestionService.get_mark_summary(prj_id, tree_ids, None)
         return self.data(
@@ -0,0 +1,84 @@
+"""
+PDF 页面图片
+
+- 渲染在有上限的进程池中进行(PDFium 不是线程安全的), 不阻塞 web 进程的事件循环
+- 结果按 (pdf hash, 页码, 宽度) 存在 pdf 缓存目录下, 之后的请求只读文件, 并可用 ETag 返回 304
+- 同一张图片同时只渲染一次; web.page_image.prefetch 大于 0 时顺带在后台渲染前后相邻的页
+"""
+
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from pdfparser.pdftools.pdfium_util import PDFiumUtil
+
+from remarkable.common.storage import localstorage
+from remarkable.config import get_config
+
+logger = logging.getLogger(__name__)
+
+_executor: ProcessPoolExecutor | None = None
+_rendering: dict[str, asyncio.Future] = {}
+# 事件循环只保留 task 的弱引用, 预取的 task 需要在这里持有直到完成
+_prefetching: set[asyncio.Task] = set()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=get_config("web.page_image.workers") or 2, mp_context=get_context("spawn")
+        )
+    return _executor
+
+
+def page_image_path(pdf_hash: str, page: int, width: int) -> str:
+    return os.path.join(localstorage.get_cache_path(pdf_hash), "page_images", f"{page}_{width}.jpg")
+
+
+def render_page_image(pdf_path: str, page: int, width: int, dest: str) -> str:
+    """在子进程中运行: 渲染并写入 dest, 先写临时文件再改名, 读到的缓存文件总是完整的"""
+    image = PDFiumUtil.get_page_bitmap(pdf_path, page, format="jpg", scale_to_x=width)
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG")
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = f"{dest}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file_obj:
+        file_obj.write(buffer.getvalue())
+    os.replace(tmp_path, dest)
+    return dest
+
+
+async def get_page_image(pdf_path: str, pdf_hash: str, page: int, width: int) -> str:
+    """返回页面图片的缓存路径, 不存在时渲染"""
+    dest = page_image_path(pdf_hash, page, width)
+    if os.path.exists(dest):
+        return dest
+    if dest not in _rendering:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(get_executor(), render_page_image, pdf_path, page, width, dest)
+        _rendering[dest] = future
+        future.add_done_callback(lambda _: _rendering.pop(dest, None))
+    return await asyncio.shield(_rendering[dest])
+
+
+def prefetch_page_images(pdf_path: str, pdf_hash: str, page: int, width: int, page_count: int | None = None):
+    """后台渲染前后各 web.page_image.prefetch 页, 不等待结果"""
+    count = get_config("web.page_image.prefetch") or 0
+    for neighbour in range(page - count, page + count + 1):
+        if neighbour == page or neighbour < 0 or (page_count is not None and neighbour >= page_count):
+            continue
+        if os.path.exists(page_image_path(pdf_hash, neighbour, width)):
+            continue
+        task = asyncio.ensure_future(get_page_image(pdf_path, pdf_hash, neighbour, width))
+        _prefetching.add(task)
+        task.add_done_callback(_on_prefetch_done)
+
+
+def _on_prefetch_done(task: asyncio.Future):
+    _prefetching.discard(task)
+    if not task.cancelled() and (exp := task.exception()):
+        logger.warning(f"prefetch page image failed: {exp}")
@@ -5,7 +5,6 @@ import re
 import shutil
 import tempfile
 from collections import defaultdict
-from copy import deepcopy
 
 import pandas as pd
 from aipod.rpc import decode_data, encode_data
@@ -21,16 +20,18 @@ from remarkable.common.constants import PDFParseStatus
 from remarkable.common.exceptions import CustomError
 from remarkable.common.storage import localstorage
 from remarkable.common.util import (
-    chars_in_box_by_center,
     match_ext,
     md5sum,
+    read_zip_first_file,
     ready_for_annotate_notify,
     run_singleton_task,
 )
 from remarkable.config import get_config
 from remarkable.db import pw_db
 from remarkable.models.new_file import NewFile
-from remarkable.pdfinsight.reader import PdfinsightReader, read_zip_first_file
+from remarkable.pdfinsight.reader import PdfinsightReader
+from remarkable.plugins.fileapi.char_index import PARAGRAPH, TABLE, CharIndex, CharIndexBuilder, atomic_write
+from remarkable.service.fulltext_search import update_search_index
 from remarkable.service.new_file import html2pdf
 from remarkable.service.pdf2docx import pdf2docx
 from remarkable.service.word import ppt2pdf, text2pdf, word2pdf
@@ -73,6 +74,10 @@ async def create_pdf_cache(file, force=False, by_pdfinsight=None):
         raise
     else:
         await file.update_(pdf_parse_status=pdf_cache.get_pdf_parse_status())
+        try:
+            await update_search_index(file, force=force)
+        except Exception as e:
+            logger.exception(f"{file.id} update search index error {e}")
         if (
             config.get_config("notification.ready_for_annotate_notify")
         ) and file.pdf_parse_status == PDFParseStatus.COMPLETE:
@@ -169,8 +174,6 @@ tr:nth-child(even) {{background: #E0E0E0;}}
 
 
 class PDFCache:
-    SEARCH_MAP_SIZE_PER_FILE = 1000
-
     def __init__(self, file: NewFile, by_pdfinsight: bool = None):
         self.file = file
         self.by_pdfinsight = get_config("web.parse_pdf", True) if by_pdfinsight is None else by_pdfinsight
@@ -185,11 +188,12 @@ class PDFCache:
         return self._cached_file_path(filename)
 
     @property
-    def search_string_path(self):
-        return self._doc_page_cache_path("search_string")
+    def char_index_path(self):
+        return self._doc_page_cache_path("char_index")
 
-    def search_map_path(self, key):
-        return self._doc_page_cache_path("search_map_{}".format(key))
+    @property
+    def char_page_offset_path(self):
+        return self._doc_page_cache_path("char_page_offset")
 
     @property
     def page_info_path(self):
@@ -199,81 +203,13 @@ class PDFCache:
     def chapter_info_path(self):
         return self._doc_page_cache_path("chapter_info.json.zst")
 
-    @property
-    def char_idx_range_path(self):
-        return self._doc_page_cache_path("char_idx_range_on_page")
-
-    def _save_search_string(self, search_string):
-        path = self.search_string_path
-        if localstorage.exists(path):
-            os.remove(path)
-
-        with open(path, mode="wb") as file_obj:
-            file_obj.write(encode_data(search_string))
-
-    def _save_search_map(self, search_map):
-        split_map = defaultdict(dict)
-        for key, value in search_map.items():
-            split_map[key // self.SEARCH_MAP_SIZE_PER_FILE][key] = value
-        for key, value in split_map.items():
-            path = self.search_map_path(key)
-            if localstorage.exists(path):
-                os.remove(path)
-
-            with open(path, "wb") as file_obj:
-                file_obj.write(encode_data(value))
-
-    def _save_char_idx_range(self, char_idx_range_on_page):
-        path = self.char_idx_range_path
-        if localstorage.exists(path):
-            os.remove(path)
-        with open(path, "wb") as file_obj:
-            file_obj.write(encode_data(char_idx_range_on_page))
-
-    def get_search_string(self):
-        path = self.search_string_path
+    def get_char_index(self) -> CharIndex | None:
+        path = self.char_page_offset_path
         if not localstorage.exists(path):
             return None
         with open(path, mode="rb") as file_obj:
-            search_string = decode_data(file_obj.read())
-        return search_string
-
-    def get_char_in_search_map(self, idx, cache_map):
-        cache_key = idx // self.SEARCH_MAP_SIZE_PER_FILE
-        if cache_key in cache_map:
-            cache_data = cache_map[cache_key]
-        else:
-            cache_data = self.get_search_map(cache_key, cache_map)
-        return cache_data.get(str(idx))
-
-    def get_search_map(self, cache_key, cache_map=None):
-        path = self.search_map_path(cache_key)
-        if not localstorage.exists(path):
-            logging.exception(f"No search map cache found for fid: {self.file.id}")
-            return {}
-        with open(path, mode="rb") as file_obj:
-            cache_data = decode_data(file_obj.read())
-
-        if isinstance(cache_map, dict):
-            cache_map[cache_key] = cache_data
-        return cache_data
-
-    def get_char_idx_range(self, page):
-        """
-        给定page所包含的char在全文档chars中的index range
-        range左闭右开
-        :param page:
-        :return:
-        """
-        path = self.char_idx_range_path
-        if not localstorage.exists(path):
-            return None
-
-        with open(path, mode="rb") as file_obj:
-            data = decode_data(file_obj.read())
-
-        idx_range = data.get(page, [])
-        return idx_range
+            offsets = decode_data(file_obj.read())
+        return CharIndex.load(self.char_index_path, offsets)
 
     def get_page_info(self):
         path = self.page_info_path
@@ -335,76 +271,41 @@ class PDFCache:
                     elements.append(element)
         return elements
 
-    def _gen_search_string(self, pdfinsight: _Doc, pdf_doc: PDFDoc, separate="#_#"):
-        separate_len = len(separate)
+    def _gen_char_index(self, pdfinsight: _Doc, pdf_doc: PDFDoc, separate="#_#") -> CharIndexBuilder:
         para_separate = "\n"
-        para_separate_len = len(para_separate)
-
-        elements = self._get_elements(pdfinsight, pdf_doc)
-        search_string = ""
-        search_map = {}
-        char_idx_range_on_page = defaultdict(list)
-        index = 0
-        for element in elements:
+
+        builder = CharIndexBuilder()
+        for element in self._get_elements(pdfinsight, pdf_doc):
             element_page = element["page"]
-            char_idx_range_on_page[element_page].append(index)
+            element_index = element["index"]
             if "cells" in element:
                 for cell in sorted(element["cells"].keys(), key=lambda x: [int(i) for i in x.split("_")]):
                     for _char in element["cells"][cell]["chars"]:
-                        text = _char["text"]
-                        if not text:
+                        if not _char["text"]:
                             continue
-                        search_string += text
-                        search_map[index] = {
-                            "page": _char["page"],
-                            "text": text,
-                            "box": _char["box"],
-                            "index": element["index"],
-                            "index_type": "TABLE",
-                        }
-                        index += 1
-                    search_string += separate
-                    index += separate_len
+                        builder.add(_char["text"], _char["box"], element_index, element_page, _char["page"], TABLE)
+                    builder.add_separator(separate, element_index, element_page)
             else:
                 last_char = None
                 for _char in element["chars"]:
-                    text = _char["text"]
-                    if not text:
+                    if not _char["text"]:
                         continue
-                    search_string += text
-                    search_map[index] = {
-                        "page": _char["page"],
-                        "text": text,
-                        "box": _char["box"],
-                        "index": element["index"],
-                        "index_type": "PARAGRAPH",
-                    }
-                    last_char = search_map[index]
-                    index += 1
+                    builder.add(_char["text"], _char["box"], element_index, element_page, _char["page"], PARAGRAPH)
+                    last_char = _char
                 if last_char:
-                    search_string += para_separate
-                    search_map[index] = deepcopy(last_char)
-                    search_map[index]["text"] = para_separate
-                    index += para_separate_len
-            char_idx_range_on_page[element_page].append(index)
-        char_idx_range_on_page = {k: [min(v), max(v)] for k, v in char_idx_range_on_page.items()}
-        return search_string, search_map, char_idx_range_on_page
+                    builder.add(
+                        para_separate, last_char["box"], element_index, element_page, last_char["page"], PARAGRAPH
+                    )
+        return builder
 
     def search(self, keyword):
         find_res = []
-        search_string = self.get_search_string()
-        if search_string is None:
+        char_index = self.get_char_index()
+        if char_index is None:
             return find_res
 
-        search_map_data = {}
-
-        for item in re.finditer(re.escape("".join(keyword.split())), search_string):
-            start = item.start()
-            end = item.end()
-            item_chars = []
-            for idx in range(start, end):
-                _char = self.get_char_in_search_map(idx, search_map_data)
-                item_chars.append(_char)
+        for item in re.finditer(re.escape("".join(keyword.split())), char_index.search_string()):
+            item_chars = char_index.chars(range(item.start(), item.end()))
             merged_chars = PdfinsightReader.merge_char_rects(item_chars, pos_key="box")
             search_items = []
             for page, rects in merged_chars.items():
@@ -414,29 +315,16 @@ class PDFCache:
         return find_res
 
     def get_text_in_box(self, box, get_text):
-        page = str(box["page"])
-        char_idx_range = self.get_char_idx_range(page)
-        if char_idx_range is None:
+        char_index = self.get_char_index()
+        if char_index is None:
             raise CustomError(_("The document is being parsed and cannot get text from it."))
-        if not char_idx_range:
-            logging.info(f"no page cache for file_id:{self.file.id}, page:{page}")
+        if not char_index.page_range(box["page"]):
+            logging.info(f"no page cache for file_id:{self.file.id}, page:{box['page']}")
             return None, None
 
-        chars = []
-        cache_key_start = char_idx_range[0] // self.SEARCH_MAP_SIZE_PER_FILE
-        cache_key_end = (char_idx_range[1] - 1) // self.SEARCH_MAP_SIZE_PER_FILE
-        for cache_key in range(cache_key_start, cache_key_end + 1):
-            chars_in_cache_file = self.get_search_map(cache_key)
-            chars.extend(
-                {
-                    idx: char
-                    for idx, char in chars_in_cache_file.items()
-                    if char_idx_range[0] <= int(idx) < char_idx_range[1]
-                }.values()
-            )
-        chars = chars_in_box_by_center(box["box"], texts=chars, with_white_chars=True)
+        chars = char_index.chars(char_index.rows_in_box(box["page"], box["box"]))
         chars = PDFUtil.get_sorted_chars(chars)
-        # gen_search_string在每个段落后面补了一个换行符,使框选了多个段落时起到分隔作用
+        # _gen_char_index在每个段落后面补了一个换行符,使框选了多个段落时起到分隔作用
         # 为使多框合并标注模式下,多个框的文本之间也有换行符,不能pop掉最后一个\n
         # if chars and chars[-1]['text'] == '\n':
         #     chars.pop()
@@ -483,10 +371,10 @@ class PDFCache:
         logging.info(f"pdf_cache created for {self.file.id}")
 
     def create_pdf_search_cache(self, pdfinsight, pdf_doc):
-        search_string, search_map, char_idx_range_on_page = self._gen_search_string(pdfinsight, pdf_doc)
-        self._save_search_string(search_string)
-        self._save_search_map(search_map)
-        self._save_char_idx_range(char_idx_range_on_page)
+        builder = self._gen_char_index(pdfinsight, pdf_doc)
+        offsets = builder.dump(self.char_index_path)
+        with atomic_write(self.char_page_offset_path) as file_obj:
+            file_obj.write(encode_data(offsets))
 
     def create_chapter_info_cache(self, pdfinsight, pdf_doc):
         info = []
@@ -72,6 +72,11 @@ class BaseProphet:
     def dataset_dir(self):
         return self.base_dir.joinpath(f"{self._mold.id}", self._version_id, "answers")
 
+    @property
+    def model_data_key(self) -> tuple:
+        """进程内模型数据缓存的分组, schema 或模型版本变化后不再命中"""
+        return self._mold.id, self._mold.checksum, self._version_id
+
     @property
     def model_data_dir(self):
         return self.base_dir.joinpath(f"{self._mold.id}", self._version_id, "predictors")
@@ -172,6 +177,10 @@ class BaseProphet:
         )
 
         self.predict_answer()
+        if reader := self.predictor_context.reader:
+            logger.info(
+                f"parse cache of {reader.path}: {reader.parse_cache.hits} hits, {reader.parse_cache.misses} misses"
+            )
         answer_items = self.collect_answer_items()
 
         return self.build_question_answer(answer_items)
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import logging
 import os
@@ -316,6 +317,10 @@ async def gen_customer_answer(mid, start=0, end=0):
         await generate_customer_answer(question.id)
 
 
+MAX_PROPHET_CONFIGS = 64
+_prophet_configs: dict[tuple, tuple] = {}
+
+
 def create_predictor_prophet(mold, model_version=None, special_rules=None, **kwargs):
     version_id = model_version.id if model_version else 0
     predictor_framework = (
@@ -325,7 +330,7 @@ def create_predictor_prophet(mold, model_version=None, special_rules=None, **kwa
     )
     custom_predictors = model_version.predictors if model_version else []
     if predictor_framework == "2.0":
-        utils_module, prophet_config = collect_prophet_config(custom_predictors, mold)
+        utils_module, prophet_config = cached_prophet_config(custom_predictors, mold, version_id)
         prophet_config = filter_prophet_config(prophet_config, special_rules)
         instance = utils_module.make_prophet_instance(prophet_config, mold, version_id)
     else:
@@ -371,10 +376,26 @@ def get_depends_config(predictor_options: list, config: dict):
     return new_options
 
 
+def cached_prophet_config(custom_predictors, mold, version_id):
+    """
+    按 (mold id, mold checksum, 模型版本 id, 界面配置) 缓存合并后的 prophet 配置
+    返回的配置可以增删 predictor_options, 其中每项配置仍是共享的
+    """
+    custom_checksum = hashlib.md5(json.dumps(custom_predictors, sort_keys=True).encode()).hexdigest()
+    key = (mold.id, mold.checksum, version_id, custom_checksum)
+    if key not in _prophet_configs:
+        if len(_prophet_configs) >= MAX_PROPHET_CONFIGS:
+            _prophet_configs.clear()
+        _prophet_configs[key] = collect_prophet_config(deepcopy(custom_predictors), mold)
+    utils_module, prophet_config = _prophet_configs[key]
+    return utils_module, {**prophet_config, "predictor_options": list(prophet_config["predictor_options"])}
+
+
 def collect_prophet_config(custom_predictors, mold):
     utils_module_from_code = import_module("remarkable.predictor")
     try:
-        prophet_config = utils_module_from_code.load_prophet_config(mold)
+        # 代码中的配置是模块级变量, 复制一份再修改
+        prophet_config = dict(utils_module_from_code.load_prophet_config(mold))
     except ModuleNotFoundError as exp:
         logger.warning(exp)
         logger.warning("Will use default prophet config instead")
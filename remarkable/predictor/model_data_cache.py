@@ -0,0 +1,64 @@
+"""
+SchemaPredictor 模型数据的进程内缓存
+
+按 (mold id, mold checksum, 模型版本 id) 分组, 组内按模型文件缓存 pickle 字节,
+文件大小或修改时间变化(dump_model_data 重新写入)后重新读取, 只保留最近使用的若干组.
+每次取出时 pickle.loads 得到独立的一份(比 deepcopy 快得多), 模型加载时改写(如注入特征计数)
+不会影响缓存和其他文档的预测; 省掉的是读文件的 IO.
+"""
+
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MAX_GROUPS = 16
+
+
+class ModelDataCache:
+    def __init__(self, max_groups=MAX_GROUPS):
+        self.max_groups = max_groups
+        self.hits = 0
+        self.misses = 0
+        self._groups: OrderedDict[tuple, dict[Path, tuple[tuple, bytes]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, path: Path) -> dict | None:
+        """返回新反序列化的模型数据, 调用方可以随意修改; path 不存在时返回 None"""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            group = self._groups.setdefault(key, {})
+            self._groups.move_to_end(key)
+            entry = group.get(path)
+            if entry and entry[0] == signature:
+                self.hits += 1
+                return pickle.loads(entry[1])
+
+        raw = path.read_bytes()
+        with self._lock:
+            self.misses += 1
+            self._groups.setdefault(key, {})[path] = (signature, raw)
+            while len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+        return pickle.loads(raw)
+
+    def invalidate(self, key: tuple, path: Path | None = None):
+        with self._lock:
+            if path is None:
+                self._groups.pop(key, None)
+            elif key in self._groups:
+                self._groups[key].pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._groups.clear()
+
+
+model_data_cache = ModelDataCache()
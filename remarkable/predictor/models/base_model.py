@@ -47,14 +47,16 @@ SUPPLEMENTARY_UNIT = PatternCollection(
         r"[（\(【](合并，元)[】\)）]",
         r"[（\(【](元[/∕／]股、元[/∕／]注册资本)[】\)）]",
         r"[（\(【]?(元股)[】\)）]?",
-    ]
+    ],
+    combine=True,
 )
 P_HEADER_CELL_UNIT = PatternCollection(
     [
         rf"[（\(](?P<dst>{UNIT_PATTERN})[\)）]",
         rf"[（（\(]?(?P<dst>{PERCENT_PATTERN})[\)）]?",
         r"人民币(?P<dst>元)",
-    ]
+    ],
+    combine=True,
 )
 
 
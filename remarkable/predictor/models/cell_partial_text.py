@@ -152,13 +152,13 @@ class CellPartialText(PartialText):
 
     def extract_by_model(self, column, element, vmsp_input, split_pattern, keep_separator, neglect_answer_patterns):
         element_results = []
-        model_data = self.get_model_data(column=column)
-        if not model_data:
+        vmsp_features = self.get_vmsp_features(column=column)
+        if not vmsp_features:
             logger.debug("<cell_partial_text>: no model exists, return!!!")
             return element_results
         use_answer_pattern = self.get_config("use_answer_pattern", default=True, column=column)
         need_match_length = self.get_config("need_match_length", default=True, column=column)
-        answer_items = VMSP.extract_answers(vmsp_input, model_data, use_answer_pattern, need_match_length)
+        answer_items = VMSP.extract_answers(vmsp_input, vmsp_features, use_answer_pattern, need_match_length)
         logger.debug(f"<cell_partial_text>: extract_answers by VMSP, length of answer items: {len(answer_items)}")
         for item in answer_items:
             chars = vmsp_input.chars[item.start : item.end]
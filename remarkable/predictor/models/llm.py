@@ -1,11 +1,13 @@
 import logging
 from functools import cached_property
+from itertools import batched
 from typing import Generic, Iterator, Literal, Type
 
 from pdfparser.utils.autodoc.itable_util import deepcopy
 from pydantic import Field, create_model
 
-from remarkable.common.util import T, clean_txt
+from remarkable.common.util import T
+from remarkable.config import get_config
 from remarkable.db import pw_db
 from remarkable.predictor.eltype import ElementClassifier
 from remarkable.predictor.models.base_model import BaseModel
@@ -14,9 +16,10 @@ from remarkable.predictor.schema_answer import (
     ParagraphResult,
     PredictorResult,
 )
-from remarkable.pw_models.embedding import Embedding
-from remarkable.service.chatgpt import LLMSchema, OpenAIClient
+from remarkable.pw_models.embedding import Embedding, FileVectorIndex, query_embeddings
+from remarkable.service.chatgpt import LLMSchema
 from remarkable.service.embedding import Document
+from remarkable.service.llm_dispatcher import llm_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +40,9 @@ DEFAULT_SYSTEM_PROMPT = """
 {schema}
     """
 
+# 非 multi_elements 时每批并发请求的候选元素块数
+DEFAULT_LLM_WINDOW = 4
+
 
 class LLModel(BaseModel):
     def __init__(self, options, schema, predictor=None):
@@ -47,10 +53,6 @@ class LLModel(BaseModel):
         )
         self.assistant = self.get_config("assistant", [])  #
 
-    @cached_property
-    def llm_client(self):
-        return OpenAIClient()
-
     @cached_property
     def field(self):
         if len(self.schema.path) > 2:
@@ -75,68 +77,101 @@ class LLModel(BaseModel):
     def train(self, dataset, **kwargs):
         pass
 
-    def extract_answer(self, text: str) -> LLMAnswerSchema:
+    def build_messages(self, text: str) -> list[dict]:
         messages = [{"role": "system", "content": f"{self.system_prompt}\n{self.prompt}"}]
         messages.extend(self.assistant)
         messages.append({"role": "user", "content": text})
-        answer = self.model.from_llm(self.llm_client.send_message(messages))
+        return messages
+
+    def parse_answer(self, content: str) -> LLMAnswerSchema:
+        answer = self.model.from_llm(content)
         if not answer.answer:
             raise ValueError(f"No answer found, reason={answer.reason}")
         return answer
 
+    @staticmethod
+    def load_vector_index(fid: int) -> FileVectorIndex | None:
+        """文件的块数不超过 ai.llm.vector_index_limit 时读出全部向量, 同一文档的各字段在进程内检索"""
+        limit = get_config("ai.llm.vector_index_limit") or 0
+        if limit <= 0:
+            return None
+        with pw_db.allow_sync():
+            rows = list(Embedding.file_vectors_query(fid, limit).execute())
+        return Embedding.build_file_index(rows, limit)
+
     def get_next_element(self, elements: list[dict]) -> Iterator[dict]:
         """优先用初步定位的答案, 没有的话用向量搜索的答案"""
         if elements:
             for element in elements:
                 yield element
         else:
-            with pw_db.allow_sync():
-                records = list(
-                    Embedding.semantic_search_query(
-                        self.predictor.prophet.metadata["fid"], self.field, limit=20
-                    ).execute()
-                )
+            fid = self.predictor.prophet.metadata["fid"]
+            index = self.pdfinsight.parse_cache.get_or_create(("embedding", fid), lambda: self.load_vector_index(fid))
+            if index is not None:
+                records = index.search(query_embeddings([self.field]), limit=20)[0]
+            else:
+                with pw_db.allow_sync():
+                    records = list(Embedding.semantic_search_query(fid, self.field, limit=20).execute())
 
             for record in records:
                 _, element = self.pdfinsight.find_element_by_index(record["index"])
                 yield element
 
-    def predict_schema_answer(self, elements) -> list[dict[str, list[PredictorResult]]]:
-        result = []
+    def iter_candidates(self, elements) -> Iterator[tuple[dict, str, PredictorResult]]:
         for element in self.get_next_element(elements):
             if ElementClassifier.like_paragraph(element):
-                clean_text = clean_txt(element.get("text"))
-                predict_result = ParagraphResult(element, element["chars"])
+                yield element, self.pdfinsight.clean_text(element), ParagraphResult(element, element["chars"])
             elif ElementClassifier.is_table(element):
-                clean_text = Document.get_table_markdown(element, remove_num=False)
-                predict_result = LLMTableResult(element, [])
+                yield element, Document.get_table_markdown(element, remove_num=False), LLMTableResult(element, [])
             else:
                 logger.error(f"Not supported element class: {element['class']}")
-                continue
-            try:
-                answer = self.extract_answer(clean_text)
-                if isinstance(answer.answer, list):
+
+    def build_results(self, element, predict_result, answer: LLMAnswerSchema) -> list:
+        if not isinstance(answer.answer, list):
+            if ElementClassifier.is_table(element):
+                predict_result.text = answer.answer
+            return [self.create_result(element_results=[predict_result], text=answer.answer)]
+
+        res = []
+        for records in answer.answer:
+            ans = {}
+            for record in records:
+                if ElementClassifier.is_table(element):
+                    predict_result = deepcopy(predict_result)
+                    predict_result.text = record.answer
+                ans[record.name] = [
+                    self.create_result(element_results=[predict_result], text=record.answer, column=record.name)
+                ]
+            res.append(ans)
+        return res
+
+    def predict_schema_answer(self, elements) -> list[dict[str, list[PredictorResult]]]:
+        """
+        候选元素块的请求经 llm_dispatcher 一批并发发出:
+        multi_elements 时所有候选为一批, 否则每批 llm_window 个, 某一批得到答案后不再请求后面的元素块
+        """
+        candidates = self.iter_candidates(elements)
+        window = self.get_config("llm_window", None if self.multi_elements else DEFAULT_LLM_WINDOW)
+        result = []
+        for batch in batched(candidates, window) if window else [tuple(candidates)]:
+            responses = llm_dispatcher.run(
+                llm_dispatcher.gather(
+                    [
+                        # 没有答案也是有效的回复, 只在无法按 schema 解析时不缓存
+                        {"messages": self.build_messages(text), "schema": self.field, "validate": self.model.from_llm}
+                        for _, text, _ in batch
+                    ]
+                )
+            )
+            for (element, _, predict_result), response in zip(batch, responses):
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    res = self.build_results(element, predict_result, self.parse_answer(response))
+                except Exception as e:
+                    logger.exception(e)
                     res = []
-                    for records in answer.answer:
-                        ans = {}
-                        for record in records:
-                            if ElementClassifier.is_table(element):
-                                predict_result = deepcopy(predict_result)
-                                predict_result.text = record.answer
-                            ans[record.name] = [
-                                self.create_result(
-                                    element_results=[predict_result], text=record.answer, column=record.name
-                                )
-                            ]
-                        res.append(ans)
-                else:
-                    if ElementClassifier.is_table(element):
-                        predict_result.text = answer.answer
-                    res = [self.create_result(element_results=[predict_result], text=answer.answer)]
-            except Exception as e:
-                logger.exception(e)
-                res = []
-            result.extend(res)
-            if result and not self.multi_elements:
-                break
+                result.extend(res)
+                if result and not self.multi_elements:
+                    return result
         return result
@@ -1,17 +1,20 @@
 import logging
 from collections import Counter
+from functools import cached_property
 
 from remarkable import config
 from remarkable.common.constants import Language
 from remarkable.common.multiprocess import run_in_multiprocess
 from remarkable.common.pattern import PatternCollection
 from remarkable.common.util import clean_txt, index_in_space_string
+from remarkable.pdfinsight.normalized_text import NormalizedText
 from remarkable.predictor.dataset import DatasetItem
 from remarkable.predictor.eltype import ElementType
 from remarkable.predictor.models.base_model import BaseModel
 from remarkable.predictor.schema_answer import CharResult, ParagraphResult
 from remarkable.service.predictor import (
     PatternString,
+    VMSPPattern,
     _batch_split_text_by_boundary,
     extract_feature_by_group,
     generate_answer_boundary,
@@ -23,22 +26,25 @@ from remarkable.service.predictor import (
 logger = logging.getLogger(__name__)
 
 
-def iter_split_text_by_boundary(text, boundary):
+def iter_split_text_by_boundary(text, boundary, vmsp_input=None):
     lword, rword = boundary
+    pattern_string = vmsp_input.pattern_string if vmsp_input else PatternString
     for _left_text, _other_text in _batch_split_text_by_boundary(text, lword, "left") or []:
         for _answer_text, _right_text in _batch_split_text_by_boundary(_other_text, rword, "right") or []:
-            yield VMSPAnswer(_left_text, _answer_text, _right_text)
+            yield VMSPAnswer(_left_text, _answer_text, _right_text, pattern_string=pattern_string)
 
 
 class VMSPInput:
-    def __init__(self, content, chars, element):
+    def __init__(self, content, chars, element, normalized: NormalizedText | None = None):
         self.content = content
-        self.clean_content = clean_txt(content)
+        self.normalized = normalized or NormalizedText(content)
+        self.clean_content = self.normalized.text
         self.chars = chars
         self.element = element
 
         self.start = None
         self.end = None
+        self._pattern_strings = {}
 
     @classmethod
     def from_element(cls, element, pdfinsight):
@@ -55,7 +61,7 @@ class VMSPInput:
             content = element.get("text", "")
             chars = element.get("chars", [])
 
-        return VMSPInput(content, chars, element)
+        return VMSPInput(content, chars, element, normalized=pdfinsight.normalize(content) if pdfinsight else None)
 
     @classmethod
     def from_cell(cls, cell, element):
@@ -66,6 +72,12 @@ class VMSPInput:
     def get_text(self, start, end):
         return "".join([char["text"] for char in self.chars[start:end]])
 
+    def pattern_string(self, text) -> PatternString:
+        """同一段内容按不同边界切分出的左/右文本多有重复, 分词结果在各特征、各字段间共用"""
+        if text not in self._pattern_strings:
+            self._pattern_strings[text] = PatternString(text)
+        return self._pattern_strings[text]
+
 
 class VMSPOutput:
     def __init__(self, vmsp_input, start, end):
@@ -79,22 +91,23 @@ class VMSPOutput:
 
 
 class VMSPAnswer:
-    def __init__(self, left_text, answer_text, right_text):
+    def __init__(self, left_text, answer_text, right_text, pattern_string=PatternString):
         self.left_text = left_text
         self.answer_text = answer_text
         self.right_text = right_text
+        self._pattern_string = pattern_string
 
-    @property
+    @cached_property
     def left_pattern(self):
-        return PatternString(self.left_text)
+        return self._pattern_string(self.left_text)
 
-    @property
+    @cached_property
     def answer_pattern(self):
-        return PatternString(self.answer_text)
+        return self._pattern_string(self.answer_text)
 
-    @property
+    @cached_property
     def right_pattern(self):
-        return PatternString(self.right_text)
+        return self._pattern_string(self.right_text)
 
     def is_valid(self, feature, use_answer_pattern=True, need_match_length=True):
         if need_match_length and not match_length(self.answer_pattern, feature.length_counter):
@@ -120,11 +133,13 @@ class VMSPAnswer:
 
         return True
 
-    def get_text_range(self, content, ignore_offset):
+    def get_text_range(self, content, ignore_offset, normalized: NormalizedText | None = None):
         start = len(self.left_pattern)
         end = len(self.left_pattern) + len(self.answer_pattern)
         if ignore_offset:
             return start, end
+        if normalized:
+            return normalized.span(start, end)
         return index_in_space_string(content, (start, end))
 
 
@@ -132,35 +147,21 @@ class VMSPFeature:
     P_INVALID_LEFT = PatternCollection([r"^.$", r"^[^\u4e00-\u9fa5\w]*$"])
 
     def __init__(self, data):
+        """模型数据在这里编译一次, 之后对每个候选切分只做匹配"""
         self.data = data
-
-    @property
-    def answer_boundary(self):
-        return self.data.get("boundary", [])
-
-    @property
-    def answer_patterns(self):
-        return self.data.get("answer_patterns", [])
-
-    @property
-    def left_patterns(self):
-        patterns = self.data.get("left_patterns", [])
-        ret = [x for x in patterns if not self.P_INVALID_LEFT.nexts("".join(x))]
-        return ret
-
-    @property
-    def right_patterns(self):
-        return self.data.get("right_patterns", [])
-
-    @property
-    def length_counter(self):
-        return self.data.get("answer_length", Counter())
+        self.answer_boundary = data.get("boundary", [])
+        self.answer_patterns = [VMSPPattern(x) for x in data.get("answer_patterns", [])]
+        self.left_patterns = [
+            VMSPPattern(x) for x in data.get("left_patterns", []) if not self.P_INVALID_LEFT.nexts("".join(x))
+        ]
+        self.right_patterns = [VMSPPattern(x) for x in data.get("right_patterns", [])]
+        self.length_counter = data.get("answer_length", Counter())
 
     def extract_answers(self, vmsp_input, use_answer_pattern, need_match_length):
         results = []
-        for vmsp_answer in iter_split_text_by_boundary(vmsp_input.clean_content, self.answer_boundary):
+        for vmsp_answer in iter_split_text_by_boundary(vmsp_input.clean_content, self.answer_boundary, vmsp_input):
             if vmsp_answer.is_valid(self, use_answer_pattern, need_match_length):
-                sp_start, sp_end = vmsp_answer.get_text_range(vmsp_input.content, False)
+                sp_start, sp_end = vmsp_answer.get_text_range(vmsp_input.content, False, vmsp_input.normalized)
                 vmsp_output = VMSPOutput(vmsp_input, sp_start, sp_end)
                 results.append(vmsp_output)
 
@@ -188,11 +189,15 @@ class VMSP:
     def extract_answer_texts_for_cell(cls, elements, box):
         return cls.extract_answer_texts(elements, box)
 
+    @staticmethod
+    def compile_features(feature_data) -> list[VMSPFeature]:
+        return [item if isinstance(item, VMSPFeature) else VMSPFeature(item) for item in feature_data]
+
     @classmethod
     def extract_answers(cls, vmsp_input, feature_data, use_answer_pattern, need_match_length):
+        """feature_data: 模型数据或 compile_features 编译后的特征"""
         answers = []
-        vmsp_features = [VMSPFeature(item) for item in feature_data]
-        for feature in vmsp_features:
+        for feature in cls.compile_features(feature_data):
             if not cls.is_valid_feature(feature, use_answer_pattern):
                 logger.debug("valid feature, please check...")
                 continue
@@ -239,6 +244,7 @@ class PartialText(BaseModel):
         self.merge_char_result = self.get_config("merge_char_result", True)
         self.extract_other_element_type = self.get_config("extract_other_element_type", [])
         self.other_element_type_page_range = self.get_config("other_element_type_page_range", [])
+        self._vmsp_features = {}
 
     @property
     def is_english(self):
@@ -250,6 +256,7 @@ class PartialText(BaseModel):
             features = self.extract_feature(col, dataset, workers=kwargs.get("workers"))
             model_data[col] = features
         self.model_data = model_data
+        self._vmsp_features = {}
 
     def get_model_data(self, column=None):
         model_data = super().get_model_data(column=column) or Counter()
@@ -266,6 +273,11 @@ class PartialText(BaseModel):
 
         return model_data
 
+    def get_vmsp_features(self, column=None) -> list[VMSPFeature]:
+        if column not in self._vmsp_features:
+            self._vmsp_features[column] = VMSP.compile_features(self.get_model_data(column=column))
+        return self._vmsp_features[column]
+
     def print_model(self):
         print("\n==== model data of %s ====" % self.schema.path)
         for key, features in self.model_data.items():
@@ -402,13 +414,13 @@ class PartialText(BaseModel):
 
     def extract_by_model(self, column, element, vmsp_input, split_pattern, keep_separator, neglect_answer_patterns):
         element_results = []
-        model_data = self.get_model_data(column=column)
-        if not model_data:
+        vmsp_features = self.get_vmsp_features(column=column)
+        if not vmsp_features:
             logger.debug("no model exists, return!!!")
             return element_results
         use_answer_pattern = self.get_config("use_answer_pattern", default=True, column=column)
         need_match_length = self.get_config("need_match_length", default=True, column=column)
-        answer_items = VMSP.extract_answers(vmsp_input, model_data, use_answer_pattern, need_match_length)
+        answer_items = VMSP.extract_answers(vmsp_input, vmsp_features, use_answer_pattern, need_match_length)
         logger.debug(f"extract_answers by VMSP, length of answer items: {len(answer_items)}")
         for item in answer_items:
             chars = vmsp_input.chars[item.start : item.end]
@@ -448,7 +460,7 @@ class PartialText(BaseModel):
             else:
                 c_start, c_end = match.span()
             if clean_text:
-                sp_start, sp_end = index_in_space_string(vmsp_input.content, (c_start, c_end))
+                sp_start, sp_end = vmsp_input.normalized.span(c_start, c_end)
             else:
                 sp_start, sp_end = c_start, c_end
 
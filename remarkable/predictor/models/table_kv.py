@@ -331,13 +331,17 @@ def is_valid_cell(idx, cell):
 
 
 def regroup_table_element(element):
-    """尝试将可能合并的单元格分割开，重组成新的元素块"""
-    ret_elt = deepcopy(element)
+    """尝试将可能合并的单元格分割开，重组成新的元素块; 没有可分割的单元格时返回原元素块(可命中文档级的表格解析缓存)"""
     tbl = PdfinsightTable(element)
+    split_cells = []
     for _, row in tbl.cells.items():
         cells = [c for cidx, c in sorted(row.items()) if not c.get("dummy")]
-        for cell in split_cell(cells):
-            ret_elt["cells"][cell["index"]] = deepcopy(cell)
+        split_cells.extend(split_cell(cells))
+    if not split_cells:
+        return element
+    ret_elt = deepcopy(element)
+    for cell in split_cells:
+        ret_elt["cells"][cell["index"]] = deepcopy(cell)
     return ret_elt
 
 
@@ -21,6 +21,7 @@ from remarkable.pdfinsight.reader import PdfinsightSyllabus
 from remarkable.pdfinsight.text_util import clear_syl_title
 from remarkable.plugins.predict.common import get_element_candidates
 from remarkable.predictor.dataset import DatasetItem
+from remarkable.predictor.model_data_cache import model_data_cache
 from remarkable.predictor.models.auto import AutoModel
 from remarkable.predictor.models.base_model import (
     find_currency_element_result,
@@ -457,11 +458,12 @@ class SchemaPredictor(BasePredictor):
     def load_model_data(self):
         if self.model_data or not self.config:
             return
-        if not self.model_data_path.exists():
+        model_data = model_data_cache.get(self.prophet.model_data_key, self.model_data_path)
+        if model_data is None:
             logger.warning(f"can't find model features: {self.model_data_path}")
         else:
-            with open(self.model_data_path, "rb") as model_fp:
-                self.model_data = pickle.load(model_fp)
+            # 缓存每次返回新反序列化的一份, 部分模型(如 syllabus_based、main_business)加载时的改写互不影响
+            self.model_data = model_data
 
     def dump_model_data(self):
         if self.config:
@@ -476,6 +478,7 @@ class SchemaPredictor(BasePredictor):
                         model_data[model_name].update(m_data)
             with open(self.model_data_path, "wb") as model_fp:
                 pickle.dump(model_data, model_fp)
+            model_data_cache.invalidate(self.prophet.model_data_key, self.model_data_path)
 
         for sub_predictor in self.sub_predictors:
             sub_predictor.dump_model_data()
@@ -969,7 +972,7 @@ class SchemaPredictor(BasePredictor):
         near_by = {"step": -1, "amount": 3, "aim_types": ["PARAGRAPH"]}
         prev_elts = self.pdfinsight.find_elements_near_by(elt["index"], **near_by)
         anchor_pattern = PatternCollection(self.config.get("anchor_regs", []))
-        if any(anchor_pattern.search("".join([clean_txt(i["text"]) for i in prev_elts[::-1]]))):
+        if any(anchor_pattern.search("".join([self.pdfinsight.clean_text(i) for i in prev_elts[::-1]]))):
             return True
         return False
 
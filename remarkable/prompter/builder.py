@@ -1,3 +1,4 @@
+import hashlib
 import json
 import os
 import shutil
@@ -16,6 +17,8 @@ from remarkable.pdfinsight.reader import PdfinsightReader
 from remarkable.prompter.element import element_info
 from remarkable.prompter.impl.v2 import AnswerPrompterV2
 
+ELEMENTS_MANIFEST = "manifest.json"
+
 
 class PrompterBuilderBase:
     def __init__(self, schema_id: int, vid: int = 0):
@@ -53,6 +56,22 @@ def load_file_elements(path: Path | str):
     return json.loads(dctx.decompress(path.read_bytes()).decode())
 
 
+def elements_checksum(pdfinsight: str, answer) -> str:
+    """文件导出的元素块只取决于 interdoc 和答案"""
+    return hashlib.md5(f"{pdfinsight}:{json.dumps(answer, sort_keys=True)}".encode()).hexdigest()
+
+
+def load_elements_manifest(dst_dir: Path) -> dict[int, str]:
+    path = dst_dir / ELEMENTS_MANIFEST
+    if not path.exists():
+        return {}
+    return {int(fid): checksum for fid, checksum in json.loads(path.read_text()).items()}
+
+
+def save_elements_manifest(dst_dir: Path, manifest: dict[int, str]):
+    (dst_dir / ELEMENTS_MANIFEST).write_text(json.dumps({str(fid): checksum for fid, checksum in manifest.items()}))
+
+
 def load_file(dst_dir: str, file_id: int, pdfinsight_path: str, answer):
     timestamp = time.time()
     logger.info(f"start load file {file_id}")
@@ -100,22 +119,43 @@ class AnswerPrompterBuilder(PrompterBuilderBase):
     def load(self):
         return AnswerPrompterV2(self.schema_id, self.vid)
 
-    def update(self, mold_data, rows):
+    def update(self, mold_data, rows, incremental=False):
         """
         1. 读取训练集的 interdoc 文档，记录每个元素块的 `关键字` 和 `正/负例标记`
         2. 汇总生成每个 attr 的 ngrams （在 redis 中）
         注：读取过的文件会记录在 redis 中，不清空的话，不会重新读取已读过的内容
+        incremental: 只导出 interdoc 或答案有变化的文件, 并删除不在 rows 中的文件
         """
         if not mold_data:
             logger.error("can't find mold")
             return False
+        manifest = load_elements_manifest(self.elements_dump_dir)
+        new_manifest = {}
         tasks = []
         for file_id, pdfinsight, answer in rows:
             pdfinsight_path = localstorage.get_path(pdfinsight)
             if not answer or not os.path.exists(pdfinsight_path):
                 continue
+            checksum = new_manifest[file_id] = elements_checksum(pdfinsight, answer)
+            dump_path = self.elements_dump_dir / f"{file_id}.json.zst"
+            if incremental and manifest.get(file_id) == checksum and dump_path.exists():
+                continue
+            dump_path.unlink(missing_ok=True)
             tasks.append((self.elements_dump_dir.as_posix(), file_id, pdfinsight_path, answer))
+        if incremental:
+            for file_id in manifest.keys() - new_manifest.keys():
+                (self.elements_dump_dir / f"{file_id}.json.zst").unlink(missing_ok=True)
         logger.info(f"find {len(tasks)} documents to update")
         for _ in run_by_batch(load_file, tasks, workers=(config.get_config("prompter.workers") or 0)):
             pass
+        if not incremental:
+            new_manifest = manifest | new_manifest
+        save_elements_manifest(
+            self.elements_dump_dir,
+            {
+                file_id: checksum
+                for file_id, checksum in new_manifest.items()
+                if (self.elements_dump_dir / f"{file_id}.json.zst").exists()
+            },
+        )
         return tasks
@@ -0,0 +1,164 @@
+"""
+定位模型的增量训练
+
+全量训练(extract_train_feature + train)之后, 标注有少量新增/修改时:
+1. AnswerPrompterBuilder.update(incremental=True) 只重新导出 interdoc 或答案有变化的文件(elements/manifest.json)
+2. 每个文件用已有的 vectorizer 单独提取特征(与预测时一致), 按文件缓存在 feature/files/ 下, 校验值不变时直接复用
+3. 只重新训练正例有变化的字段, 并以原模型的系数为初值(warm start)
+
+vectorizer 的词表和 idf 不变, 新文件中的新词不会进入特征, 新数据积累较多后仍需全量训练.
+"""
+
+import logging
+import pickle
+import time
+
+import numpy as np
+from scipy.sparse import vstack
+
+from remarkable import config
+from remarkable.common.multiprocess import run_in_multiprocess
+from remarkable.prompter.builder import load_elements_manifest, load_file_elements
+from remarkable.prompter.registry import PrompterModel, model_root, prompter_models, rule_model_name
+from remarkable.prompter.utils import better_lr_train, extract_pred_feature, save_onnx_model
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_STATE = "incremental.pkl"
+
+
+def _file_features(schema_id, vid, model: PrompterModel, file_id: int, checksum: str, **kwargs) -> dict | None:
+    data = load_file_elements(model.root / "elements" / f"{file_id}.json.zst")
+    if not data:
+        return None
+    *_, rows = extract_pred_feature(schema_id, vid, dict_data={file_id: data}, save=False, model=model, **kwargs)
+    return {
+        "checksum": checksum,
+        "attrs": [item["attrs"] for _, item in sorted(data.items(), key=lambda x: int(x[0]))],
+        "rows": rows,
+    }
+
+
+def _vectorizer_key(model: PrompterModel) -> tuple:
+    """全量训练会重新生成 vectorizer, 之前缓存的特征和训练记录随之失效"""
+    return tuple(item for item in model.fingerprint if item[0] == "feature" and item[1] != "rules.pkl")
+
+
+def _has_model(model: PrompterModel, rule: str) -> bool:
+    name = rule_model_name(rule)
+    return any((model.model_dir / f"{name}{ext}").exists() for ext in (".ort", ".onnx", ".model"))
+
+
+def _train_rule(rule, train_data, y_train, init_weights, model_dir):
+    start_time = time.time()
+    model = better_lr_train(rule, train_data, y_train, init_weights=init_weights)
+    name = rule_model_name(rule)
+    # .ort 优先于 .onnx 加载, 需删掉旧的
+    (model_dir / f"{name}.ort").unlink(missing_ok=True)
+    save_onnx_model(model, model_dir / f"{name}.onnx", train_data.shape[1])
+    logger.info(f"incremental training for rule {rule} finished in {time.time() - start_time:.2f}s")
+    return rule
+
+
+def train_incremental(
+    schema_id,
+    vid=0,
+    context_length=1,
+    use_syllabuses=True,
+    tokenization=None,
+    separate_paragraph_table=True,
+) -> dict:
+    """返回 {"retrained": 重新训练的字段, "changed_files": 有变化的文件, "removed_files": 移除的文件}"""
+    start_time = time.time()
+    model = prompter_models.get(schema_id, vid)
+    manifest = load_elements_manifest(model_root(schema_id, vid) / "elements")
+    cache_dir = model.feature_dir / "files"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    state_path = model.feature_dir / INCREMENTAL_STATE
+    vectorizer_key = _vectorizer_key(model)
+    state = {"vectorizer": vectorizer_key, "files": {}, "rules": {}}
+    if state_path.exists():
+        with open(state_path, "rb") as file_obj:
+            state = pickle.load(file_obj)
+        if state.get("vectorizer") != vectorizer_key:
+            state = {"vectorizer": vectorizer_key, "files": {}, "rules": {}}
+
+    features = []
+    file_rules = {}
+    for file_id, checksum in sorted(manifest.items()):
+        cache_path = cache_dir / f"{file_id}.pkl"
+        feature = None
+        if cache_path.exists():
+            with open(cache_path, "rb") as file_obj:
+                feature = pickle.load(file_obj)
+            if feature["checksum"] != checksum or feature.get("vectorizer") != vectorizer_key:
+                feature = None
+        if feature is None:
+            feature = _file_features(
+                schema_id,
+                vid,
+                model,
+                file_id,
+                checksum,
+                context_length=context_length,
+                use_syllabuses=use_syllabuses,
+                tokenization=tokenization,
+                separate_paragraph_table=separate_paragraph_table,
+            )
+            if feature is None:
+                continue
+            feature["vectorizer"] = vectorizer_key
+            with open(cache_path, "wb") as file_obj:
+                pickle.dump(feature, file_obj)
+        features.append(feature)
+        file_rules[file_id] = {rule for attr in feature["attrs"] for rule in attr}
+
+    changed_files = sorted(
+        fid for fid, feature in zip(file_rules, features) if state["files"].get(fid) != feature["checksum"]
+    )
+    removed_files = sorted(state["files"].keys() - file_rules.keys())
+    for file_id in removed_files:
+        (cache_dir / f"{file_id}.pkl").unlink(missing_ok=True)
+
+    rules = sorted(set().union(*file_rules.values()))
+    if not state["files"]:
+        # 首次增量训练没有可比较的记录, 所有字段都以原模型为初值训练一遍
+        retrain = set(rules)
+    else:
+        retrain = {rule for rule in rules if not _has_model(model, rule)}
+        for file_id in changed_files + removed_files:
+            retrain |= state["rules"].get(file_id, set()) | file_rules.get(file_id, set())
+        retrain &= set(rules)
+
+    if retrain:
+        train_data = vstack([feature["rows"] for feature in features]).tocsr()
+        attrs = [attr for feature in features for attr in feature["attrs"]]
+        tasks = []
+        for rule in sorted(retrain):
+            y_train = np.array([rule in attr for attr in attrs], dtype=int)
+            init_weights = model.load_weights(rule) if _has_model(model, rule) else None
+            tasks.append((rule, train_data, y_train, init_weights, model.model_dir))
+        model.model_dir.mkdir(parents=True, exist_ok=True)
+        run_in_multiprocess(_train_rule, tasks, workers=(config.get_config("prompter.workers") or 0))
+
+    if rules != list(model.rules):
+        with open(model.feature_dir / "rules.pkl", "wb") as file_obj:
+            pickle.dump(rules, file_obj)
+    with open(state_path, "wb") as file_obj:
+        pickle.dump(
+            {
+                "vectorizer": vectorizer_key,
+                "files": {fid: feature["checksum"] for fid, feature in zip(file_rules, features)},
+                "rules": file_rules,
+            },
+            file_obj,
+        )
+    prompter_models.invalidate(schema_id, vid)
+
+    report = {"retrained": sorted(retrain), "changed_files": changed_files, "removed_files": removed_files}
+    logger.info(
+        f"incremental training for {schema_id=}, {vid=} finished in {time.time() - start_time:.2f}s, "
+        f"{len(retrain)}/{len(rules)} rules retrained, {len(changed_files)} files changed, "
+        f"{len(removed_files)} files removed: {report['retrained']}"
+    )
+    return report
@@ -0,0 +1,71 @@
+"""
+定位模型各字段逻辑回归的合并推理
+
+字段模型都是二分类 LogisticRegression, 把各字段正例的系数按列堆成 (特征数, 字段数) 的矩阵,
+稀疏特征矩阵(CSR)与之相乘一次即得到全部字段的得分, 不再为每个字段把整个特征矩阵转成稠密数组.
+"""
+
+import numpy as np
+from scipy.special import expit
+
+# skl2onnx 转换 LogisticRegression 得到的图中只会出现这些算子
+_ONNX_LR_OPS = {"LinearClassifier", "Normalizer", "ZipMap", "Cast", "Identity"}
+
+
+def weights_from_sklearn(model) -> tuple[np.ndarray, float] | None:
+    """正例概率为 sigmoid(coef @ x + intercept), 不是二分类逻辑回归时返回 None"""
+    classes = getattr(model, "classes_", None)
+    coef = getattr(model, "coef_", None)
+    if classes is None or coef is None or len(classes) != 2 or coef.shape[0] != 1:
+        return None
+    return np.asarray(coef[0], dtype=np.float32), float(model.intercept_[0])
+
+
+def weights_from_onnx(path) -> tuple[np.ndarray, float] | None:
+    """从 skl2onnx 导出的 LinearClassifier 中取出正例的系数, 图结构不认识时返回 None"""
+    import onnx
+    from onnx import helper
+
+    graph = onnx.load(str(path)).graph
+    if any(node.op_type not in _ONNX_LR_OPS for node in graph.node):
+        return None
+    nodes = [node for node in graph.node if node.op_type == "LinearClassifier"]
+    if len(nodes) != 1:
+        return None
+    attrs = {attr.name: helper.get_attribute_value(attr) for attr in nodes[0].attribute}
+    if list(attrs.get("classlabels_ints", [])) != [0, 1]:
+        return None
+    intercepts = np.asarray(attrs.get("intercepts", []), dtype=np.float64)
+    if len(intercepts) != 2:
+        return None
+    coefficients = np.asarray(attrs["coefficients"], dtype=np.float32).reshape(2, -1)
+    post_transform = attrs.get("post_transform", b"NONE")
+    if post_transform == b"SOFTMAX":
+        # softmax([z0, z1])[1] == sigmoid(z1 - z0)
+        return coefficients[1] - coefficients[0], float(intercepts[1] - intercepts[0])
+    if post_transform == b"LOGISTIC" and np.allclose(coefficients[0], -coefficients[1]):
+        # 二分类时第 0 行是第 1 行取反, 归一化前后正例概率都是 sigmoid(z1)
+        return coefficients[1], float(intercepts[1])
+    return None
+
+
+class FusedLinearScorer:
+    def __init__(self, rules: list[str], coefficients: list[np.ndarray], intercepts: list[float]):
+        self.rules = rules
+        if coefficients:
+            self.weights = np.ascontiguousarray(np.column_stack(coefficients), dtype=np.float32)
+        else:
+            self.weights = np.empty((0, 0), dtype=np.float32)
+        self.intercepts = np.asarray(intercepts, dtype=np.float64)
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    def scores(self, data) -> np.ndarray:
+        """(元素块数, 字段数) 的正例概率, 列顺序与 self.rules 一致"""
+        if data.shape[1] != self.n_features:
+            raise ValueError(f"feature size mismatch: {data.shape[1]} != {self.n_features}")
+        logits = np.asarray(data @ self.weights, dtype=np.float64)
+        logits += self.intercepts
+        return expit(logits)
@@ -0,0 +1,187 @@
+"""
+定位模型预测用到的 vectorizer 和各字段模型的常驻缓存
+
+按 (schema_id, vid) 缓存 rules.pkl、count_*.pkl 以及每个字段的 ONNX session(或 sklearn 模型),
+每次取用时比对 feature/models 目录下相关文件的大小和修改时间, 重新训练后自动重新加载.
+rpc 模式(prompter.mode: rpc)下由常驻的模型服务(remarkable/prompter/server.py)持有,
+celery worker 通过 prompter.rpc_address 调用, 单个文档的定位只剩特征提取和推理.
+"""
+
+import logging
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as rt
+
+from remarkable.common.exceptions import ModelDataNotFound
+from remarkable.common.util import limit_numpy_threads
+from remarkable.config import get_config
+from remarkable.prompter.linear import FusedLinearScorer, weights_from_onnx, weights_from_sklearn
+
+logger = logging.getLogger(__name__)
+
+VECTORIZER_NAMES = ("count_vocab", "count_paragraph", "count_table", "count_syllabuse")
+MODEL_EXTS = (".ort", ".onnx")
+
+
+def model_root(schema_id, vid=0) -> Path:
+    return Path(get_config("training_cache_dir")) / str(schema_id) / str(vid or 0)
+
+
+def rule_model_name(rule: str) -> str:
+    return rule.replace("/", "_") + "_lr"
+
+
+def model_fingerprint(root: Path) -> tuple:
+    """预测依赖的文件的 (文件名, 大小, 修改时间), 训练过程中产生的其他文件不参与比较"""
+    watched = {f"{name}.pkl" for name in ("rules", *VECTORIZER_NAMES)}
+    res = []
+    for sub_dir, names in (("feature", watched), ("models", None)):
+        path = root / sub_dir
+        if not path.is_dir():
+            continue
+        for entry in os.scandir(path):
+            if names is not None and entry.name not in names:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            res.append((sub_dir, entry.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(res))
+
+
+class PrompterModel:
+    def __init__(self, root: Path, fingerprint: tuple):
+        self.root = root
+        self.fingerprint = fingerprint
+        self.feature_dir = root / "feature"
+        self.model_dir = root / "models"
+        with open(self.feature_dir / "rules.pkl", "rb") as file_obj:
+            self.rules = pickle.load(file_obj)
+        self.vectorizers = {}
+        for name in VECTORIZER_NAMES:
+            path = self.feature_dir / f"{name}.pkl"
+            if path.exists():
+                with open(path, "rb") as file_obj:
+                    self.vectorizers[name] = pickle.load(file_obj)
+        # 字段模型首次预测时加载
+        self._predictors = {}
+        self._scorer: FusedLinearScorer | None = None
+        self._fallback_rules: list[str] = []
+        self._lock = threading.Lock()
+
+    def vectorizer(self, name: str):
+        if name not in self.vectorizers:
+            raise ModelDataNotFound(f"Can't find {name}.pkl in {self.feature_dir}")
+        return self.vectorizers[name]
+
+    def _load_predictor(self, rule: str):
+        from remarkable.prompter.utils import _safe_load_sklearn_model, init_onnx_session
+
+        name = rule_model_name(rule)
+        for ext in MODEL_EXTS:
+            onnx_path = self.model_dir / f"{name}{ext}"
+            if onnx_path.exists():
+                with limit_numpy_threads():
+                    return init_onnx_session(onnx_path)
+        return _safe_load_sklearn_model(self.model_dir / f"{name}.model")
+
+    def predictor(self, rule: str):
+        predictor = self._predictors.get(rule)
+        if predictor is None:
+            with self._lock:
+                predictor = self._predictors.get(rule)
+                if predictor is None:
+                    predictor = self._predictors[rule] = self._load_predictor(rule)
+        return predictor
+
+    def load_weights(self, rule: str) -> tuple[np.ndarray, float] | None:
+        from remarkable.prompter.utils import _safe_load_sklearn_model
+
+        name = rule_model_name(rule)
+        if (self.model_dir / f"{name}.ort").exists():
+            return None
+        onnx_path = self.model_dir / f"{name}.onnx"
+        if onnx_path.exists():
+            return weights_from_onnx(onnx_path)
+        return weights_from_sklearn(_safe_load_sklearn_model(self.model_dir / f"{name}.model"))
+
+    def _build_scorer(self):
+        rules, coefficients, intercepts = [], [], []
+        for rule in self.rules:
+            weights = self.load_weights(rule)
+            if weights is None or (coefficients and len(weights[0]) != len(coefficients[0])):
+                self._fallback_rules.append(rule)
+                continue
+            rules.append(rule)
+            coefficients.append(weights[0])
+            intercepts.append(weights[1])
+        if self._fallback_rules:
+            logger.warning(f"prompter rules can't be fused, predict one by one: {self._fallback_rules}")
+        self._scorer = FusedLinearScorer(rules, coefficients, intercepts)
+
+    @property
+    def scorer(self) -> FusedLinearScorer:
+        if self._scorer is None:
+            with self._lock:
+                if self._scorer is None:
+                    self._build_scorer()
+        return self._scorer
+
+    def predict_all(self, data) -> np.ndarray:
+        """(元素块数, 字段数) 的正例概率, 列顺序与 self.rules 一致"""
+        scorer = self.scorer
+        columns = {rule: idx for idx, rule in enumerate(self.rules)}
+        scores = np.empty((data.shape[0], len(self.rules)), dtype=np.float64)
+        if scorer.rules:
+            scores[:, [columns[rule] for rule in scorer.rules]] = scorer.scores(data)
+        for rule in self._fallback_rules:
+            scores[:, columns[rule]] = self.predict(rule, data)
+        return scores
+
+    def predict(self, rule: str, data) -> np.ndarray:
+        """各元素块属于字段 rule 的概率"""
+        from remarkable.prompter.utils import _onnx_predict
+
+        predictor = self.predictor(rule)
+        if isinstance(predictor, rt.InferenceSession):
+            with limit_numpy_threads():
+                return _onnx_predict(predictor, data)
+        return predictor.predict_proba(data)[:, 1]
+
+
+class PrompterModelRegistry:
+    def __init__(self):
+        self._models: dict[tuple[int, int], PrompterModel] = {}
+        self._lock = threading.Lock()
+
+    def get(self, schema_id, vid=0) -> PrompterModel:
+        root = model_root(schema_id, vid)
+        if not (root / "feature").exists():
+            raise ModelDataNotFound(f"Can't find model for {schema_id=} because path {root / 'feature'} not exists")
+
+        key = (int(schema_id), int(vid or 0))
+        fingerprint = model_fingerprint(root)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None or model.fingerprint != fingerprint:
+                start = time.time()
+                model = self._models[key] = PrompterModel(root, fingerprint)
+                logger.info(f"prompter model loaded: {key}, cost {time.time() - start:.2f}s")
+        return model
+
+    def invalidate(self, schema_id, vid=0):
+        with self._lock:
+            self._models.pop((int(schema_id), int(vid or 0)), None)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+
+prompter_models = PrompterModelRegistry()
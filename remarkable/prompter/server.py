@@ -0,0 +1,7 @@
+# 定位模型服务, prompter.mode 为 rpc 时 worker 通过 prompter.rpc_address 调用
+# 模型常驻在服务进程内(见 remarkable/prompter/registry.py), 按 (schema_id, vid) 缓存
+from aipod.rpc.server import serve
+
+from remarkable.service.rpc import PIPELine
+
+serve(PIPELine)
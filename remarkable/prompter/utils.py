@@ -10,6 +10,7 @@ import warnings
 from collections import defaultdict
 from copy import deepcopy
 from pathlib import Path
+from typing import Iterator
 
 import joblib
 import numpy as np
@@ -31,6 +32,7 @@ from remarkable.common.multiprocess import run_in_multiprocess
 from remarkable.common.util import limit_numpy_threads
 from remarkable.config import get_config
 from remarkable.prompter.builder import load_file_elements
+from remarkable.prompter.registry import PrompterModel, prompter_models, rule_model_name
 
 logger = logging.getLogger(__name__)
 
@@ -225,6 +227,22 @@ def extract_train_feature(
     logging.info("finished extracting train data feature in %.2fs", time.time() - start_time)
 
 
+def iter_pred_documents(schema_id, vid=0, pred_start=0, pred_end=0, dict_data=None) -> Iterator[tuple[int, dict]]:
+    """待预测的 (doc_id, 元素块数据), dict_data 为空时逐个读取 elements 目录中 pred_start..pred_end 的文档"""
+    if dict_data:
+        yield from dict_data.items()
+        return
+    elements_path = os.path.join(get_config("training_cache_dir"), str(schema_id), str(vid or 0), "elements/")
+    for root, _, names in os.walk(elements_path):
+        for name in names:
+            doc_id = int(name.split(".")[0])
+            if pred_start <= doc_id <= pred_end:
+                with open(root + name) as f:
+                    data = json.load(f)
+                if data:
+                    yield doc_id, data
+
+
 def extract_pred_feature(
     schema_id,
     vid=0,
@@ -238,12 +256,12 @@ def extract_pred_feature(
     use_pages_percent=True,
     use_syllabuses=True,
     tokenization=None,
+    model: PrompterModel | None = None,
 ):
     logging.info("start extracting pred data feature")
     start_time = time.time()
-    feature_path = os.path.join(get_config("training_cache_dir"), str(schema_id), str(vid or 0), "feature/")
-    with open(feature_path + "rules.pkl", "rb") as f:
-        rules = pickle.load(f)
+    model = model or prompter_models.get(schema_id, vid)
+    rules = model.rules
 
     ids = []
     attrs = []
@@ -257,49 +275,22 @@ def extract_pred_feature(
     pred_index = []
     pred_length = []
 
-    elements_path = os.path.join(get_config("training_cache_dir"), str(schema_id), str(vid or 0), "elements/")
-    if dict_data:
-        doc_id_list = list(dict_data.keys())
-        for doc_id in doc_id_list:
-            logger.info(f"extracting for file: {doc_id}")
-            pred_index.append(doc_id)
-            pred_length.append(len(dict_data[doc_id]))
-            sorted_data = sorted(dict_data[doc_id].items(), key=lambda x: int(x[0]), reverse=False)
-            ids += [int(x[0]) for x in sorted_data]
-            attrs += [x[1]["attrs"] for x in sorted_data]
-            texts_ori += [x[1]["text"] for x in sorted_data]
-            classes += [x[1]["class"] for x in sorted_data]
-            temp = [x[1]["page"] + 1 for x in sorted_data]
-            pages += temp
-            pages_percent += list(np.array(temp, dtype=float) / max(temp))
-            outlines += [x[1]["outline"] for x in sorted_data]
-            if use_syllabuses:
-                temp = [x[1]["syllabuse"] for x in sorted_data]
-                syllabuses += [" ".join([y["title"] for y in x]) if x != [] else "None" for x in temp]
-    else:
-        for root, _, names in os.walk(elements_path):
-            for name in names:
-                doc_id = int(name.split(".")[0])
-                logger.info(f"extracting for file: f{doc_id}")
-                if pred_start <= doc_id <= pred_end:
-                    with open(root + name) as f:
-                        data = json.load(f)
-                        if data == {}:
-                            continue
-                        pred_index.append(doc_id)
-                        pred_length.append(len(data))
-                        sorted_data = sorted(data.items(), key=lambda x: int(x[0]), reverse=False)
-                        ids += [int(x[0]) for x in sorted_data]
-                        attrs += [x[1]["attrs"] for x in sorted_data]
-                        texts_ori += [x[1]["text"] for x in sorted_data]
-                        classes += [x[1]["class"] for x in sorted_data]
-                        temp = [x[1]["page"] + 1 for x in sorted_data]
-                        pages += temp
-                        pages_percent += list(np.array(temp, dtype=float) / max(temp))
-                        outlines += [x[1]["outline"] for x in sorted_data]
-                        if use_syllabuses:
-                            temp = [x[1]["syllabuse"] for x in sorted_data]
-                            syllabuses += [" ".join([y["title"] for y in x]) if x != [] else "None" for x in temp]
+    for doc_id, data in iter_pred_documents(schema_id, vid, pred_start, pred_end, dict_data):
+        logger.info(f"extracting for file: {doc_id}")
+        pred_index.append(doc_id)
+        pred_length.append(len(data))
+        sorted_data = sorted(data.items(), key=lambda x: int(x[0]), reverse=False)
+        ids += [int(x[0]) for x in sorted_data]
+        attrs += [x[1]["attrs"] for x in sorted_data]
+        texts_ori += [x[1]["text"] for x in sorted_data]
+        classes += [x[1]["class"] for x in sorted_data]
+        temp = [x[1]["page"] + 1 for x in sorted_data]
+        pages += temp
+        pages_percent += list(np.array(temp, dtype=float) / max(temp))
+        outlines += [x[1]["outline"] for x in sorted_data]
+        if use_syllabuses:
+            temp = [x[1]["syllabuse"] for x in sorted_data]
+            syllabuses += [" ".join([y["title"] for y in x]) if x != [] else "None" for x in temp]
 
     labels = {}
     for rule in rules:
@@ -324,21 +315,13 @@ def extract_pred_feature(
         pred_inter_paragraph = [texts[i] if x == "PARAGRAPH" else "None" for i, x in enumerate(classes)]
         pred_inter_table = [texts[i] if x == "TABLE" else "None" for i, x in enumerate(classes)]
 
-        with open(feature_path + "count_paragraph.pkl", "rb") as f:
-            count_paragraph = pickle.load(f)
-
-        with open(feature_path + "count_table.pkl", "rb") as f:
-            count_table = pickle.load(f)
-
-        pred_inter_paragraph = count_paragraph.transform(pred_inter_paragraph)
-        pred_inter_table = count_table.transform(pred_inter_table)
+        pred_inter_paragraph = model.vectorizer("count_paragraph").transform(pred_inter_paragraph)
+        pred_inter_table = model.vectorizer("count_table").transform(pred_inter_table)
 
         pred_inter_vocab = hstack((pred_inter_paragraph, pred_inter_table)).tocsr()
         logging.info("finish separate_paragraph_table")
     else:
-        with open(feature_path + "count_vocab.pkl", "rb") as f:
-            count_vocab = pickle.load(f)
-        pred_inter_vocab = count_vocab.transform(texts)
+        pred_inter_vocab = model.vectorizer("count_vocab").transform(texts)
 
     if use_context:
         logging.info("start use_context")
@@ -350,12 +333,8 @@ def extract_pred_feature(
         for _ in range(context_length):
             texts_after.append("None")
 
-        if separate_paragraph_table:
-            with open(feature_path + "count_vocab.pkl", "rb") as f:
-                count_vocab = pickle.load(f)
-            pred_inter_vocab_before = count_vocab.transform(texts_before)
-        else:
-            pred_inter_vocab_before = count_vocab.transform(texts_before)
+        count_vocab = model.vectorizer("count_vocab")
+        pred_inter_vocab_before = count_vocab.transform(texts_before)
         pred_inter_vocab_after = count_vocab.transform(texts_after)
 
         pred_data = hstack((pred_inter_vocab, pred_inter_vocab_before, pred_inter_vocab_after)).tocsr()
@@ -370,9 +349,7 @@ def extract_pred_feature(
 
     if use_syllabuses:
         logging.info("start use_syllabuses")
-        with open(feature_path + "count_syllabuse.pkl", "rb") as f:
-            count_syllabuse = pickle.load(f)
-        pred_syllabuse = count_syllabuse.transform(syllabuses)
+        pred_syllabuse = model.vectorizer("count_syllabuse").transform(syllabuses)
         pred_data = hstack((pred_data, pred_syllabuse)).tocsr()
         logging.info("finish use_syllabuses")
 
@@ -505,12 +482,7 @@ def train(schema_id, vid=0, rules_use_post_process=None, multi_process=False):
         save_model_path = Path(model_dir + rule2 + "_lr.onnx")
         if not os.path.exists(model_dir):
             os.makedirs(model_dir, exist_ok=True)
-        # 定义输入特征类型
-        initial_type = [("fload_input", FloatTensorType([None, train_data.shape[1]]))]
-        # 转换模型
-        onnx_model = convert_sklearn(model, initial_types=initial_type)
-        # 保存ONNX模型
-        save_model_path.write_bytes(onnx_model.SerializeToString())
+        save_onnx_model(model, save_model_path, train_data.shape[1])
 
         y_train_pred = mixin_predict(save_model_path, train_data)
 
@@ -582,6 +554,13 @@ def train(schema_id, vid=0, rules_use_post_process=None, multi_process=False):
     return train_answers
 
 
+def save_onnx_model(model: LogisticRegression, path: Path, n_features: int):
+    # 定义输入特征类型
+    initial_type = [("fload_input", FloatTensorType([None, n_features]))]
+    onnx_model = convert_sklearn(model, initial_types=initial_type)
+    path.write_bytes(onnx_model.SerializeToString())
+
+
 def init_onnx_session(model_path):
     # 创建ONNX运行时会话
     # NOTE: 限制线程数，避免k8s之类平台的资源限制问题
@@ -628,173 +607,260 @@ def _safe_load_sklearn_model(model_path):
     return joblib.load(model_path)
 
 
-def pred(
+PRED_TOP_K = 20
+POST_PROCESS_PAGES = 5
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    scores 为 (元素块数, 字段数) 的得分, 返回每个字段得分最高的 k 个行号, 形状为 (字段数, k), 按得分降序
+    同分时行号大的在前, 与 np.argsort(...)[::-1] 的顺序一致
+    """
+    size = scores.shape[0]
+    if k < size:
+        candidates = np.argpartition(scores, size - k, axis=0)[size - k :]
+    else:
+        candidates = np.broadcast_to(np.arange(size)[:, None], scores.shape)
+    candidates = np.ascontiguousarray(candidates.T)
+    picked = np.take_along_axis(scores.T, candidates, axis=1)
+    order = np.lexsort((candidates, picked))[:, ::-1]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def first_rows_by_page(scores: np.ndarray, pages: np.ndarray, limit: int) -> np.ndarray:
+    """按得分降序, 每页只取第一个元素块, 最多取 limit 页"""
+    order = np.lexsort((np.arange(len(scores)), scores))[::-1]
+    _, first = np.unique(pages[order], return_index=True)
+    first.sort()
+    return order[first[:limit]]
+
+
+def _load_pred_elements(schema_id, vid, model: PrompterModel, direct=True, **kwargs) -> dict:
+    if direct:
+        ids, texts, pages, outlines, classes, pred_length, pred_index, pred_data = extract_pred_feature(
+            schema_id=schema_id, vid=vid, save=False, model=model, **kwargs
+        )
+        return {
+            "ids": ids,
+            "texts": texts,
+            "pages": pages,
+            "outlines": outlines,
+            "classes": classes,
+            "pred_length": pred_length,
+            "pred_index": pred_index,
+            "pred_data": pred_data,
+        }
+
+    with open(model.feature_dir / "pred_elements_info.pkl", "rb") as f:
+        elements_info = pickle.load(f)
+    elements_info["pred_data"] = load_npz(model.feature_dir / "pred_data.npz")
+    return elements_info
+
+
+def _iter_doc_answers(model: PrompterModel, elements: dict, rules_use_post_process, labels=None, collected=None):
+    """逐个文档打分并组装结果, collected 不为 None 时收集各文档的得分矩阵"""
+    rules = model.rules
+    post_process = {idx for idx, rule in enumerate(rules) if rule in rules_use_post_process}
+    ids = np.asarray(elements["ids"])
+    pages = np.asarray(elements["pages"])
+    texts, outlines, classes = elements["texts"], elements["outlines"], elements["classes"]
+    pred_data = elements["pred_data"]
+
+    start = end = 0
+    for doc_id, length in zip(elements["pred_index"], elements["pred_length"]):
+        end += length
+        # 所有字段的逻辑回归合并成一次稀疏矩阵乘法
+        scores = model.predict_all(pred_data[start:end])
+        if collected is not None:
+            collected.append(scores)
+        top_rows = top_k_rows(scores, PRED_TOP_K)
+
+        answers = {}
+        for rule_idx, rule in enumerate(rules):
+            if rule_idx in post_process:
+                rows = first_rows_by_page(scores[:, rule_idx], pages[start:end], POST_PROCESS_PAGES)
+            else:
+                rows = top_rows[rule_idx]
+            all_rows = rows + start
+            items = []
+            for row, score, element_index, page in zip(
+                all_rows.tolist(), scores[rows, rule_idx].tolist(), ids[all_rows].tolist(), pages[all_rows].tolist()
+            ):
+                block_info = {
+                    "score": score,
+                    "element_index": element_index,
+                    "page": page,
+                    "outline": outlines[row],
+                    "text": texts[row],
+                    "class": classes[row],
+                }
+                if labels is not None and rule_idx not in post_process:
+                    block_info["label"] = labels[rule][row]
+                items.append(block_info)
+            answers[rule] = items
+        yield int(doc_id), answers
+        start = end
+
+
+def iter_pred(
     schema_id,
     vid,
     pred_start=0,
     pred_end=0,
     dict_data=None,
     rules_use_post_process=None,
-    has_label=False,
-    direct=True,
     context_length=1,
     use_syllabuses=True,
     tokenization=None,
     separate_paragraph_table=True,
-):
-    feature_path = os.path.join(get_config("training_cache_dir"), str(schema_id), str(vid or 0), "feature/")
-    if not os.path.exists(feature_path):
-        raise ModelDataNotFound(f"Can't find model for {schema_id=} because path {feature_path} not exists")
-
-    if direct:
-        ids, texts, pages, outlines, classes, pred_length, pred_index, pred_data = extract_pred_feature(
-            schema_id=schema_id,
-            vid=vid,
-            pred_start=pred_start,
-            pred_end=pred_end,
-            dict_data=dict_data,
-            save=False,
+) -> Iterator[tuple[int, dict]]:
+    """
+    逐个文档抽取特征、打分, 产出 (doc_id, {rule: [block_info, ...]})
+    内存中只有当前文档的特征矩阵和结果, 适合 pred_start..pred_end 范围很大的批量预测
+    """
+    model = prompter_models.get(schema_id, vid)
+    for doc_id, data in iter_pred_documents(schema_id, vid, pred_start, pred_end, dict_data):
+        elements = _load_pred_elements(
+            schema_id,
+            vid,
+            model,
+            dict_data={doc_id: data},
             context_length=context_length,
             use_syllabuses=use_syllabuses,
             tokenization=tokenization,
             separate_paragraph_table=separate_paragraph_table,
         )
-    else:
-        pred_data = load_npz(feature_path + "pred_data.npz")
+        yield from _iter_doc_answers(model, elements, rules_use_post_process or [])
 
-        with open(feature_path + "pred_elements_info.pkl", "rb") as f:
-            elements_info = pickle.load(f)
 
-        ids = elements_info.get("ids")
-        texts = elements_info.get("texts")
-        classes = elements_info.get("classes")
-        pages = elements_info.get("pages")
-        outlines = elements_info.get("outlines")
-        pred_length = elements_info.get("pred_length")
-        pred_index = elements_info.get("pred_index")
+def pred(
+    schema_id,
+    vid,
+    pred_start=0,
+    pred_end=0,
+    dict_data=None,
+    rules_use_post_process=None,
+    has_label=False,
+    direct=True,
+    context_length=1,
+    use_syllabuses=True,
+    tokenization=None,
+    separate_paragraph_table=True,
+):
+    if direct and not has_label:
+        # 逐个文档抽取特征并打分, 不一次性为整个范围构建特征矩阵
+        return dict(
+            iter_pred(
+                schema_id,
+                vid,
+                pred_start=pred_start,
+                pred_end=pred_end,
+                dict_data=dict_data,
+                rules_use_post_process=rules_use_post_process,
+                context_length=context_length,
+                use_syllabuses=use_syllabuses,
+                tokenization=tokenization,
+                separate_paragraph_table=separate_paragraph_table,
+            )
+        )
+
+    model = prompter_models.get(schema_id, vid)
+    elements = _load_pred_elements(
+        schema_id,
+        vid,
+        model,
+        direct=direct,
+        pred_start=pred_start,
+        pred_end=pred_end,
+        dict_data=dict_data,
+        context_length=context_length,
+        use_syllabuses=use_syllabuses,
+        tokenization=tokenization,
+        separate_paragraph_table=separate_paragraph_table,
+    )
+    labels = elements.get("labels") if has_label else None
+    if has_label and labels is None:
+        raise ModelDataNotFound(f"Can't find labels for {schema_id=}, extract pred feature with labels first")
 
-        if has_label:
-            labels = elements_info.get("labels")
-        else:
-            labels = None
     logging.info("start predicting")
     start_time = time.time()
 
-    with open(feature_path + "rules.pkl", "rb") as f:
-        rules = pickle.load(f)
-
-    if has_label:
-        result = pd.DataFrame(
-            index=["ALL"] + list(rules),
-            columns=[
-                "pr_p",
-                "pr_r",
-                "pr_f1",
-                "pr_auc",
-                "pr_rate",
-                "pr_match",
-                "pr_total",
-                "pr_pred_true",
-                "pr_label_true",
-            ],
-        )
-    result_path = os.path.join(get_config("training_cache_dir"), str(schema_id), str(vid or 0), "results/")
-    threshold = 0.5
-    model_path = os.path.join(get_config("training_cache_dir"), str(schema_id), str(vid or 0), "models/")
+    collected = [] if has_label else None
+    pred_answers = dict(_iter_doc_answers(model, elements, rules_use_post_process or [], labels, collected))
 
-    pred_answers = {}
-    for index in pred_index:
-        temp = {}
-        for rule in rules:
-            temp[rule] = []
-        pred_answers[int(index)] = temp
-
-    for i, rule in enumerate(rules):
-        # print(i + 1, ' Rule:', rule)
-
-        if has_label:
-            y_pred = labels[rule]
+    logging.info("finished predicting in %.2fs", time.time() - start_time)
 
-        if "/" in rule:
-            rule2 = re.sub("/", "_", rule)
-        else:
-            rule2 = rule
+    if has_label:
+        _report_pred_result(schema_id, vid, model.rules, labels, np.vstack(collected))
 
-        y_pred_pred = mixin_predict(Path(model_path + rule2 + "_lr.model"), pred_data)
+    return pred_answers
 
-        start = end = 0
-        for i, length in enumerate(pred_length):
-            end += length
-            doc_id = int(pred_index[i])
 
-            if rule in rules_use_post_process:
-                page_list = []
-                for block_id in np.argsort(y_pred_pred[start:end])[::-1]:
-                    all_block_id = block_id + start
-                    if pages[all_block_id] not in page_list:
-                        page_list.append(pages[all_block_id])
-                    else:
-                        continue
-                    block_info = {}
-                    block_info["score"] = y_pred_pred[all_block_id]
-                    block_info["element_index"] = ids[all_block_id]
-                    block_info["page"] = pages[all_block_id]
-                    block_info["outline"] = outlines[all_block_id]
-                    block_info["text"] = texts[all_block_id]
-                    block_info["class"] = classes[all_block_id]
-                    pred_answers[doc_id][rule].append(block_info)
-                    if len(page_list) == 5:
-                        break
-            else:
-                for block_id in np.argsort(y_pred_pred[start:end])[::-1][:20]:
-                    all_block_id = block_id + start
-                    block_info = {}
-                    block_info["score"] = y_pred_pred[all_block_id]
-                    block_info["element_index"] = ids[all_block_id]
-                    block_info["page"] = pages[all_block_id]
-                    block_info["outline"] = outlines[all_block_id]
-                    block_info["text"] = texts[all_block_id]
-                    block_info["class"] = classes[all_block_id]
-                    if has_label:
-                        block_info["label"] = y_pred[all_block_id]
-                    pred_answers[doc_id][rule].append(block_info)
-            start = end
+def _report_pred_result(schema_id, vid, rules, labels, scores):
+    result = pd.DataFrame(
+        index=["ALL"] + list(rules),
+        columns=[
+            "pr_p",
+            "pr_r",
+            "pr_f1",
+            "pr_auc",
+            "pr_rate",
+            "pr_match",
+            "pr_total",
+            "pr_pred_true",
+            "pr_label_true",
+        ],
+    )
+    result_path = os.path.join(get_config("training_cache_dir"), str(schema_id), str(vid or 0), "results/")
+    threshold = 0.5
 
-        if has_label:
-            y_pred_pred2 = deepcopy(y_pred_pred)
-            y_pred_pred2[y_pred_pred2 > threshold] = 1
-            y_pred_pred2[y_pred_pred2 <= threshold] = 0
-            precision = precision_score(y_pred, y_pred_pred2)
-            recall = recall_score(y_pred, y_pred_pred2)
-            f1 = f1_score(y_pred, y_pred_pred2)
-            pred_auc = 0
-            if 1 in y_pred:
-                pred_auc = roc_auc_score(y_pred, y_pred_pred)
-            pred_pred_true = sum(y_pred_pred2)
-            pred_label_true = sum(labels[rule])
-
-            print("pred")
-            print("precision:{}", precision)
-            print("recall:", recall)
-            print("f1:", f1)
-            print("pred_auc:", pred_auc)
-
-            result.loc[rule]["pr_p"] = round(precision, 3)
-            result.loc[rule]["pr_r"] = round(recall, 3)
-            result.loc[rule]["pr_f1"] = round(f1, 3)
-            result.loc[rule]["pr_auc"] = pred_auc
-            result.loc[rule]["pr_pred_true"] = pred_pred_true
-            result.loc[rule]["pr_label_true"] = pred_label_true
-        #  print('cost:', time.time() - t2)
+    for rule_idx, rule in enumerate(rules):
+        y_pred = labels[rule]
+        y_pred_pred = scores[:, rule_idx]
+        y_pred_pred2 = (y_pred_pred > threshold).astype(int)
+        precision = precision_score(y_pred, y_pred_pred2)
+        recall = recall_score(y_pred, y_pred_pred2)
+        f1 = f1_score(y_pred, y_pred_pred2)
+        pred_auc = 0
+        if 1 in y_pred:
+            pred_auc = roc_auc_score(y_pred, y_pred_pred)
+        pred_pred_true = sum(y_pred_pred2)
+        pred_label_true = sum(labels[rule])
+
+        print("pred")
+        print("precision:{}", precision)
+        print("recall:", recall)
+        print("f1:", f1)
+        print("pred_auc:", pred_auc)
+
+        result.loc[rule]["pr_p"] = round(precision, 3)
+        result.loc[rule]["pr_r"] = round(recall, 3)
+        result.loc[rule]["pr_f1"] = round(f1, 3)
+        result.loc[rule]["pr_auc"] = pred_auc
+        result.loc[rule]["pr_pred_true"] = pred_pred_true
+        result.loc[rule]["pr_label_true"] = pred_label_true
 
-    logging.info("finished predicting in %.2fs", time.time() - start_time)
+    if not os.path.exists(result_path):
+        os.makedirs(result_path)
+    result.to_csv(result_path + "pred_result.csv")
 
-    if has_label:
-        if not os.path.exists(result_path):
-            os.makedirs(result_path)
-        result.to_csv(result_path + "pred_result.csv")
 
-    return pred_answers
+def check_fused_parity(schema_id, vid=0, pred_data=None, atol=1e-4) -> dict[str, float]:
+    """
+    比对合并推理与逐字段 mixin_predict 的结果, 返回每个字段的最大绝对误差
+    pred_data 为空时使用 extract_pred_feature 保存的 pred_data.npz
+    """
+    model = prompter_models.get(schema_id, vid)
+    if pred_data is None:
+        pred_data = load_npz(model.feature_dir / "pred_data.npz")
+    scores = model.predict_all(pred_data)
+    res = {}
+    for rule_idx, rule in enumerate(model.rules):
+        expected = mixin_predict(model.model_dir / f"{rule_model_name(rule)}.model", pred_data)
+        res[rule] = float(np.max(np.abs(scores[:, rule_idx] - expected), initial=0))
+        if res[rule] > atol:
+            logger.warning(f"fused prediction mismatch for rule {rule}: {res[rule]}")
+    return res
 
 
 def _train_multiprocess(
@@ -833,10 +899,8 @@ def _train_multiprocess(
     if not os.path.exists(model_path):
         os.makedirs(model_path, exist_ok=True)
 
-    inital_type = [("fload_input", FloatTensorType([None, train_data.shape[1]]))]
-    onnx_model = convert_sklearn(model, initial_types=inital_type)
     save_model_path = Path(model_path + rule2 + "_lr.onnx")
-    save_model_path.write_bytes(onnx_model.SerializeToString())
+    save_onnx_model(model, save_model_path, train_data.shape[1])
 
     y_train_pred = mixin_predict(save_model_path, train_data)
 
@@ -876,16 +940,21 @@ def _train_multiprocess(
     return train_answer
 
 
-def better_lr_train(label: str, x_origin, y_origin, need_report=False) -> LogisticRegression:
+def better_lr_train(label: str, x_origin, y_origin, need_report=False, init_weights=None) -> LogisticRegression:
     """
     二八分测试、训练集，使用ADASYN处理类别不平衡问题，训练逻辑回归模型，并在测试集上评估模型
     :param label: 字段名称
     :param x_origin: 训练集特征
     :param y_origin: 训练集标签
     :param need_report: 是否需要在测试集上评估模型，默认不评估，使用全量数据训练
+    :param init_weights: (coef, intercept), 以原模型的系数为初值继续训练(warm start)
     """
     random_state = 42  # 固定随机种子，保证每次训练结果一致
     model = LogisticRegression(random_state=random_state, class_weight="balanced")
+    if init_weights is not None:
+        model.set_params(warm_start=True)
+        model.coef_ = np.asarray(init_weights[0], dtype=np.float64).reshape(1, -1)
+        model.intercept_ = np.array([init_weights[1]], dtype=np.float64)
     try:
         if need_report:
             x_train, x_test, y_train, y_test = train_test_split(
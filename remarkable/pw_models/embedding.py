@@ -1,10 +1,71 @@
-from peewee import IntegerField, TextField
+import asyncio
+import hashlib
+import operator
+from collections import OrderedDict
+from functools import reduce
+
+import numpy as np
+from peewee import CharField, IntegerField, TextField, Value
 from pgvector.peewee import VectorField
 
+from remarkable.common.util import generate_timestamp
+from remarkable.config import get_config
 from remarkable.db import pw_db
 from remarkable.pw_models.base import BaseModel
 from remarkable.service.chatgpt import OpenAIClient
 
+# 进程内缓存的查询文本向量数, 字段名等查询文本在每个文件中重复出现
+QUERY_VECTOR_CACHE_SIZE = 4096
+_query_vectors: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+
+
+def query_embeddings(texts: list[str]) -> list[np.ndarray]:
+    """查询文本的向量, 按 (embedding 模型, 文本) 缓存在进程内, 未缓存的文本一次请求"""
+    model = get_config("ai.openai.embedding_model")
+    missing = list(dict.fromkeys(text for text in texts if (model, text) not in _query_vectors))
+    if missing:
+        for text, vector in zip(missing, OpenAIClient().get_embddings(missing)):
+            _query_vectors[(model, text)] = np.asarray(vector, dtype=np.float32)
+    vectors = []
+    for text in texts:
+        _query_vectors.move_to_end((model, text))
+        vectors.append(_query_vectors[(model, text)])
+    while len(_query_vectors) > QUERY_VECTOR_CACHE_SIZE:
+        _query_vectors.popitem(last=False)
+    return vectors
+
+
+class FileVectorIndex:
+    """单个文件所有块的向量, 在进程内做精确的余弦相似度检索, 不必每个查询都访问数据库"""
+
+    def __init__(self, indexes: list[int], vectors: list):
+        self.indexes = np.asarray(indexes, dtype=np.int64)
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(indexes), -1) if indexes else np.empty((0, 0))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1, norms)
+
+    def __len__(self):
+        return len(self.indexes)
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> "FileVectorIndex":
+        return cls([row["index"] for row in rows], [row["embedding"] for row in rows])
+
+    def search(self, query_vectors: list[np.ndarray], limit: int = 10) -> list[list[dict]]:
+        """每个查询向量返回按相似度降序的前 limit 个 {"index", "score"}, 与 semantic_search_query 的结果一致"""
+        if not len(self) or not query_vectors:
+            return [[] for _ in query_vectors]
+        queries = np.vstack(query_vectors).astype(np.float32)
+        queries /= np.where((norms := np.linalg.norm(queries, axis=1, keepdims=True)) == 0, 1, norms)
+        scores = queries @ self.matrix.T
+        limit = min(limit, len(self))
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, limit - 1)[:limit]
+            top = top[np.argsort(-row[top], kind="stable")]
+            results.append([{"index": int(self.indexes[i]), "score": float(row[i])} for i in top])
+        return results
+
 
 class Embedding(BaseModel):
     file_id = IntegerField()
@@ -15,10 +76,10 @@ class Embedding(BaseModel):
     MAX_EMBEDDING_LIMIT = 50
 
     @classmethod
-    def semantic_search_query(cls, fid: int, query_text: str, limit: int = 10):
-        question_embedding = OpenAIClient().get_embddings([query_text])
-        embedding_str = list(question_embedding)[0]
-        distance_col = cls.embedding.cosine_distance(embedding_str)
+    def semantic_search_query(cls, fid: int, query_text: str, limit: int = 10, query_vector=None):
+        if query_vector is None:
+            query_vector = query_embeddings([query_text])[0]
+        distance_col = cls.embedding.cosine_distance(query_vector)
         return (
             cls.select(
                 cls.index,
@@ -32,4 +93,82 @@ class Embedding(BaseModel):
 
     @classmethod
     async def semantic_search(cls, fid: int, query_text: str, limit: int = 10):
-        return list(await pw_db.execute(cls.semantic_search_query(fid, query_text, limit)))
+        (query_vector,) = await asyncio.to_thread(query_embeddings, [query_text])
+        return list(await pw_db.execute(cls.semantic_search_query(fid, query_text, limit, query_vector=query_vector)))
+
+    @classmethod
+    def semantic_search_many_query(cls, fid: int, query_texts: list[str], limit: int = 10, query_vectors=None):
+        """多个查询合并为一条 UNION ALL 语句, 结果中的 query 为查询文本在 query_texts 中的序号"""
+        if query_vectors is None:
+            query_vectors = query_embeddings(query_texts)
+        queries = [
+            cls.semantic_search_query(fid, text, limit, query_vector=vector).select_extend(Value(i).alias("query"))
+            for i, (text, vector) in enumerate(zip(query_texts, query_vectors))
+        ]
+        return reduce(operator.add, queries).dicts()
+
+    @classmethod
+    def file_vectors_query(cls, fid: int, max_size: int):
+        """文件的全部向量, 多取一条用于判断是否超过 max_size"""
+        return cls.select(cls.index, cls.embedding).where(cls.file_id == fid).limit(max_size + 1).dicts()
+
+    @classmethod
+    def build_file_index(cls, rows: list[dict], max_size: int) -> FileVectorIndex | None:
+        """块数超过 max_size 时返回 None, 由数据库检索"""
+        if len(rows) > max_size:
+            return None
+        return FileVectorIndex.from_rows(rows)
+
+    @classmethod
+    async def semantic_search_many(
+        cls, fid: int, query_texts: list[str], limit: int = 10, in_memory_limit: int = 0
+    ) -> list[list[dict]]:
+        """
+        批量语义检索, 按 query_texts 的顺序返回每个查询的前 limit 个 {"index", "score"}
+        in_memory_limit > 0 且文件块数不超过该值时, 读出文件的向量在进程内检索
+        """
+        if not query_texts:
+            return []
+        # 查询向量可能要请求 embedding 接口, 放到线程中执行, 不阻塞事件循环
+        query_vectors = await asyncio.to_thread(query_embeddings, query_texts)
+        if in_memory_limit > 0:
+            rows = list(await pw_db.execute(cls.file_vectors_query(fid, in_memory_limit)))
+            if (index := cls.build_file_index(rows, in_memory_limit)) is not None:
+                return index.search(query_vectors, limit)
+
+        results = [[] for _ in query_texts]
+        rows = await pw_db.execute(cls.semantic_search_many_query(fid, query_texts, limit, query_vectors=query_vectors))
+        for row in sorted(rows, key=lambda r: -r["score"]):
+            results[row.pop("query")].append(row)
+        return results
+
+
+class EmbeddingCache(BaseModel):
+    """按 (embedding 模型, 规范化文本 hash) 保存向量, 重复上传/重新解析的文件不再重复请求相同文本的向量"""
+
+    model = CharField()
+    text_hash = CharField()
+    embedding = VectorField(1536)
+    created_utc = IntegerField(default=generate_timestamp)
+
+    class Meta:
+        table_name = "embedding_cache"
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        # 只有空白不同的文本视为同一文本
+        return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+    @classmethod
+    async def get_many(cls, model: str, text_hashes: list[str]) -> dict:
+        if not text_hashes:
+            return {}
+        query = cls.select(cls.text_hash, cls.embedding).where(cls.model == model, cls.text_hash.in_(text_hashes))
+        return {row.text_hash: row.embedding for row in await pw_db.execute(query)}
+
+    @classmethod
+    async def put_many(cls, model: str, embeddings: dict):
+        if not embeddings:
+            return
+        rows = [{"model": model, "text_hash": key, "embedding": value} for key, value in embeddings.items()]
+        await pw_db.execute(cls.insert_many(rows).on_conflict_ignore())
@@ -465,6 +465,30 @@ class NewFileProject(BaseModel):
         await pw_db.execute(NewFileTree.update(deleted_utc=generate_timestamp()).where(NewFileTree.pid == self.id))
 
 
+class FileTreeClosure(BaseModel):
+    """
+    目录树的闭包表: 每个目录与它自身及所有上级目录各一条记录, depth 为层级差(自身为 0)
+    由 file_tree 上的触发器在新建、移动(修改 ptree_id)、删除目录时维护, 上下级查询都是一次索引查询
+    """
+
+    ancestor_id = IntegerField()
+    descendant_id = IntegerField()
+    depth = IntegerField()
+
+    class Meta:
+        table_name = "file_tree_closure"
+
+    @classmethod
+    def descendants(cls, tree_ids, min_depth=0):
+        """子查询: tree_ids 及其所有下级目录的 id, min_depth=1 时不含 tree_ids 本身"""
+        return cls.select(cls.descendant_id).where(cls.ancestor_id.in_(tree_ids), cls.depth >= min_depth)
+
+    @classmethod
+    def ancestors(cls, tree_ids, min_depth=0):
+        """子查询: tree_ids 及其所有上级目录的 id, min_depth=1 时不含 tree_ids 本身"""
+        return cls.select(cls.ancestor_id).where(cls.descendant_id.in_(tree_ids), cls.depth >= min_depth)
+
+
 class NewFileTree(BaseModel):
     name = CharField()
     pid = IntegerField()
@@ -521,45 +545,32 @@ class NewFileTree(BaseModel):
     async def get_fids(cls, *tree_id: int) -> list[int]:
         from remarkable.models.new_file import NewFile
 
-        own = NewFileTree.select().where(NewFileTree.id.in_(tree_id)).cte("base", recursive=True)
-        child = NewFileTree.alias("child")
-        recursive = child.select().join(own, on=(own.c.id == child.ptree_id))
-        cte = own.union_all(recursive)
-        subquery = cte.select_from(cte.c.id, cte.c.ptree_id)
-        exist_query = peewee.fn.EXISTS(subquery.where(cte.c.id == NewFileTree.id))
-        tree_ids = [
-            tree.id for tree in await pw_db.prefetch(NewFileTree.select().where(exist_query).order_by(NewFileTree.id))
-        ]
+        tree_ids = NewFileTree.select(NewFileTree.id).where(NewFileTree.id.in_(FileTreeClosure.descendants(tree_id)))
         return [file.id for file in await pw_db.prefetch(NewFile.select().where(NewFile.tree_id.in_(tree_ids)))]
 
     @classmethod
     async def find_default_molds(cls, tree_id: int) -> list[int]:
-        own = NewFileTree.select().where(NewFileTree.id == tree_id).cte("base", recursive=True)
-        parent = NewFileTree.alias("parent")
-        recursive = parent.select().join(own, on=(own.c.ptree_id == parent.id))
-        cte = own.union_all(recursive)
-        subquery = cte.select_from(cte.c.id, cte.c.ptree_id)
-        exist_query = peewee.fn.EXISTS(subquery.where(cte.c.id == NewFileTree.id))
-        for tree in await pw_db.prefetch(
-            NewFileTree.select(NewFileTree.default_molds).where(exist_query).order_by(NewFileTree.id.desc())
-        ):
+        """从当前目录向上找最近的设置了默认 schema 的目录"""
+        query = (
+            NewFileTree.select(NewFileTree.default_molds)
+            .join(FileTreeClosure, on=(FileTreeClosure.ancestor_id == NewFileTree.id))
+            .where(FileTreeClosure.descendant_id == tree_id)
+            .order_by(FileTreeClosure.depth)
+        )
+        for tree in await pw_db.execute(query):
             if tree.default_molds:
                 return tree.default_molds
         return []
 
     @classmethod
     async def find_default(cls, tree_id: int) -> Self:
-        own = cls.select().where(cls.id == tree_id).cte("base", recursive=True)
-        parent = cls.alias("parent")
-        recursive = parent.select().join(own, on=(own.c.ptree_id == parent.id))
-        cte = own.union_all(recursive)
-        subquery = cte.select_from(cte.c.id, cte.c.ptree_id)
-        exist_query = peewee.fn.EXISTS(subquery.where(cte.c.id == cls.id))
-        for tree in await pw_db.prefetch(
+        query = (
             cls.select(cls.id, cls.default_molds, cls.default_scenario_id, cls.default_task_type)
-            .where(exist_query)
-            .order_by(cls.id.desc())
-        ):
+            .join(FileTreeClosure, on=(FileTreeClosure.ancestor_id == cls.id))
+            .where(FileTreeClosure.descendant_id == tree_id)
+            .order_by(FileTreeClosure.depth)
+        )
+        for tree in await pw_db.execute(query):
             if tree.default_task_type is not None:
                 return tree
         return None
@@ -0,0 +1,16 @@
+from peewee import CharField, IntegerField
+
+from remarkable.common.util import generate_timestamp
+from remarkable.pw_models.base import BaseModel
+
+
+class FileSearchGram(BaseModel):
+    """跨文档全文检索的倒排索引: 按文件 hash 记录每个字符 n-gram 的出现次数"""
+
+    file_hash = CharField()
+    gram = CharField()
+    tf = IntegerField()
+    created_utc = IntegerField(default=generate_timestamp)
+
+    class Meta:
+        table_name = "file_search_gram"
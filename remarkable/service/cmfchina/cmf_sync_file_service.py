@@ -144,7 +144,8 @@ class CmfSyncFileService:
             logger.info(f"end syncing file <{file_name}>:<{new_file.id}>")
 
     @staticmethod
-    async def upload_file_from_shared_disk(file_path: Path, uid: int):
+    async def upload_file_from_shared_disk(file_path: Path, uid: int, body: bytes | None = None):
+        """body: 调用方已读取的文件内容, 避免重复读取"""
         suffix = os.path.splitext(file_path.name)[1].lower()
         if suffix in FeatureSchema.from_config().supported_zip_suffixes:
             for file in decompression_files(
@@ -157,6 +158,6 @@ class CmfSyncFileService:
                 )
 
         else:
-            with open(file_path, "rb") as obj:
-                body = obj.read()
-                await CmfSyncFileService.parse_file_from_shared_disk(file_path, file_path.name, body, uid)
+            if body is None:
+                body = file_path.read_bytes()
+            await CmfSyncFileService.parse_file_from_shared_disk(file_path, file_path.name, body, uid)
@@ -6,8 +6,9 @@ import os
 import socket
 from dataclasses import dataclass
 from email.header import decode_header
+from itertools import batched
 from pathlib import Path
-from typing import Iterable, Self
+from typing import AsyncIterator, Awaitable, Callable, Self
 
 from imapclient import IMAPClient, exceptions, version_info
 from tornado.httputil import HTTPFile
@@ -17,12 +18,15 @@ from remarkable.common.exceptions import CustomError
 from remarkable.common.zip import decompression_files
 from remarkable.service.cmfchina.email_model import CmfEmail, EmailUser
 from remarkable.service.cmfchina.validator import CmfPostFileValidator
+from remarkable.service.dcm_email.mailbox_state import MailboxState
 from remarkable.service.dcm_email.model import Attachment
 from remarkable.service.new_file import html2pdf
 
 logger = logging.getLogger(__name__)
 
 CONTENT_TYPES = ["text/plain", "text/html"]
+# 每批下载的邮件数
+FETCH_BATCH_SIZE = 20
 
 
 def custom_decode_header(header):
@@ -45,8 +49,11 @@ class IMAPEmailReceiver:
     ssl: bool = True
     timeout: int = 30
     _client: IMAPClient | None = None
+    state: MailboxState | None = None
 
     def __enter__(self) -> Self:
+        if self.state is None:
+            self.state = MailboxState("imap", self.host, self.account)
         self._client = IMAPClient(host=self.host, ssl=self.ssl, timeout=self.timeout)
         self._client.login(self.account, self.password)
         # 使用动态获取的版本信息发送 IMAP ID
@@ -245,55 +252,67 @@ class IMAPEmailReceiver:
                 resources[CONTENT_TYPES[1]] = resources.get(CONTENT_TYPES[1]).replace(f"cid:{cid}", data_uri)
         return resources
 
-    async def email_iter(self, receive_date=datetime.datetime.now(datetime.UTC)) -> Iterable[CmfEmail]:
-        # 格式化IMAP时间格式
-        midnight = datetime.datetime.combine(receive_date, datetime.time.min)
-        start_time = midnight.strftime("%d-%b-%Y")
+    async def email_iter(
+        self,
+        receive_date: datetime.datetime | None = None,
+        filter_processed: Callable[[list[int]], Awaitable[set[int]]] | None = None,
+    ) -> AsyncIterator[CmfEmail]:
+        """
+        增量收取: 有 UID 水位时只取水位之后的邮件, 否则取 receive_date 当天的邮件
+        每批先用 filter_processed 排除已处理的 UID, 只下载其余邮件的全文; 调用方处理完一封邮件后才推进水位
+        """
+        receive_date = receive_date or datetime.datetime.now(datetime.UTC)
         logger.info(f"Start sync {self.account} attachments")
         try:
             # 选择收件箱
-            self._client.select_folder("INBOX", readonly=True)
-            # 使用 SINCE 搜索从凌晨到当前时间的邮件
-            messages = self._client.search(f"SINCE {start_time}")
-            for email_id, data in self._client.fetch(messages, ["RFC822"]).items():
-                # 解析邮件
-                email_message = email.message_from_bytes(data[b"RFC822"])
-                # 获取发件人
-                from_addresses = self.parse_email_addresses(email_message.get("From"))
-                # 获取收件人
-                to_addresses = self.parse_email_addresses(email_message.get("To"))
-                # 获取抄送人
-                cc_addresses = self.parse_email_addresses(email_message.get("Cc"))
-
-                # 获取发送时间
-                sent_at = self.parse_sent_at(email_message)
-                # 获取并解码主题
-                email_subject = self.parse_subject(email_message)
-                # 获取正文
-                resources = self.extract_all_resources(email_message)
-                pdf_body = await self.convert_email_body_to_pdf(
-                    resources[CONTENT_TYPES[1]] or resources[CONTENT_TYPES[0]]
-                )
-                content_attachment = Attachment(filename=f"{email_subject}.pdf", data=pdf_body)
-
-                # 获取附件
-                if resources["attachments"] or content_attachment:
-                    yield CmfEmail(
-                        host=self.host,
-                        account=self.account,
-                        email_id=email_id,
-                        attachments=resources["attachments"],
-                        content_attachment=content_attachment,
-                        sent_at=sent_at,
-                        from_=from_addresses,
-                        to=to_addresses,
-                        cc=cc_addresses,
-                        subject=email_subject,
-                    )
+            folder = self._client.select_folder("INBOX", readonly=True)
+            uidvalidity = folder.get(b"UIDVALIDITY")
+            state = self.state.get()
+            if state.get("uidvalidity") == uidvalidity and state.get("uid"):
+                last_uid = state["uid"]
+                # n:* 在没有新邮件时也会返回最后一封
+                uids = [uid for uid in self._client.search(["UID", f"{last_uid + 1}:*"]) if uid > last_uid]
+            else:
+                # 格式化IMAP时间格式, 使用 SINCE 搜索从凌晨到当前时间的邮件
+                midnight = datetime.datetime.combine(receive_date, datetime.time.min)
+                uids = self._client.search(f"SINCE {midnight.strftime('%d-%b-%Y')}")
+            logger.info(f"account<{self.account}>: {len(uids)} new emails")
+
+            for chunk in batched(sorted(uids), FETCH_BATCH_SIZE):
+                wanted = list(chunk)
+                if filter_processed:
+                    processed = await filter_processed(wanted)
+                    wanted = [uid for uid in wanted if uid not in processed]
+                bodies = self._client.fetch(wanted, ["RFC822"]) if wanted else {}
+                for uid in chunk:
+                    if uid in bodies:
+                        yield await self.build_email(uid, bodies[uid][b"RFC822"])
+                    self.state.set({"uidvalidity": uidvalidity, "uid": uid})
         except Exception as e:
             logger.exception(str(e))
         logger.info(f"End sync {self.account} attachments")
 
+    async def build_email(self, email_id: int, raw: bytes) -> CmfEmail:
+        # 解析邮件
+        email_message = email.message_from_bytes(raw)
+        # 获取正文
+        resources = self.extract_all_resources(email_message)
+        # 获取并解码主题
+        email_subject = self.parse_subject(email_message)
+        pdf_body = await self.convert_email_body_to_pdf(resources[CONTENT_TYPES[1]] or resources[CONTENT_TYPES[0]])
+        return CmfEmail(
+            host=self.host,
+            account=self.account,
+            email_id=email_id,
+            attachments=resources["attachments"],
+            content_attachment=Attachment(filename=f"{email_subject}.pdf", data=pdf_body),
+            sent_at=self.parse_sent_at(email_message),
+            from_=self.parse_email_addresses(email_message.get("From")),
+            to=self.parse_email_addresses(email_message.get("To")),
+            cc=self.parse_email_addresses(email_message.get("Cc")),
+            subject=email_subject,
+        )
+
     @staticmethod
     def verify(host, account, password):
         try:
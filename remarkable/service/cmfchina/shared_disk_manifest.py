@@ -0,0 +1,131 @@
+"""
+共享盘增量同步的文件清单
+
+每个共享盘目录在 redis 中保存两个 hash:
+- files: 相对路径 -> [大小, mtime_ns, 内容 md5]
+- dirs: 相对路径 -> 目录的 mtime_ns
+
+扫描时只比较 stat 结果, 大小或 mtime 变化(以及新出现)的文件才交给调用方读取和计算 md5.
+目录的 mtime 只在其下直接增删、重命名文件时变化, mtime 未变的目录不再列出其中的文件, 只进入已知的子目录;
+原地改写已有文件不会改变目录 mtime, 所以仍逐个 stat 其中已知的文件. full=True 时不看 stat, 比对所有文件的内容.
+"""
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from remarkable.db import init_rdb
+from remarkable.service.comment import is_hidden_file
+
+
+class FileEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    hash: str
+
+
+def _parent(rel: str) -> str:
+    return rel.rpartition("/")[0]
+
+
+class SharedDiskManifest:
+    redis_prefix = "shared_disk_manifest"
+
+    def __init__(self, root: Path, rdb=None):
+        self.root = root
+        self.rdb = rdb if rdb is not None else init_rdb()
+        self.files_key = f"{self.redis_prefix}:{root}:files"
+        self.dirs_key = f"{self.redis_prefix}:{root}:dirs"
+        self.files = {rel: FileEntry(*json.loads(value)) for rel, value in self.rdb.hgetall(self.files_key).items()}
+        self.dirs = {rel: int(value) for rel, value in self.rdb.hgetall(self.dirs_key).items()}
+        self._files_in: defaultdict[str, set[str]] = defaultdict(set)
+        self._dirs_in: defaultdict[str, set[str]] = defaultdict(set)
+        for rel in self.files:
+            self._files_in[_parent(rel)].add(rel)
+        for rel in self.dirs:
+            if rel:
+                self._dirs_in[_parent(rel)].add(rel)
+
+    def file_hash(self, rel: str) -> str | None:
+        entry = self.files.get(rel)
+        return entry.hash if entry else None
+
+    def record_file(self, rel: str, stat: os.stat_result, file_hash: str):
+        entry = FileEntry(stat.st_size, stat.st_mtime_ns, file_hash)
+        self.rdb.hset(self.files_key, rel, json.dumps(entry))
+        self.files[rel] = entry
+        self._files_in[_parent(rel)].add(rel)
+
+    def _record_dir(self, rel: str, mtime_ns: int):
+        self.rdb.hset(self.dirs_key, rel, mtime_ns)
+        self.dirs[rel] = mtime_ns
+        if rel:
+            self._dirs_in[_parent(rel)].add(rel)
+
+    def _remove_files(self, rels: set[str]):
+        if not rels:
+            return
+        self.rdb.hdel(self.files_key, *rels)
+        for rel in rels:
+            self.files.pop(rel, None)
+            self._files_in[_parent(rel)].discard(rel)
+
+    def _remove_dir(self, rel: str):
+        for sub in list(self._dirs_in.pop(rel, ())):
+            self._remove_dir(sub)
+        self._remove_files(self._files_in.pop(rel, set()))
+        self.rdb.hdel(self.dirs_key, rel)
+        self.dirs.pop(rel, None)
+        self._dirs_in[_parent(rel)].discard(rel)
+
+    def scan(self, full: bool = False) -> Iterator[tuple[Path, str, os.stat_result]]:
+        """
+        依次返回新增或变化的文件 (路径, 相对路径, stat), 调用方处理完后应调用 record_file;
+        目录中的文件都返回后才记录该目录的 mtime, 中途出错时下次会重新列出该目录
+        """
+        yield from self._scan(self.root, "", full)
+
+    def _scan(self, path: Path, rel: str, full: bool) -> Iterator[tuple[Path, str, os.stat_result]]:
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._remove_dir(rel)
+            return
+
+        if not full and self.dirs.get(rel) == mtime_ns:
+            # 目录项没有增减, 不必重新列出目录, 只 stat 已知的文件并进入已知的子目录
+            for child in sorted(self._files_in[rel]):
+                child_path = self.root / child
+                try:
+                    stat = child_path.stat()
+                except FileNotFoundError:  # 扫描期间被删除, 目录 mtime 已变, 下次重新列出
+                    continue
+                known = self.files[child]
+                if (known.size, known.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                    yield child_path, child, stat
+            subdirs = [(self.root / sub, sub) for sub in sorted(self._dirs_in[rel])]
+        else:
+            subdirs, current_files, current_dirs = [], set(), set()
+            with os.scandir(path) as entries:
+                entries = sorted(entries, key=lambda e: e.name)
+            for entry in entries:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                if entry.is_dir():
+                    current_dirs.add(child)
+                    subdirs.append((Path(entry.path), child))
+                elif entry.is_file() and not is_hidden_file(entry):
+                    current_files.add(child)
+                    stat = entry.stat()
+                    known = self.files.get(child)
+                    if full or known is None or (known.size, known.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                        yield Path(entry.path), child, stat
+
+            self._remove_files(self._files_in[rel] - current_files)
+            for removed in self._dirs_in[rel] - current_dirs:
+                self._remove_dir(removed)
+
+        for sub_path, sub in subdirs:
+            yield from self._scan(sub_path, sub, full)
+        self._record_dir(rel, mtime_ns)
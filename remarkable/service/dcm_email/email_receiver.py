@@ -5,9 +5,11 @@ import poplib
 from contextlib import contextmanager
 from email import message_from_bytes
 from email.message import EmailMessage
+from typing import Iterator
 
 from bs4 import BeautifulSoup, Doctype
 
+from remarkable.service.dcm_email.mailbox_state import MailboxState
 from remarkable.service.dcm_email.model import Attachment, Email, EmailUser
 
 
@@ -32,9 +34,11 @@ def get_body_contents(html):
 class EmailReceiver:
     client = None
 
-    def __init__(self, host, enable_ssl=True):
+    def __init__(self, host, enable_ssl=True, state: MailboxState | None = None):
         client_cls = poplib.POP3_SSL if enable_ssl else poplib.POP3
+        self.host = host
         self.client = client_cls(host)
+        self.state = state
 
         self._context = None
 
@@ -74,44 +78,62 @@ class EmailReceiver:
 
         return result
 
-    def get_available_emails(self, receive_date=datetime.datetime.now(datetime.UTC)) -> list[Email]:
+    def iter_available_emails(self, receive_date=None) -> Iterator[Email]:
+        """
+        增量收取 receive_date 当天的邮件: 已处理过的 UIDL 直接跳过, 其余先用 TOP 只取邮件头判断日期,
+        日期符合的才下载全文; 调用方处理完一封邮件(取下一封)后才将其记为已处理, 处理失败的邮件下次重新收取;
+        日期晚于当天的邮件不记为已处理, 留到以后收取
+        """
         assert self._context is not None, "You must use this method within a `with_user` context"
 
+        receive_date = receive_date or datetime.datetime.now(datetime.UTC)
         start_of_day = datetime.datetime.combine(receive_date, datetime.time.min, datetime.UTC)
         end_of_day = start_of_day + datetime.timedelta(hours=24)
 
         self.client.user(self._context["user_email"])
         self.client.pass_(self._context["password"])
 
-        (num_msgs, total) = self.client.stat()
-
-        emails = []
-
-        for i in range(1, num_msgs + 1):
-            (header, msg, octets) = self.client.retr(i)
-            message = message_from_bytes(b"\n".join(msg), policy=email.policy.default)
-            receive_at = message.get("Date").datetime.astimezone(datetime.UTC)
-            if start_of_day <= receive_at < end_of_day:
-                subject = str(message.get("Subject"))
-                attachments = []
-                for attachment in message.iter_attachments():
-                    attachments.append(Attachment(filename=attachment.get_filename(), data=attachment.get_content()))
-
-                body = self._get_body_html(message)
-                sender = EmailUser(addresses=list(message.get("From").addresses))
-                receiver = EmailUser(addresses=list(message.get("To").addresses))
-                emails.append(
-                    Email(
-                        sent_at=receive_at,
-                        from_=sender,
-                        to=receiver,
-                        subject=subject,
-                        attachments=attachments,
-                        body=body,
-                    )
-                )
-
-        return emails
+        state = self.state or MailboxState("pop3", self.host, self._context["user_email"])
+        uidls = {}
+        for line in self.client.uidl()[1]:
+            num, uidl = line.decode().split(maxsplit=1)
+            uidls[uidl] = int(num)
+        # 只保留邮箱中仍存在的邮件
+        seen = set(state.get().get("uidls", [])) & uidls.keys()
+
+        for uidl, num in uidls.items():
+            if uidl in seen:
+                continue
+            (header, lines, octets) = self.client.top(num, 0)
+            headers = message_from_bytes(b"\n".join(lines), policy=email.policy.default)
+            receive_at = headers.get("Date").datetime.astimezone(datetime.UTC)
+            if receive_at >= end_of_day:
+                continue
+            if receive_at >= start_of_day:
+                yield self._retrieve_email(num, receive_at)
+            seen.add(uidl)
+            state.set({"uidls": sorted(seen)})
+        state.set({"uidls": sorted(seen)})
+
+    def _retrieve_email(self, num: int, receive_at: datetime.datetime) -> Email:
+        (header, msg, octets) = self.client.retr(num)
+        message = message_from_bytes(b"\n".join(msg), policy=email.policy.default)
+        subject = str(message.get("Subject"))
+        attachments = []
+        for attachment in message.iter_attachments():
+            attachments.append(Attachment(filename=attachment.get_filename(), data=attachment.get_content()))
+
+        body = self._get_body_html(message)
+        sender = EmailUser(addresses=list(message.get("From").addresses))
+        receiver = EmailUser(addresses=list(message.get("To").addresses))
+        return Email(
+            sent_at=receive_at,
+            from_=sender,
+            to=receiver,
+            subject=subject,
+            attachments=attachments,
+            body=body,
+        )
 
 
 if __name__ == "__main__":
@@ -120,5 +142,5 @@ if __name__ == "__main__":
     password = getpass.getpass()
     with service.with_user(mail_address, password):
         target_datetime = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=1)
-        mails = service.get_available_emails(target_datetime)
-        print(mails)
+        for mail in service.iter_available_emails(target_datetime):
+            print(mail)
@@ -0,0 +1,25 @@
+"""
+邮箱增量收取的状态, 按 (协议, 服务器, 账号) 存在 redis hash 中
+
+- IMAP: UIDVALIDITY 和已处理的最大 UID, UIDVALIDITY 变化时 UID 失效, 重新按日期收取
+- POP3: 已处理的 UIDL(POP3 没有递增的 UID), 每次只保留邮箱中仍存在的 UIDL
+"""
+
+import json
+
+from remarkable.db import init_rdb
+
+
+class MailboxState:
+    redis_key = "email_sync_state"
+
+    def __init__(self, protocol: str, host: str, account: str, rdb=None):
+        self.field = f"{protocol}:{host}:{account}"
+        self.rdb = rdb if rdb is not None else init_rdb()
+
+    def get(self) -> dict:
+        value = self.rdb.hget(self.redis_key, self.field)
+        return json.loads(value) if value else {}
+
+    def set(self, state: dict):
+        self.rdb.hset(self.redis_key, self.field, json.dumps(state))
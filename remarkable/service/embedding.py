@@ -36,18 +36,54 @@ class Tokenizer:
     def token_length(self, text: str, **encoding_kwargs):
         return len(self.encode(text, **encoding_kwargs))
 
+    def encode_many(self, texts: list[str]) -> list[list[int]]:
+        encoder = self.encoder
+        if isinstance(encoder, tiktoken.Encoding):
+            return encoder.encode_batch(texts)
+        return [encoder.encode(text) for text in texts]
+
+    def token_lengths(self, texts: list[str]) -> list[int]:
+        return [len(tokens) for tokens in self.encode_many(texts)]
+
+    def prefix_length(self, tokens: list[int], n: int) -> int:
+        """前 n 个 token 对应的原文字符数, 被切开的多字节字符不计入"""
+        encoder = self.encoder
+        if isinstance(encoder, tiktoken.Encoding):
+            # 末尾被切开的多字节字符解码不完整, 忽略; decode_with_offsets 遇到这种情况会抛出 UnicodeDecodeError
+            return len(encoder.decode_bytes(tokens[:n]).decode("utf-8", errors="ignore"))
+        return len(encoder.decode(tokens[:n]))
+
+    def trim(self, text: str, n: int, tokens: list[int] | None = None) -> str:
+        """
+        不超过 n 个 token 的最长前缀: 整段只编码一次, 在第 n 个 token 处截断并换算为字符位置
+        BPE 对截断后的前缀重新编码时 token 数可能略多, 超出时逐个 token 回退
+        """
+        if n < 0:
+            return ""
+        if tokens is None:
+            tokens = self.encode(text)
+        if len(tokens) <= n:
+            return text
+        limit = n
+        end = self.prefix_length(tokens, n)
+        while n > 0 and self.token_length(text[:end]) > limit:
+            n -= 1
+            end = self.prefix_length(tokens, n)
+        return text[:end]
+
+    def trim_many(self, texts: list[str], n: int) -> list[str]:
+        return [self.trim(text, n, tokens) for text, tokens in zip(texts, self.encode_many(texts))]
+
     def split_by_length(self, texts: list[str], max_token_length: int = 8192):
-        token_lens = []
-        for text in texts:
-            token_len = self.token_length(text)
-            if sum(token_lens) + token_len >= max_token_length:
-                yield texts[: len(token_lens)]
-                texts = texts[len(token_lens) :]
-                token_lens = [token_len]
-            else:
-                token_lens.append(token_len)
-        if texts:
-            yield texts
+        """按 token 数分组, 每组总数小于 max_token_length(单个文本超出时独占一组), 所有文本一次批量编码"""
+        start, total = 0, 0
+        for i, token_len in enumerate(self.token_lengths(texts)):
+            if total + token_len >= max_token_length and i > start:
+                yield texts[start:i]
+                start, total = i, 0
+            total += token_len
+        if start < len(texts):
+            yield texts[start:]
 
 
 TOKEN_ENCODER = Tokenizer()
@@ -352,6 +388,8 @@ def binary_token_trim(text, n, token_func=n_token):
     """希望return x=text[:z], 满足 n_token(x)=n 用二分查找精确搜索x，复杂度是n*log(n)"""
     if n < 0:
         return ""
+    if token_func in (n_token, TOKEN_ENCODER.token_length):
+        return TOKEN_ENCODER.trim(text, n)
 
     num_token = token_func(text)
     if num_token == 0 or num_token <= n:
@@ -370,4 +408,4 @@ def binary_token_trim(text, n, token_func=n_token):
 
 def approx_trim_for_embedding(text: str) -> str:
     embedding_token_limit = int(get_config("ai.embedding_token_limit", 5000))
-    return approx_trim(text, embedding_token_limit, token_func=TOKEN_ENCODER.token_length)
+    return TOKEN_ENCODER.trim(text, embedding_token_limit)
@@ -0,0 +1,151 @@
+import logging
+import re
+from collections import Counter
+from itertools import batched
+
+from peewee import SQL, fn
+
+from remarkable.db import pw_db
+from remarkable.models.new_file import NewFile
+from remarkable.pw_models.search_index import FileSearchGram
+
+logger = logging.getLogger(__name__)
+
+# search string 中段落以换行分隔, 单元格以 #_# 分隔, 关键词去掉了空白字符, 命中不会跨越这些位置
+P_SEGMENT_SEPARATOR = re.compile(r"\s+|#_#")
+BULK_INSERT_SIZE = 5000
+BACKFILL_BATCH_SIZE = 500
+
+
+def normalize_keyword(keyword: str) -> str:
+    return "".join(keyword.split())
+
+
+def count_grams(text: str) -> Counter:
+    """统计 unigram 和 bigram 出现次数"""
+    counter = Counter()
+    for segment in P_SEGMENT_SEPARATOR.split(text):
+        counter.update(segment)
+        counter.update(segment[i : i + 2] for i in range(len(segment) - 1))
+    return counter
+
+
+def query_grams(keyword: str) -> set[str]:
+    if len(keyword) == 1:
+        return {keyword}
+    return {keyword[i : i + 2] for i in range(len(keyword) - 1)}
+
+
+async def is_indexed(file_hash: str) -> bool:
+    return await pw_db.exists(FileSearchGram.select().where(FileSearchGram.file_hash == file_hash))
+
+
+async def update_search_index(file: NewFile, force=False):
+    """根据 PDF 缓存中的字符索引更新全文检索倒排索引, 相同 hash 的文件只建一次"""
+    from remarkable.plugins.fileapi.worker import PDFCache
+
+    if not force and await is_indexed(file.hash):
+        return
+
+    char_index = PDFCache(file).get_char_index()
+    if char_index is None:
+        logger.warning(f"no char index for file: {file.id}, skip updating search index")
+        return
+
+    counter = count_grams(char_index.search_string())
+    async with pw_db.atomic():
+        await pw_db.execute(FileSearchGram.delete().where(FileSearchGram.file_hash == file.hash))
+        for items in batched(counter.items(), BULK_INSERT_SIZE):
+            await pw_db.execute(
+                FileSearchGram.insert_many([{"file_hash": file.hash, "gram": gram, "tf": tf} for gram, tf in items])
+            )
+    logger.info(f"search index updated for file: {file.id}, {len(counter)} grams")
+
+
+async def backfill_search_index(start=0, end=0, force=False) -> int:
+    """
+    为已有文件补建全文检索索引, 返回处理的文件数
+    只使用已生成的 PDF 缓存, 缺少字符索引的文件需先执行 make_pdf_cache
+    """
+    cond = NewFile.pdf.is_null(False)
+    if start:
+        cond &= NewFile.id >= start
+    if end:
+        cond &= NewFile.id <= end
+
+    done_hashes = set()
+    count = last_id = 0
+    while files := list(
+        await pw_db.execute(
+            NewFile.select().where(cond, NewFile.id > last_id).order_by(NewFile.id).limit(BACKFILL_BATCH_SIZE)
+        )
+    ):
+        last_id = files[-1].id
+        for file in files:
+            if file.hash in done_hashes:
+                continue
+            done_hashes.add(file.hash)
+            try:
+                await update_search_index(file, force=force)
+            except Exception as e:
+                logger.exception(f"{file.id} update search index error {e}")
+                continue
+            count += 1
+    return count
+
+
+async def delete_search_index(file_hash: str):
+    await pw_db.execute(FileSearchGram.delete().where(FileSearchGram.file_hash == file_hash))
+
+
+async def find_candidates(keyword: str, file_hashes: list[str]) -> list[tuple[str, int]]:
+    """
+    包含关键词所有 n-gram 的文件 hash, 及其 n-gram 最小出现次数(命中次数上界), 按上界降序
+    """
+    grams = query_grams(keyword)
+    if not grams or not file_hashes:
+        return []
+    query = (
+        FileSearchGram.select(FileSearchGram.file_hash, fn.MIN(FileSearchGram.tf).alias("tf"))
+        .where(FileSearchGram.gram.in_(list(grams)), FileSearchGram.file_hash.in_(file_hashes))
+        .group_by(FileSearchGram.file_hash)
+        .having(fn.COUNT(FileSearchGram.id) == len(grams))
+        .order_by(SQL("tf").desc())
+        .tuples()
+    )
+    return list(await pw_db.execute(query))
+
+
+def search_in_files(keyword: str, files: list[NewFile], candidates: list[tuple[str, int]], limit: int) -> list[dict]:
+    """
+    在候选文件中精确查找关键词(n-gram 命中可能是误报), 返回按实际命中次数排序的前 limit 个文件
+    候选按命中次数上界降序, 上界已不可能超过当前第 limit 名时停止校验
+    """
+    from remarkable.plugins.fileapi.worker import PDFCache
+
+    files_by_hash = {}
+    for file in files:
+        files_by_hash.setdefault(file.hash, []).append(file)
+
+    res = []
+    for file_hash, upper_bound in candidates:
+        if len(res) >= limit and upper_bound <= res[limit - 1]["hits"]:
+            break
+        same_files = files_by_hash.get(file_hash)
+        if not same_files:
+            continue
+        results = PDFCache(same_files[0]).search(keyword)
+        if not results:
+            continue
+        for file in same_files:
+            res.append(
+                {
+                    "file_id": file.id,
+                    "name": file.name,
+                    "tree_id": file.tree_id,
+                    "hits": len(results),
+                    "results": results,
+                }
+            )
+        res.sort(key=lambda x: x["hits"], reverse=True)
+    return res[:limit]
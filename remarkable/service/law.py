@@ -135,13 +135,19 @@ async def judge_file_law_rule(file_id, chatdoc_unique, rule_id, cp_ids):
         return
 
     check_points = await pw_db.execute(LawCheckPoint.select(include_deleted=True).where(LawCheckPoint.id.in_(cp_ids)))
+    pending = []
     for cp in check_points:
         result = await LawJudgeResult.get_by_cond((LawJudgeResult.file_id == file_id) & (LawJudgeResult.cp_id == cp.id))
         if result:
             await pw_db.update(result, judge_status=JudgeStatusEnum.DOING)
+            pending.append((cp, result))
 
-            data = await judge_check_point(cp, law_rule.order.name, contents, rects)
-            await pw_db.update(result, **data)
+    async def judge(cp, result):
+        data = await judge_check_point(cp, law_rule.order.name, contents, rects)
+        await pw_db.update(result, **data)
+
+    # 各检查点的 LLM 请求经 llm_dispatcher 并发发出, 并发数由 ai.llm.concurrency 限制
+    await asyncio.gather(*(judge(cp, result) for cp, result in pending))
 
 
 async def judge_check_point_template(
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import re
 from typing import Literal
@@ -14,6 +15,7 @@ from remarkable.routers.schemas.law import (
     RuleKeywordsSchema,
 )
 from remarkable.service.chatgpt import AsyncOpenAIClient
+from remarkable.service.llm_dispatcher import llm_dispatcher
 from remarkable.utils.split_law import P_SECTION_TIAO
 
 logger = logging.getLogger(__name__)
@@ -355,22 +357,36 @@ async def check_contract_compliance(check_points, contents, law_name):
     )
 
     messages = [{"role": "user", "content": content}]
-    openai_client = AsyncOpenAIClient()
-
-    gpt_res = await openai_client.send_message(messages, response_format_type="json_object")
+    gpt_res = await llm_dispatcher.send(
+        messages,
+        response_format_type="json_object",
+        schema=ContractComplianceResultLLMS.__name__,
+        validate=ContractComplianceResultLLMS.model_validate_json,
+    )
     try:
         res = ContractComplianceResultLLMS.model_validate_json(gpt_res)
     except Exception as e:
         logger.error(gpt_res)
         raise e
-    for check_point in res.check_points:
-        if "片段" in check_point.judgment_basis:
-            format_prompt = f"移除下面文本中`片段`编号等相关字样，使语句通顺后返回。(可移除不必要部分)\n\n{check_point.judgment_basis}"
-            _res = await openai_client.send_message(
-                [{"role": "user", "content": format_prompt}], response_format_type="json_object"
+
+    to_format = [check_point for check_point in res.check_points if "片段" in check_point.judgment_basis]
+    formatted = await asyncio.gather(
+        *(
+            llm_dispatcher.send(
+                [
+                    {
+                        "role": "user",
+                        "content": f"移除下面文本中`片段`编号等相关字样，使语句通顺后返回。(可移除不必要部分)\n\n{check_point.judgment_basis}",
+                    }
+                ],
+                response_format_type="json_object",
             )
-            logger.info(f"rm 片段:\nin: {check_point.judgment_basis}\nout: {_res}")
-            check_point.judgment_basis = _res
+            for check_point in to_format
+        )
+    )
+    for check_point, _res in zip(to_format, formatted):
+        logger.info(f"rm 片段:\nin: {check_point.judgment_basis}\nout: {_res}")
+        check_point.judgment_basis = _res
     return res
 
 
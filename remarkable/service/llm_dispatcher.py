@@ -0,0 +1,168 @@
+"""
+共享的异步 LLM 调用入口
+
+- 并发上限: ai.llm.concurrency, 按事件循环各自计数
+- 同一事件循环内相同的请求只发一次, 其余调用等待同一结果
+- 响应按 (模型, 输出 schema, 请求内容哈希) 缓存在 redis 中, ai.llm.cache_expire 秒后过期, 为 0 时不缓存;
+  传入 validate 时只缓存校验通过的响应, 格式错误的回复不会在重试时被反复读出
+
+预测字段(LLModel)和法规检查点(judge_file_law_rule)通过 gather 一次发出全部请求, 总耗时接近最慢的一次请求.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Literal, TypeVar
+
+from remarkable.config import get_config
+from remarkable.db import init_rdb
+from remarkable.service.chatgpt import AsyncOpenAIClient
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_CACHE_EXPIRE = 7 * 24 * 3600
+CACHE_NAMESPACE = "llm"
+
+
+class _LoopState:
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.inflight: dict[str, asyncio.Future] = {}
+        self.client = AsyncOpenAIClient()
+
+
+class LLMDispatcher:
+    def __init__(self, concurrency: int | None = None, cache_expire: int | None = None):
+        self.concurrency = concurrency
+        self.cache_expire = cache_expire
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # semaphore/future/httpx 连接都绑定在事件循环上, worker 中每个任务可能使用新的事件循环
+        self._states: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState] = weakref.WeakKeyDictionary()
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        if loop not in self._states:
+            concurrency = self.concurrency or get_config("ai.llm.concurrency") or DEFAULT_CONCURRENCY
+            self._states[loop] = _LoopState(concurrency)
+        return self._states[loop]
+
+    @property
+    def expire_seconds(self) -> int:
+        if self.cache_expire is not None:
+            return self.cache_expire
+        expire = get_config("ai.llm.cache_expire")
+        return DEFAULT_CACHE_EXPIRE if expire is None else expire
+
+    @staticmethod
+    def cache_key(
+        messages: list[dict[Literal["role", "content"], str]],
+        options: dict | None = None,
+        response_format_type: str = "text",
+        schema: str = "",
+    ) -> str:
+        options = options or {}
+        model = options.get("model") or get_config("ai.openai.model")
+        payload = json.dumps(
+            [messages, {k: v for k, v in options.items() if k != "timeout"}, response_format_type],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return f"{CACHE_NAMESPACE}:{model}:{schema}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def _cache_get(self, key: str) -> str | None:
+        try:
+            value = init_rdb().get(key)
+        except Exception as exp:
+            logger.warning(f"failed to read llm cache: {exp}")
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _cache_set(self, key: str, value: str):
+        try:
+            init_rdb().set(key, value, ex=self.expire_seconds)
+        except Exception as exp:
+            logger.warning(f"failed to write llm cache: {exp}")
+
+    async def send(
+        self,
+        messages: list[dict[Literal["role", "content"], str]],
+        options: dict | None = None,
+        response_format_type: str = "text",
+        schema: str = "",
+        validate: Callable[[str], Any] | None = None,
+    ) -> str:
+        """
+        参数同 AsyncOpenAIClient.send_message, schema 为期望输出的结构名, 作为缓存键的一部分
+        validate 在写缓存前解析响应, 抛出异常时不缓存, 响应仍原样返回由调用方处理
+        """
+        key = self.cache_key(messages, options, response_format_type, schema)
+        state = self._state()
+        if key in state.inflight:
+            self.coalesced += 1
+            return await asyncio.shield(state.inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        state.inflight[key] = future
+        try:
+            result = await self._send(state, key, messages, options, response_format_type, validate)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exp:
+            future.set_exception(exp)
+            future.exception()  # 没有其他调用方等待时避免 "exception was never retrieved"
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            state.inflight.pop(key, None)
+
+    async def _send(self, state: _LoopState, key, messages, options, response_format_type, validate) -> str:
+        use_cache = self.expire_seconds > 0
+        if use_cache and (cached := await asyncio.to_thread(self._cache_get, key)) is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        async with state.semaphore:
+            result = await state.client.send_message(messages, options, response_format_type=response_format_type)
+        if use_cache and result and self._is_valid(result, validate):
+            await asyncio.to_thread(self._cache_set, key, result)
+        return result
+
+    @staticmethod
+    def _is_valid(result: str, validate: Callable[[str], Any] | None) -> bool:
+        if validate is None:
+            return True
+        try:
+            validate(result)
+        except Exception as exp:
+            logger.warning(f"llm response not cached, validate failed: {exp}")
+            return False
+        return True
+
+    async def gather(self, requests: list[dict]) -> list[str | Exception]:
+        """requests 中每项为 send 的关键字参数, 结果按顺序返回, 失败的请求返回对应的异常"""
+        return await asyncio.gather(*(self.send(**request) for request in requests), return_exceptions=True)
+
+    @staticmethod
+    def run(coro: Coroutine[None, None, R]) -> R:
+        """同步代码(如预测模型)中调用; 当前线程已有运行中的事件循环时, 在新线程的事件循环里运行"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+
+
+llm_dispatcher = LLMDispatcher()
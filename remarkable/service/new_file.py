@@ -52,6 +52,7 @@ from remarkable.pw_models.question import NewQuestion
 from remarkable.rule.szse_poc.rules import get_date_range
 from remarkable.schema.answer import AnswerGroup
 from remarkable.service.cmfchina.util import sync_answer_data_stat
+from remarkable.service.fulltext_search import update_search_index
 from remarkable.service.mold_field import MoldFieldService
 from remarkable.service.new_file_project import NewFileProjectService
 from remarkable.service.new_mold import NewMoldService
@@ -894,6 +895,10 @@ async def create_pdf_cache(file: NewFile, force=False, by_pdfinsight=None):
         raise
 
     await file.update_(pdf_parse_status=pdf_cache.get_pdf_parse_status())
+    try:
+        await update_search_index(file, force=force)
+    except Exception as e:
+        logger.exception(f"{file.id} update search index error {e}")
     if get_config("notification.ready_for_annotate_notify") and file.pdf_parse_status == PDFParseStatus.COMPLETE:
         await ready_for_annotate_notify(file.id, file.name)
 
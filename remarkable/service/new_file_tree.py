@@ -9,7 +9,7 @@ from remarkable.common.exceptions import CustomError
 from remarkable.db import pw_db
 from remarkable.models.new_file import NewFile
 from remarkable.models.new_user import NewAdminUser
-from remarkable.pw_models.model import NewFileTree, NewMold, NewTag, NewTagRelation
+from remarkable.pw_models.model import FileTreeClosure, NewFileTree, NewMold, NewTag, NewTagRelation
 from remarkable.pw_models.question import NewQuestion
 from remarkable.pw_orm import func
 
@@ -113,39 +113,29 @@ class NewFileTreeService:
 
     @staticmethod
     async def get_related_tree_ids(tree_id: int) -> list[int]:
-        tree_ids = []
-
-        async def find_sub_dir(dir_id):
-            file_trees = await NewFileTree.find_by_kwargs(ptree_id=dir_id, delegate="all")
-            if file_trees:
-                for file_tree in file_trees:
-                    tree_ids.append(file_tree.id)
-                    await find_sub_dir(file_tree.id)
-
-        tree_ids.append(tree_id)
-        await find_sub_dir(tree_id)
+        """当前目录及其所有下级目录的 id, 当前目录在最前"""
+        query = (
+            NewFileTree.select(NewFileTree.id)
+            .join(FileTreeClosure, on=(FileTreeClosure.descendant_id == NewFileTree.id))
+            .where(FileTreeClosure.ancestor_id == tree_id, FileTreeClosure.depth > 0)
+            .order_by(FileTreeClosure.depth, NewFileTree.id)
+        )
+        return [tree_id] + [tree.id for tree in await pw_db.execute(query)]
 
-        return tree_ids
+    @staticmethod
+    def related_tree_ids_query(tree_ids: list[int]):
+        """子查询: 目录及其所有下级目录(不含已删除的)的 id, 直接用于 IN 条件, 不必先查出目录列表"""
+        return NewFileTree.select(NewFileTree.id).where(NewFileTree.id.in_(FileTreeClosure.descendants(tree_ids)))
 
     @staticmethod
     async def get_all_parent_trees(tree_ids: list[int]):
-        own = NewFileTree.select().where(NewFileTree.id.in_(tree_ids)).cte("base", recursive=True)
-        parent = NewFileTree.alias("parent")
-        recursive = parent.select().join(own, on=(own.c.ptree_id == parent.id))
-        cte = own.union_all(recursive)
-        subquery = cte.select_from(cte.c.id, cte.c.name, cte.c.ptree_id, cte.c.meta)
-        exist_query = fn.EXISTS(subquery.where(cte.c.id == NewFileTree.id))
-        return await pw_db.prefetch(NewFileTree.select().where(exist_query).order_by(NewFileTree.id))
+        query = NewFileTree.select().where(NewFileTree.id.in_(FileTreeClosure.ancestors(tree_ids)))
+        return await pw_db.prefetch(query.order_by(NewFileTree.id))
 
     @staticmethod
     async def get_all_child_trees(rtree_ids: list[int]):
-        parent = NewFileTree.select().where(NewFileTree.ptree_id.in_(rtree_ids)).cte("base", recursive=True)
-        child = NewFileTree.alias("child")
-        recursive = child.select().join(parent, on=(child.ptree_id == parent.c.id))
-        cte = parent.union_all(recursive)
-        subquery = cte.select_from(cte.c.id, cte.c.name, cte.c.ptree_id, cte.c.meta)
-        exist_query = peewee.fn.EXISTS(subquery.select().where(cte.c.id == NewFileTree.id))
-        return await pw_db.prefetch(NewFileTree.select().where(exist_query).order_by(NewFileTree.id))
+        query = NewFileTree.select().where(NewFileTree.id.in_(FileTreeClosure.descendants(rtree_ids, min_depth=1)))
+        return await pw_db.prefetch(query.order_by(NewFileTree.id))
 
     @staticmethod
     async def get_ai_status_summary(prj_id, tree_ids=None, mold_ids=None):
@@ -246,15 +236,14 @@ class NewFileTreeService:
 
 
 async def get_crumbs(tree_id: int) -> list[dict]:
-    from remarkable.pw_models.model import NewFileTree
-
-    own = NewFileTree.select().where(NewFileTree.id == tree_id).cte("base", recursive=True)
-    parent = NewFileTree.alias("parent")
-    recursive = parent.select().join(own, on=(own.c.ptree_id == parent.id))
-    cte = own.union_all(recursive)
-    subquery = cte.select_from(cte.c.id, cte.c.name, cte.c.ptree_id, cte.c.meta)
-    exist_query = fn.EXISTS(subquery.where(cte.c.id == NewFileTree.id))
-    trees = await pw_db.prefetch(NewFileTree.select().where(exist_query).order_by(NewFileTree.id))
+    """从根目录到当前目录的路径"""
+    query = (
+        NewFileTree.select()
+        .join(FileTreeClosure, on=(FileTreeClosure.ancestor_id == NewFileTree.id))
+        .where(FileTreeClosure.descendant_id == tree_id)
+        .order_by(FileTreeClosure.depth.desc())
+    )
+    trees = await pw_db.execute(query)
     return [
         {
             "id": tree.id,
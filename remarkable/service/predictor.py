@@ -5,6 +5,7 @@ import re
 import string
 import tempfile
 from collections import Counter, OrderedDict
+from functools import lru_cache
 from math import ceil
 from pathlib import Path
 from subprocess import Popen
@@ -16,11 +17,45 @@ from remarkable.common.util import clean_txt
 from remarkable.config import project_root
 from remarkable.pdfinsight.reader import PdfinsightReader
 
-match_cache = {}
 MAX_CHAR_LENGTH = 10
+MATCH_CACHE_SIZE = 1 << 14
 P_SPLIT = re.compile(r"[。！!]")
 
 
+@lru_cache(maxsize=MATCH_CACHE_SIZE)
+def is_subsequence(words: tuple[str, ...], pattern: tuple[str, ...]) -> bool:
+    """pattern 是否为 words 的子序列(不要求连续); 有界缓存, 常驻 worker 中内存不会持续增长"""
+    cursor = 0
+    for word in words:
+        if pattern[cursor] == word:
+            cursor += 1
+            if cursor >= len(pattern):
+                return True
+    return False
+
+
+class VMSPPattern:
+    """编译后的 vmsp 特征序列, 训练好的模型数据在加载时转换一次, 匹配时不再重复拼接/转换"""
+
+    __slots__ = ("words", "text")
+
+    def __init__(self, words):
+        self.words = tuple(words)
+        self.text = "".join(self.words)
+
+    def __bool__(self):
+        return bool(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __repr__(self):
+        return repr(list(self.words))
+
+
 class PatternString:
     translate = str.maketrans("", "", string.punctuation + "“”，。；（）？！")
     featured_words = OrderedDict(
@@ -50,6 +85,7 @@ class PatternString:
             for text in sub_texts:
                 self.words.extend(list(jieba.cut(text)))
         self.normalized_words = [PatternString.normalize_word(w) for w in self.words]
+        self._direction_words = {}
 
     @property
     def normalized_text(self):
@@ -67,32 +103,27 @@ class PatternString:
         # return lower_translated if lower_translated not in stopwords.words["english"] else ""
         return word.replace(" ", "")
 
+    def direction_words(self, direction=None) -> VMSPPattern:
+        if direction not in self._direction_words:
+            if direction == "left":
+                # 意为答案左边的部分
+                _words = self.normalized_words[MAX_CHAR_LENGTH * -1 :]
+            elif direction == "right":
+                _words = self.normalized_words[:MAX_CHAR_LENGTH]
+            else:
+                _words = self.normalized_words
+            self._direction_words[direction] = VMSPPattern(_words)
+        return self._direction_words[direction]
+
     def match_vmsp_pattern(self, pattern, direction=None):
         if not pattern:
             return not self.words
-        if direction == "left":
-            # 意为答案左边的部分
-            _words = self.normalized_words[MAX_CHAR_LENGTH * -1 :]
-        elif direction == "right":
-            _words = self.normalized_words[:MAX_CHAR_LENGTH]
-        else:
-            _words = self.normalized_words
-        if "".join(_words) == "".join(pattern):
+        if not isinstance(pattern, VMSPPattern):
+            pattern = VMSPPattern(pattern)
+        _words = self.direction_words(direction)
+        if _words.text == pattern.text:
             return True
-        match_key = "_".join(_words + ["|||"] + pattern)
-        result = match_cache.get(match_key)
-        if result is None:
-            cursor = 0
-            for word in _words:
-                if pattern[cursor] == word:
-                    cursor += 1
-                if cursor >= len(pattern):
-                    result = True
-                    break
-            else:
-                result = False
-            match_cache[match_key] = result
-        return result
+        return is_subsequence(_words.words, pattern.words)
 
     def vmsp_input(self, side="right", max_words=20):
         words = self.normalized_words
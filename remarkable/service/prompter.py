@@ -19,7 +19,7 @@ from remarkable.models.model_version import NewModelVersion
 from remarkable.models.new_file import NewFile
 from remarkable.optools.stat_scriber_answer import StatScriberAnswer
 from remarkable.prompter.builder import AnswerPrompterBuilder
-from remarkable.prompter.utils import extract_pred_feature, extract_train_feature, train
+from remarkable.prompter.utils import extract_pred_feature, extract_train_feature, iter_pred, train
 from remarkable.pw_models.model import NewMold, NewSpecialAnswer
 from remarkable.pw_models.question import NewQuestion
 from remarkable.service.crude_answer import predict_crude_answer
@@ -27,7 +27,9 @@ from remarkable.service.crude_answer import predict_crude_answer
 logger = logging.getLogger(__name__)
 
 
-async def load_data_v2(schema_id, vid=0, update=False, clear=False, limit=0, start=None, end=None, cond=None):
+async def load_data_v2(
+    schema_id, vid=0, update=False, clear=False, limit=0, start=None, end=None, cond=None, incremental=False
+):
     mold_data = await get_mold_data(schema_id)
     rows = await get_files_data(schema_id, limit, start, end, cond)
     tasks = []
@@ -36,7 +38,7 @@ async def load_data_v2(schema_id, vid=0, update=False, clear=False, limit=0, sta
     builder = AnswerPrompterBuilder(schema_id, vid)
     if clear:
         builder.clear()
-    builder.update(mold_data, tasks)
+    builder.update(mold_data, tasks, incremental=incremental)
     if vid:
         await NewModelVersion.update_by_pk(
             vid,
@@ -60,6 +62,32 @@ def extract_feature_v2(schema_id, vid=0, start=0, end=0, for_test=False):
         extract_pred_feature(schema_id, vid, start, end)
 
 
+def predict_v2(schema_id, vid=0, start=0, end=0, save_path=None) -> int:
+    """
+    对 elements 目录中 start..end 的文档逐个预测初步定位结果, 返回预测的文档数
+    每个文档的结果写到 save_path/{doc_id}.json 后即释放, 不在内存中保留整个范围的特征和结果
+    """
+    if save_path:
+        os.makedirs(save_path, exist_ok=True)
+    count = 0
+    for doc_id, answers in iter_pred(
+        schema_id,
+        vid,
+        pred_start=start,
+        pred_end=end,
+        rules_use_post_process=(config.get_config("prompter.post_process") or []),
+        use_syllabuses=config.get_config("prompter.use_syllabuses", True),
+        tokenization=(config.get_config("prompter.tokenization") or None),
+        context_length=config.get_config("prompter.context_length", 1),
+        separate_paragraph_table=config.get_config("prompter.separate_paragraph_table", True),
+    ):
+        count += 1
+        if save_path:
+            with open(os.path.join(save_path, f"{doc_id}.json"), "w") as file_obj:
+                json.dump(answers, file_obj, ensure_ascii=False)
+    return count
+
+
 def train_v2(schema_id, vid=0):
     train(
         schema_id,
@@ -69,6 +97,20 @@ def train_v2(schema_id, vid=0):
     )
 
 
+def train_incremental_v2(schema_id, vid=0) -> dict:
+    """只用有变化的文件更新训练数据, 只训练正例有变化的字段, 需先全量训练过一次"""
+    from remarkable.prompter.incremental import train_incremental
+
+    return train_incremental(
+        schema_id,
+        vid=vid,
+        use_syllabuses=config.get_config("prompter.use_syllabuses", True),
+        tokenization=(config.get_config("prompter.tokenization") or None),
+        context_length=config.get_config("prompter.context_length", 1),
+        separate_paragraph_table=config.get_config("prompter.separate_paragraph_table", True),
+    )
+
+
 async def predict_crude_answer_delegate(
     fid,
     qid,
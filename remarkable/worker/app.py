@@ -98,12 +98,21 @@ for key, switch in cron_task_switch.items():
     beat_schedule[key] = schedules[key]
 
 
+# 常驻模式下子进程按内存水位回收, 否则每个任务后重启
+max_tasks_per_child = 1
+max_memory_per_child = None
+if get_config("worker.warm.enable"):
+    max_tasks_per_child = get_config("worker.warm.max_tasks_per_child") or None
+    # celery 的单位是 KB
+    max_memory_per_child = int((get_config("worker.warm.max_memory_per_child") or 0) * 1024) or None
+
 app.conf.update(
     timezone="Asia/Shanghai",
     task_always_eager=bool(get_config("worker.task_always_eager")),
     enable_utc=True,
     worker_prefetch_multiplier=1,
-    worker_max_tasks_per_child=1,
+    worker_max_tasks_per_child=max_tasks_per_child,
+    worker_max_memory_per_child=max_memory_per_child,
     task_routes={
         # training_queue
         "remarkable.worker.tasks.update_model": training_queue,
@@ -124,6 +133,9 @@ app.conf.update(
     broker_connection_retry_on_startup=True,  # 重启时重连
 )
 
+# 注册子进程预加载和任务耗时统计
+import remarkable.worker.warmup  # noqa: E402, F401
+
 
 class FakeAsyncTask:
     def __init__(self, task):
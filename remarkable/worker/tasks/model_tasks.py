@@ -13,6 +13,7 @@ from remarkable.service.prompter import (
     extract_feature_v2,
     load_data_v2,
     predict_crude_answer_by_range,
+    train_incremental_v2,
     train_v2,
 )
 from remarkable.worker.app import app
@@ -45,25 +46,29 @@ async def update_predict_model(schema_id, mv_id=0, tree_l=None):
 @app.task
 @loop_wrapper
 @peewee_transaction_wrapper
-async def update_model_v2(schema_id, cond=None, mv_id=0):
+async def update_model_v2(schema_id, cond=None, mv_id=0, incremental=False):
     from remarkable.service.new_question import batch_preset
 
     exp_flag = False
     mold = await NewMold.find_by_id(schema_id)
     try:
         # 读取文档数据和答案 `inv prompter.load-data-v2 5 --start=200 --end=300 --clear --update`
-        await load_data_v2(schema_id, vid=mv_id, update=True, clear=True, cond=cond)
+        await load_data_v2(schema_id, vid=mv_id, update=True, clear=not incremental, cond=cond, incremental=incremental)
         if not mv_id:
             await mold.update_(progress=0.3, comment="v2 update complete")
 
         await NewModelVersion.update_by_pk(mv_id, status=PredictorTrainingStatus.TRAINING.value)
-        # 生成训练数据 `inv prompter.extract-feature-v2 5 --start=200 --end=300`
-        extract_feature_v2(schema_id, mv_id)
-        if not mv_id:
-            await mold.update_(progress=0.6, comment="v2 extract complete")
+        if incremental:
+            # 增量训练 `inv prompter.train-incremental-v2 5`
+            train_incremental_v2(schema_id, mv_id)
+        else:
+            # 生成训练数据 `inv prompter.extract-feature-v2 5 --start=200 --end=300`
+            extract_feature_v2(schema_id, mv_id)
+            if not mv_id:
+                await mold.update_(progress=0.6, comment="v2 extract complete")
 
-        # 训练 `inv prompter.train-v2 5`
-        train_v2(schema_id, mv_id)
+            # 训练 `inv prompter.train-v2 5`
+            train_v2(schema_id, mv_id)
         if not mv_id:
             await mold.update_(progress=0.8, comment="v2 train complete")
         # else:
@@ -1,12 +1,16 @@
 import logging
+import re
 import shutil
 import tempfile
 from datetime import datetime
+from itertools import batched, islice
 from pathlib import Path
+from typing import Iterable, Iterator
 
 import openpyxl
 import oracledb
 import xlrd
+from openpyxl.utils import range_boundaries
 
 from remarkable.common.constants import PDFParseStatus
 from remarkable.common.storage import localstorage
@@ -22,97 +26,125 @@ from remarkable.worker.app import app
 logger = logging.getLogger(__name__)
 
 
-def parse_xls(path: Path) -> dict[int, list[dict]]:
-    def _is_merged_cell(_row_idx, _col_idx):
-        return any(r[0] <= _row_idx < r[1] and r[2] <= _col_idx < r[3] for r in merged_cells)
-
-    workbook = xlrd.open_workbook(path, formatting_info=True)
-    sheets_info = {}
-    for sheet_idx, sheet in enumerate(workbook.sheets()):
-        data = []
-        merged_cells = sheet.merged_cells  # 起始行、结束行、起始列和结束列的索引
-        for row_idx, row_cells in enumerate(sheet.get_rows()):
-            row_dict = {}
-            tb_merge = []
-            for col_idx, cell in enumerate(row_cells):
-                if _is_merged_cell(row_idx, col_idx):
-                    tb_merge.append(f"{row_idx}_{col_idx}")
-                row_dict.update({f"col{col_idx}": str(cell.value)})
-            row_dict.update({"l_table_line": row_idx, "tb_merge": ",".join(tb_merge), "vc_sheet_name": sheet.name})
-            data.append(row_dict)
-        sheets_info.update({sheet_idx: data})
-    return sheets_info
-
-
-def parse_xlsx(path: Path) -> dict[int, list[dict]]:
-    def _is_merged_cell(_row_idx, _col_idx):
-        return any(
-            merged_range.min_row <= _row_idx <= merged_range.max_row
-            and merged_range.min_col <= _col_idx <= merged_range.max_col
-            for merged_range in merged_cells
-        )
+ROW_BATCH_SIZE = 5000
+ORACLE_IN_LIMIT = 1000  # oracle IN 列表最多 1000 项
+XML_CHUNK_SIZE = 1 << 20
+P_MERGE_CELL = re.compile(rb'<(?:\w+:)?mergeCell\b[^>]*?\bref="([^"]+)"')
 
+
+def merged_coordinates(ranges: Iterable[tuple[int, int, int, int]]) -> set[tuple[int, int]]:
+    """合并单元格区域(起始行、结束行、起始列和结束列, 左闭右开, 从 0 开始)展开为其中各单元格的 (行, 列)"""
+    return {(row, col) for rlo, rhi, clo, chi in ranges for row in range(rlo, rhi) for col in range(clo, chi)}
+
+
+def build_row(row_idx: int, values: Iterable, merged: set[tuple[int, int]], sheet_name: str) -> dict:
+    row_dict = {}
+    tb_merge = []
+    for col_idx, value in enumerate(values):
+        if (row_idx, col_idx) in merged:
+            tb_merge.append(f"{row_idx}_{col_idx}")
+        row_dict[f"col{col_idx}"] = str(value)
+    row_dict.update({"l_table_line": row_idx, "tb_merge": ",".join(tb_merge), "vc_sheet_name": sheet_name})
+    return row_dict
+
+
+def parse_xls(path: Path) -> Iterator[tuple[int, dict]]:
+    """逐行返回 (sheet 序号, 行数据), 读完一个 sheet 即释放"""
+    workbook = xlrd.open_workbook(path, formatting_info=True, on_demand=True)
+    try:
+        for sheet_idx in range(workbook.nsheets):
+            sheet = workbook.sheet_by_index(sheet_idx)
+            merged = merged_coordinates(sheet.merged_cells)
+            for row_idx, row_cells in enumerate(sheet.get_rows()):
+                yield sheet_idx, build_row(row_idx, (cell.value for cell in row_cells), merged, sheet.name)
+            workbook.unload_sheet(sheet_idx)
+    finally:
+        workbook.release_resources()
+
+
+def read_merged_ranges(sheet) -> Iterator[tuple[int, int, int, int]]:
+    """
+    只读模式下 openpyxl 不解析合并单元格, 直接在 sheet 的 xml 中分块查找 mergeCell,
+    比逐个元素解析整个 xml 快得多; 单元格文本中的 "<" 已转义, 不会误匹配
+    """
+    with sheet._get_source() as src:
+        tail = b""
+        while chunk := src.read(XML_CHUNK_SIZE):
+            buffer = tail + chunk
+            last = 0
+            for match in P_MERGE_CELL.finditer(buffer):
+                min_col, min_row, max_col, max_row = range_boundaries(match.group(1).decode())
+                yield min_row - 1, max_row, min_col - 1, max_col
+                last = match.end()
+            # 保留块尾, 跨块的标签在下一块中匹配
+            tail = buffer[max(last, len(buffer) - 256) :]
+
+
+def parse_xlsx(path: Path) -> Iterator[tuple[int, dict]]:
+    """以只读模式逐行返回 (sheet 序号, 行数据), 不把整个工作簿载入内存"""
     with tempfile.NamedTemporaryFile(suffix=".xlsx", dir=get_config("web.tmp_dir")) as temp_file:
         temp_file_path = temp_file.name
         shutil.copy2(path, temp_file_path)
-        workbook = openpyxl.load_workbook(temp_file_path)
-        sheets = workbook.worksheets
-        sheets_info = {}
-        for sheet_idx, sheet in enumerate(sheets):
-            data = []
-            merged_cells = sheet.merged_cells.ranges
-            for idx, row in enumerate(sheet.iter_rows()):
-                row_dict = {}
-                tb_merge = []
-                for cell in row:
-                    row_idx = cell.row
-                    col_idx = cell.column
-                    if _is_merged_cell(row_idx, col_idx):
-                        tb_merge.append(f"{row_idx - 1}_{col_idx - 1}")
-                    row_dict.update({f"col{col_idx - 1}": str(cell.value)})
-                row_dict.update({"l_table_line": idx, "tb_merge": ",".join(tb_merge), "vc_sheet_name": sheet.title})
-                data.append(row_dict)
-            sheets_info.update({sheet_idx: data})
-
-        return sheets_info
-
-
-def construct_table_dict(excel_data: dict[int, list[dict]], base_data: dict) -> tuple[list[dict], list[dict]]:
+        workbook = openpyxl.load_workbook(temp_file_path, read_only=True)
+        try:
+            for sheet_idx, sheet in enumerate(workbook.worksheets):
+                merged = merged_coordinates(read_merged_ranges(sheet))
+                # 只读模式按文件中记录的尺寸读取, 非 Excel 生成的文件可能记录有误而丢行丢列;
+                # 忽略记录的尺寸, 先扫一遍得到实际列数和最后一个有单元格的行, 再逐行补齐, 保证各行列数相同.
+                # 只设置了行高等格式、没有单元格的尾行不输出, 与完整模式一致
+                sheet.reset_dimensions()
+                max_column, row_count = 0, 0
+                for row_idx, values in enumerate(sheet.iter_rows(values_only=True)):
+                    if values:
+                        max_column, row_count = max(max_column, len(values)), row_idx + 1
+                for row_idx, values in enumerate(islice(sheet.iter_rows(values_only=True), row_count)):
+                    values = tuple(values) + (None,) * (max_column - len(values))
+                    yield sheet_idx, build_row(row_idx, values, merged, sheet.title)
+        finally:
+            workbook.close()
+
+
+def construct_table_dict(
+    rows: Iterable[tuple[int, dict]], base_data: dict
+) -> tuple[list[dict], list[tuple[tuple[int, int], dict]]]:
+    """返回主表数据, 以及 clob 行的 ((sheet 序号, 行号), 扩展表数据)"""
     results = []
     results_ex = []
-    for sheet_idx, sheet_data in excel_data.items():
-        for data in sheet_data:
-            data.update(**base_data)
-            data.update({"l_sheet_no": sheet_idx})
-            parse_res = TExcelParsingResult(**data)
-            if parse_res.is_clob is True:
-                results_ex.append(
+    for sheet_idx, data in rows:
+        data.update(**base_data)
+        data.update({"l_sheet_no": sheet_idx})
+        parse_res = TExcelParsingResult(**data)
+        if parse_res.is_clob is True:
+            results_ex.append(
+                (
+                    (sheet_idx, data["l_table_line"]),
                     {
-                        f"{base_data['vc_seq_no']}-{base_data['file_id']}-{data['l_sheet_no']}-{data['l_table_line']}": {
-                            "dt_insert_time": base_data["dt_insert_time"],
-                            "dt_update_time": base_data["dt_update_time"],
-                            **parse_res.process_table_ex_attr(),
-                        }
-                    }
+                        "dt_insert_time": base_data["dt_insert_time"],
+                        "dt_update_time": base_data["dt_update_time"],
+                        **parse_res.process_table_ex_attr(),
+                    },
                 )
-            results.append(parse_res.to_dict())
+            )
+        results.append(parse_res.to_dict())
     return results, results_ex
 
 
-def insert_data_to_database(cursor, table_data: list[dict], table_data_ex: list[dict]):
+def insert_data_to_database(
+    cursor, base_data: dict, table_data: list[dict], table_data_ex: list[tuple[tuple[int, int], dict]]
+):
     insert_sql = TExcelParsingResult.insert_sql()
     cursor.executemany(insert_sql, table_data)
     if table_data_ex:
         ex_data = []
-        for data in table_data_ex:
-            for key, value in data.items():
-                vc_seq_no, file_id, l_sheet_no, l_table_line = key.split("-")
-                query = TExcelParsingResult.query_row_sql(
-                    vc_seq_no=vc_seq_no, file_id=file_id, l_sheet_no=l_sheet_no, l_table_line=l_table_line
-                )
-                row = cursor.execute(query)
-                value.update({"vc_id": row.fetchone()[0]})
-                ex_data.append(TExcelParsingResultEx(**value).to_dict())
+        for chunk in batched(table_data_ex, ORACLE_IN_LIMIT):
+            query = TExcelParsingResult.query_rows_sql(
+                file_id=base_data["file_id"], vc_seq_no=base_data["vc_seq_no"], positions=[key for key, _ in chunk]
+            )
+            vc_ids = {
+                (int(l_sheet_no), int(l_table_line)): vc_id for vc_id, l_sheet_no, l_table_line in cursor.execute(query)
+            }
+            for key, value in chunk:
+                ex_data.append(TExcelParsingResultEx(vc_id=vc_ids[key], **value).to_dict())
         insert_ex_sql = TExcelParsingResultEx.insert_sql()
         cursor.executemany(insert_ex_sql, ex_data)
 
@@ -124,9 +156,9 @@ async def parse_excel_task(file_id: int, project_id: int, project_name: str):
     file = await NewFile.find_by_kwargs(id=file_id)
     path = localstorage.mount(file.path())
     if simple_match_ext(file.ext, path, "xls"):
-        data = parse_xls(path)
+        rows = parse_xls(path)
     elif simple_match_ext(file.ext, path, "xlsx"):
-        data = parse_xlsx(path)
+        rows = parse_xlsx(path)
     else:
         await file.update_(pdf_parse_status=PDFParseStatus.UNSUPPORTED_FILE)
         logger.error(f"文件{file.id=}: 该文件格式不在[xls,xlsx]中，解析失败")
@@ -141,17 +173,26 @@ async def parse_excel_task(file_id: int, project_id: int, project_name: str):
         "dt_insert_time": current_time,
         "dt_update_time": current_time,
     }
-    table_data, table_data_ex = construct_table_dict(data, base_info)
     connection = GFFundsWorkShop._db_connection()
     try:
         with connection.cursor() as cursor:
             cursor.execute(TExcelParsingResult.delete_with_fid(file.id))
-            insert_data_to_database(cursor, table_data, table_data_ex)
+            # 边解析边分批写入, 同一事务中提交
+            for batch in batched(rows, ROW_BATCH_SIZE):
+                insert_data_to_database(cursor, base_info, *construct_table_dict(batch, base_info))
             connection.commit()
     except oracledb.Error as error:
         connection.rollback()
         logger.error(f"{file.id=} EXCEL解析入库失败{error}")
         await file.update_(pdf_parse_status=PDFParseStatus.EXCEL_INSERT_DB_FAILED)
         return
+    except Exception:
+        # 边解析边写入, 文件损坏等解析异常发生在删除旧数据和部分写入之后, 同样需要回滚
+        connection.rollback()
+        logger.exception(f"{file.id=} EXCEL解析失败")
+        await file.update_(pdf_parse_status=PDFParseStatus.FAIL)
+        return
+    finally:
+        connection.close()
     logger.info(f"{file.id=} EXCEL解析入库成功")
     await file.update_(pdf_parse_status=PDFParseStatus.EXCEL_INSERT_DB_SUCCESS)
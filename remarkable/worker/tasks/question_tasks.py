@@ -1,9 +1,11 @@
+import asyncio
 import logging
 import os
 import shutil
 import tempfile
 import uuid
 from dataclasses import asdict
+from itertools import batched
 from typing import Literal
 
 import celery
@@ -33,7 +35,7 @@ from remarkable.models.new_file import NewFile
 from remarkable.plugins.cgs.services.comment import remove_docx_blank_comments
 from remarkable.plugins.fileapi.common import get_pdf_pages
 from remarkable.plugins.fileapi.worker import create_docx, create_pdf, create_pdf_cache
-from remarkable.pw_models.embedding import Embedding
+from remarkable.pw_models.embedding import Embedding, EmbeddingCache
 from remarkable.pw_models.model import NewFileProject, NewMold, NewTimeRecord
 from remarkable.pw_models.question import NewQuestion
 from remarkable.security import authtoken
@@ -49,6 +51,9 @@ from remarkable.worker.tasks.predict_tasks import judge_file
 
 logger = logging.getLogger(__name__)
 
+# 向量缓存查询、写入的每批条数
+EMBEDDING_BATCH_SIZE = 500
+
 
 @app.task
 @loop_wrapper
@@ -160,24 +165,57 @@ async def scanned_pdf_restore(fid):
 
 
 async def embed_file(file: NewFile):
+    """
+    增量生成文件的向量:
+    - 与已入库记录文本相同的块不再处理, 文件里已不存在的块删除
+    - 其余块先从 EmbeddingCache 按 (模型, 文本 hash) 取向量, 只有缓存里没有的文本才请求 embedding 接口
+    """
     data = msgspec.json.decode(read_zip_first_file(file.pdfinsight_path(abs_path=True)))
     data = InterdocHelper.process(data)
     doc = Document(data)
     contents = doc.make_contents()
 
-    records = []
-    client = OpenAIClient()
-    embeddings = client.get_embddings([content["text"] for content in contents])
-    for content, embedding in zip(contents, embeddings):
-        records.append({**content, "embedding": embedding, "file_id": file.id})
-    await Embedding.bulk_insert(
-        records,
-        on_conflict={
-            "action": "update",
-            "conflict_target": ("file_id", "index"),
-            "preserve": ("file_id", "index", "created_utc"),
-        },
-    )
+    existing = {
+        row["index"]: row["text"]
+        for row in await pw_db.execute(
+            Embedding.select(Embedding.index, Embedding.text).where(Embedding.file_id == file.id).dicts()
+        )
+    }
+    indexes = {content["index"] for content in contents}
+    if stale := [index for index in existing if index not in indexes]:
+        await pw_db.execute(Embedding.delete().where(Embedding.file_id == file.id, Embedding.index.in_(stale)))
+    contents = [content for content in contents if existing.get(content["index"]) != content["text"]]
+    if not contents:
+        return
+
+    model = get_config("ai.openai.embedding_model")
+    keys = [EmbeddingCache.text_key(content["text"]) for content in contents]
+    vectors = {}
+    for group in batched(set(keys), EMBEDDING_BATCH_SIZE):
+        vectors.update(await EmbeddingCache.get_many(model, list(group)))
+
+    missing = {}
+    for key, content in zip(keys, contents):
+        if key not in vectors:
+            missing.setdefault(key, content["text"])
+    logger.info(f"embed file {file.id}: {len(contents)} changed chunks, {len(missing)} sent to embedding backend")
+    if missing:
+        client = OpenAIClient()
+        embeddings = await asyncio.to_thread(lambda: list(client.get_embddings(list(missing.values()))))
+        fetched = dict(zip(missing, embeddings))
+        for group in batched(fetched.items(), EMBEDDING_BATCH_SIZE):
+            await EmbeddingCache.put_many(model, dict(group))
+        vectors.update(fetched)
+
+    for group in batched(zip(keys, contents), EMBEDDING_BATCH_SIZE):
+        await Embedding.bulk_insert(
+            [{**content, "embedding": vectors[key], "file_id": file.id} for key, content in group],
+            on_conflict={
+                "action": "update",
+                "conflict_target": ("file_id", "index"),
+                "preserve": ("file_id", "index", "created_utc"),
+            },
+        )
 
 
 async def get_force_ocr(mold_ids: list[int]):
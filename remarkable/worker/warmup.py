@@ -0,0 +1,88 @@
+"""
+常驻预测 worker
+
+worker.warm.enable 开启后, 子进程不再每个任务重启一次(worker_max_tasks_per_child), 改为常驻:
+- 子进程启动时预加载 worker.warm.preload_molds 中各 schema 的 prophet 配置、模型数据和定位模型
+- 常驻内存超过 worker.warm.max_memory_per_child(MB) 时, 当前任务完成后由 celery 替换该子进程
+每个任务结束时记录耗时, 区分进程启动(含预加载)和任务本身的时间.
+"""
+
+import logging
+import resource
+import time
+
+from celery.signals import task_postrun, task_prerun, worker_process_init
+
+from remarkable.common.util import loop_wrapper
+from remarkable.config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class _ProcessStats:
+    init_at = 0.0
+    startup_seconds = 0.0
+    task_count = 0
+    task_started: dict[str, float] = {}
+
+
+def warm_enabled() -> bool:
+    return bool(get_config("worker.warm.enable"))
+
+
+@loop_wrapper
+async def preload_mold(mold_id: int):
+    from remarkable.models.model_version import NewModelVersion
+    from remarkable.predictor.helpers import create_predictor_prophet
+    from remarkable.prompter.registry import prompter_models
+    from remarkable.pw_models.model import NewMold
+
+    mold = await NewMold.find_by_id(mold_id)
+    if not mold:
+        logger.warning(f"preload skipped, mold not found: {mold_id}")
+        return
+    vid = await NewModelVersion.get_enabled_version(mold.id)
+    model_version = await NewModelVersion.find_by_id(vid) if vid else None
+    # 导入 prophet 配置模块, 并把各字段的模型数据读入进程内缓存
+    prophet = create_predictor_prophet(mold, model_version=model_version)
+    predictors = prophet.root_predictor.sub_predictors[:] if prophet.depends_root_predictor else []
+    while predictors:
+        predictor = predictors.pop()
+        predictor.load_model_data()
+        predictors.extend(predictor.sub_predictors)
+    try:
+        prompter_models.get(mold.id, vid)
+    except Exception as exp:  # 没有定位模型的 schema 也可以预测
+        logger.info(f"no prompter model for mold {mold.id}: {exp}")
+
+
+@worker_process_init.connect
+def warm_up(**kwargs):
+    _ProcessStats.init_at = time.time()
+    if warm_enabled():
+        for mold_id in get_config("worker.warm.preload_molds") or []:
+            try:
+                preload_mold(int(mold_id))
+            except Exception as exp:
+                logger.exception(f"preload mold {mold_id} failed: {exp}")
+    _ProcessStats.startup_seconds = time.time() - _ProcessStats.init_at
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    _ProcessStats.task_started[task_id] = time.time()
+
+
+@task_postrun.connect
+def record_task_cost(task_id=None, task=None, state=None, **kwargs):
+    started = _ProcessStats.task_started.pop(task_id, None)
+    if started is None:
+        return
+    _ProcessStats.task_count += 1
+    # 进程启动耗时只计入该进程的第一个任务
+    startup = _ProcessStats.startup_seconds if _ProcessStats.task_count == 1 else 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    logger.info(
+        f"task {task.name if task else task_id} {state}: run {time.time() - started:.2f}s, "
+        f"startup {startup:.2f}s, #{_ProcessStats.task_count} in process, max rss {rss}MB"
+    )
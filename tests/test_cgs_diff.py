@@ -1,8 +1,10 @@
+import difflib
 from unittest import TestCase
 
 from remarkable.plugins.cgs.common.enum_utils import ConvertContentEnum
 from remarkable.plugins.cgs.common.para_similarity import ParagraphSimilarity
 from remarkable.plugins.cgs.common.patterns_util import P_PRIVATE_SIMILARITY_PATTERNS
+from remarkable.plugins.cgs.common.sentence_index import CharOverlapIndex
 
 
 class TestDiff(TestCase):
@@ -319,3 +321,18 @@ class TestDiff(TestCase):
             " 基 金 募 集 期 间 募 集 的 资 金 存 入 专 门 账 户 ， 在 募 集 结 束 前 。 任 何 人 不 得 动 用 。",
             ParagraphSimilarity(texts_a, texts_b, ratio=0.7).result_text,
         )
+
+    def test_char_overlap_candidates(self):
+        texts = ["基金管理人应当按照规定", "托管人", "基金份额持有人大会", ""]
+        index = CharOverlapIndex(texts)
+        for text in ("基金管理人按照规定", "持有人", "基金基金"):
+            overlaps = index.overlaps(text)
+            for pos, other in enumerate(texts):
+                matcher = difflib.SequenceMatcher(a=text, b=other)
+                self.assertEqual(matcher.quick_ratio(), 2.0 * overlaps[pos] / (len(text) + len(other)))
+
+        # 子串或 quick_ratio 达到阈值的组合才需要比较
+        self.assertEqual(
+            [[0], [], [1], []],
+            index.candidates(["基金管理人按照规定", "持有人"], 0.7),
+        )
@@ -0,0 +1,128 @@
+import datetime
+
+import pytest
+
+from remarkable.service.cmfchina.imap_email_receiver import IMAPEmailReceiver
+from remarkable.service.dcm_email.email_receiver import EmailReceiver
+from remarkable.service.dcm_email.mailbox_state import MailboxState
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def hget(self, key, field):
+        return self.data.get((key, field))
+
+    def hset(self, key, field, value):
+        self.data[(key, field)] = value
+
+
+def raw_mail(date, subject):
+    return f'From: a@example.com\nTo: b@example.com\nSubject: {subject}\nDate: {date}\n\nhello'.encode().split(b'\n')
+
+
+class FakePOP3:
+    def __init__(self, mails):
+        self.mails = mails
+        self.retrieved = []
+
+    def user(self, user):
+        pass
+
+    def pass_(self, password):
+        pass
+
+    def uidl(self):
+        return b'+OK', [f'{num} {uidl}'.encode() for num, (uidl, _) in self.mails.items()], 0
+
+    def top(self, num, lines):
+        return b'+OK', self.mails[num][1][:4], 0
+
+    def retr(self, num):
+        self.retrieved.append(num)
+        return b'+OK', self.mails[num][1], 0
+
+
+def test_pop3_watermark():
+    client = FakePOP3(
+        {
+            1: ('u1', raw_mail('Mon, 01 Jan 2024 10:00:00 +0000', 'old')),
+            2: ('u2', raw_mail('Tue, 02 Jan 2024 09:00:00 +0000', 'first')),
+            3: ('u3', raw_mail('Tue, 02 Jan 2024 10:00:00 +0000', 'second')),
+            4: ('u4', raw_mail('Wed, 03 Jan 2024 10:00:00 +0000', 'future')),
+        }
+    )
+    receiver = EmailReceiver.__new__(EmailReceiver)
+    receiver.host, receiver.client, receiver._context = 'pop.example.com', client, None
+    receiver.state = MailboxState('pop3', 'pop.example.com', 'user', rdb=FakeRedis())
+    receive_date = datetime.date(2024, 1, 2)
+
+    # 第二封处理失败, 已处理的第一封不再收取, 失败的下次重新收取
+    processed = []
+    with receiver.with_user('user', 'password'):
+        with pytest.raises(RuntimeError):
+            for mail in receiver.iter_available_emails(receive_date):
+                if mail.subject == 'second':
+                    raise RuntimeError('upload failed')
+                processed.append(mail.subject)
+    assert processed == ['first']
+
+    with receiver.with_user('user', 'password'):
+        assert [mail.subject for mail in receiver.iter_available_emails(receive_date)] == ['second']
+    with receiver.with_user('user', 'password'):
+        assert list(receiver.iter_available_emails(receive_date)) == []
+    # 只下载当天的邮件
+    assert client.retrieved == [2, 3, 3]
+    assert receiver.state.get() == {'uidls': ['u1', 'u2', 'u3']}
+
+
+class FakeIMAP:
+    def __init__(self, uids):
+        self.uids = uids
+        self.fetched = []
+
+    def select_folder(self, folder, readonly=False):
+        return {b'UIDVALIDITY': 7}
+
+    def search(self, criteria):
+        if isinstance(criteria, list):
+            start = int(criteria[1].split(':')[0])
+            # n:* 在没有新邮件时也会返回最后一封
+            return [uid for uid in self.uids if uid >= start] or self.uids[-1:]
+        return list(self.uids)
+
+    def fetch(self, uids, data):
+        self.fetched.extend(uids)
+        return {uid: {b'RFC822': b''} for uid in uids}
+
+
+class StubIMAPEmailReceiver(IMAPEmailReceiver):
+    async def build_email(self, email_id, raw):
+        return email_id
+
+
+@pytest.mark.gen_test
+async def test_imap_watermark():
+    receiver = StubIMAPEmailReceiver('imap.example.com', 'user', 'password')
+    receiver._client = FakeIMAP([3, 5, 8])
+    receiver.state = MailboxState('imap', 'imap.example.com', 'user', rdb=FakeRedis())
+
+    async def filter_processed(uids):
+        return {5}
+
+    # 已处理的 5 不下载; 处理 8 时失败, 水位停在 5
+    received = []
+    with pytest.raises(RuntimeError):
+        async for uid in receiver.email_iter(filter_processed=filter_processed):
+            if uid == 8:
+                raise RuntimeError('upload failed')
+            received.append(uid)
+    assert received == [3]
+    assert receiver._client.fetched == [3, 8]
+    assert receiver.state.get() == {'uidvalidity': 7, 'uid': 5}
+
+    receiver._client.uids.append(9)
+    assert [uid async for uid in receiver.email_iter()] == [8, 9]
+    assert receiver.state.get() == {'uidvalidity': 7, 'uid': 9}
+    assert [uid async for uid in receiver.email_iter()] == []
@@ -0,0 +1,62 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from remarkable.pw_models import embedding as embedding_module
+from remarkable.pw_models.embedding import Embedding, FileVectorIndex
+
+
+def test_file_vector_index_search():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8))
+    queries = rng.normal(size=(3, 8))
+    index = FileVectorIndex(list(range(100, 150)), list(vectors))
+
+    results = index.search(list(queries), limit=5)
+    scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ (
+        vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    ).T
+    for result, row in zip(results, scores):
+        assert [item['index'] - 100 for item in result] == list(np.argsort(-row)[:5])
+        assert np.isclose(result[0]['score'], row.max(), atol=1e-5)
+
+    assert FileVectorIndex([], []).search(list(queries)) == [[], [], []]
+
+
+@pytest.mark.gen_test
+async def test_semantic_search_many(monkeypatch):
+    rng = np.random.default_rng(0)
+    vectors = {f'q{i}': rng.normal(size=8) for i in range(3)}
+    rows = [{'index': i, 'embedding': rng.normal(size=8)} for i in range(20)]
+    threads = []
+
+    def fake_query_embeddings(texts):
+        threads.append(threading.current_thread())
+        return [vectors[text] for text in texts]
+
+    async def fake_execute(query):
+        if query == 'vectors':
+            return rows
+        return [{'index': 1, 'score': 0.1, 'query': 1}, {'index': 2, 'score': 0.9, 'query': 1}, {'index': 3, 'score': 0.5, 'query': 0}]
+
+    monkeypatch.setattr(embedding_module, 'query_embeddings', fake_query_embeddings)
+    monkeypatch.setattr(embedding_module, 'pw_db', SimpleNamespace(execute=fake_execute))
+    monkeypatch.setattr(Embedding, 'file_vectors_query', classmethod(lambda cls, fid, max_size: 'vectors'))
+    monkeypatch.setattr(
+        Embedding, 'semantic_search_many_query', classmethod(lambda cls, fid, texts, limit, query_vectors: 'union')
+    )
+    texts = ['q0', 'q1', 'q2']
+
+    # 文件块数不超过 in_memory_limit 时在进程内检索
+    expected = FileVectorIndex.from_rows(rows).search([vectors[text] for text in texts], limit=5)
+    assert await Embedding.semantic_search_many(1, texts, limit=5, in_memory_limit=20) == expected
+    # 超过时走数据库, 按查询分组并按相似度降序
+    assert await Embedding.semantic_search_many(1, texts[:2], in_memory_limit=10) == [
+        [{'index': 3, 'score': 0.5}],
+        [{'index': 2, 'score': 0.9}, {'index': 1, 'score': 0.1}],
+    ]
+    # 查询向量在线程中计算, 不阻塞事件循环
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
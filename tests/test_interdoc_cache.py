@@ -0,0 +1,27 @@
+from remarkable.config import project_root
+from remarkable.pdfinsight.interdoc_cache import InterdocCache
+from remarkable.pdfinsight.reader import _pretreat_doc
+
+sample_path = f"{project_root}/data/tests/interdoc/octopus_1532_interdoc.zip"
+
+
+def test_interdoc_cache(tmp_path):
+    cache = InterdocCache(str(tmp_path), 1024 * 1024 * 1024)
+    data = cache.get(sample_path, _pretreat_doc)
+    assert cache.stats.misses == 1
+
+    cached = cache.get(sample_path, _pretreat_doc)
+    assert cache.stats.hits == 1
+    assert cached == data
+    # 每次读取得到独立的数据, 修改不影响缓存
+    cached["paragraphs"].clear()
+    assert cache.get(sample_path, _pretreat_doc)["paragraphs"]
+
+
+def test_interdoc_cache_evict(tmp_path):
+    cache = InterdocCache(str(tmp_path), 1)
+    cache.get(sample_path, _pretreat_doc)
+    cache.get(sample_path, _pretreat_doc)
+    # 超过上限的数据不会写入缓存
+    assert cache.stats.hits == 0
+    assert cache.stats.misses == 2
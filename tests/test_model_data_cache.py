@@ -0,0 +1,28 @@
+import pickle
+from collections import Counter
+from types import SimpleNamespace
+
+from remarkable.predictor.model_data_cache import model_data_cache
+from remarkable.predictor.predictor import SchemaPredictor
+
+
+def test_model_data_not_shared_between_documents(tmp_path):
+    path = tmp_path / 'model_data.pkl'
+    origin = {'syllabus_elt_v2': {'syllabus': {'基金名称': Counter({'基金概况': 3})}}}
+    with open(path, 'wb') as model_fp:
+        pickle.dump(origin, model_fp)
+    key = ('test', 'checksum', None)
+
+    for _ in range(2):
+        # 每份文档新建预测器, 模型加载时像 main_business / syllabus_based 那样注入特征
+        predictor = SimpleNamespace(
+            model_data=None, config={'path': ['基金名称']}, prophet=SimpleNamespace(model_data_key=key), model_data_path=path
+        )
+        SchemaPredictor.load_model_data(predictor)
+        counter = predictor.model_data['syllabus_elt_v2']['syllabus']['基金名称']
+        assert counter == Counter({'基金概况': 3})
+        counter.update({'基金概况': 4, '释义': 4})
+
+    assert model_data_cache.get(key, path) == origin
+    assert model_data_cache.hits >= 1
+    model_data_cache.invalidate(key)
@@ -0,0 +1,19 @@
+import pytest
+
+from remarkable.common.constants import Language
+from remarkable.common.util import clean_txt, index_in_space_string
+from remarkable.pdfinsight.normalized_text import NormalizedText
+
+TEXTS = ['', '  ', '本基金 的\n投资\t比例', ' Fund  name:\nABC 　 Ltd. ', 'a\nb c\t\td ']
+
+
+@pytest.mark.parametrize('language', [Language.ZH_CN.value, Language.EN_US.value])
+@pytest.mark.parametrize('raw', TEXTS)
+def test_normalized_text(raw, language):
+    normalized = NormalizedText(raw, language)
+    assert normalized.text == clean_txt(raw, language=language)
+    assert len(normalized.offsets) == len(normalized.text)
+    is_cn = language == Language.ZH_CN.value
+    for start in range(len(normalized.text)):
+        for end in range(start + 1, len(normalized.text) + 1):
+            assert normalized.span(start, end) == index_in_space_string(raw, (start, end), is_cn=is_cn)
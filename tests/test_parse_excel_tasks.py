@@ -0,0 +1,53 @@
+import openpyxl
+from openpyxl.styles import PatternFill
+
+from remarkable.worker.tasks import parse_excel_tasks
+from remarkable.worker.tasks.parse_excel_tasks import parse_xlsx
+
+
+def old_parse_xlsx(path):
+    """改为只读模式逐行读取前的完整模式实现"""
+    workbook = openpyxl.load_workbook(path)
+    sheets_info = {}
+    for sheet_idx, sheet in enumerate(workbook.worksheets):
+        data = []
+        merged_cells = sheet.merged_cells.ranges
+        for idx, row in enumerate(sheet.iter_rows()):
+            row_dict = {}
+            tb_merge = []
+            for cell in row:
+                if any(
+                    rng.min_row <= cell.row <= rng.max_row and rng.min_col <= cell.column <= rng.max_col
+                    for rng in merged_cells
+                ):
+                    tb_merge.append(f"{cell.row - 1}_{cell.column - 1}")
+                row_dict[f"col{cell.column - 1}"] = str(cell.value)
+            row_dict.update({"l_table_line": idx, "tb_merge": ",".join(tb_merge), "vc_sheet_name": sheet.title})
+            data.append(row_dict)
+        sheets_info[sheet_idx] = data
+    return sheets_info
+
+
+def test_parse_xlsx_parity(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_excel_tasks, "get_config", lambda key, *args: str(tmp_path))
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in range(1, 9):
+        for col in range(1, 4):
+            if (row + col) % 3:
+                sheet.cell(row, col, f"{row}-{col}")
+    sheet.merge_cells("A1:B2")
+    # 尾部只有行高没有单元格的行, 以及只有样式的空单元格
+    sheet.row_dimensions[10].height = 30
+    sheet.row_dimensions[12].height = 30
+    sheet.cell(11, 5).fill = PatternFill("solid", fgColor="FF0000")
+    formatted = workbook.create_sheet("formatted")
+    formatted.append(["a", None, "c"])
+    formatted.row_dimensions[10].height = 30
+    workbook.create_sheet("empty")
+    path = tmp_path / "test.xlsx"
+    workbook.save(path)
+
+    expected = [(sheet_idx, row) for sheet_idx, rows in old_parse_xlsx(path).items() for row in rows]
+    assert [len(rows) for rows in old_parse_xlsx(path).values()] == [11, 1, 0]
+    assert list(parse_xlsx(path)) == expected
@@ -21,3 +21,24 @@ def test_is_cross_page_para():
     assert len(features) == 1
     assert len(features[0]) == 3
     assert features[0][1].text == '基金财产参与股票发行申购，本基金所申报的金额不超过本基金的总资产'
+
+
+def test_vmsp_feature_compiled_once():
+    from remarkable.predictor.models.partial_text import VMSPAnswer, VMSPFeature
+    from remarkable.service.predictor import is_subsequence
+
+    feature = VMSPFeature(
+        {
+            'boundary': ['为', '。'],
+            'answer_patterns': [['NUMBER', '%']],
+            'left_patterns': [['比例'], ['：'], ['为']],
+            'right_patterns': [],
+        }
+    )
+    assert [p.words for p in feature.left_patterns] == [('比例',)]
+
+    answer = VMSPAnswer('投资比例为', '80%', '。')
+    assert answer.left_pattern is answer.left_pattern
+    assert any(answer.left_pattern.match_vmsp_pattern(p, direction='left') for p in feature.left_patterns)
+    assert is_subsequence(('a', 'b', 'c'), ('a', 'c'))
+    assert not is_subsequence(('a', 'b', 'c'), ('c', 'a'))
@@ -1,6 +1,7 @@
 import re
 
-from remarkable.common.pattern import PatternCollection
+from remarkable.common import pattern as pattern_module
+from remarkable.common.pattern import PatternCollection, required_literals
 
 
 class TestPatternCollection:
@@ -28,3 +29,34 @@ class TestPatternCollection:
     def test_sub(self):
         text = 'hello world'
         assert PatternCollection(['h', 'w', 'o', ' ']).sub('1', text) == '1ell1111rld'
+
+    def test_required_literals(self):
+        assert required_literals(re.compile(r'单位[:：](?P<dst>\w+)')) == ('单位',)
+        assert set(required_literals(re.compile(r'(?:万元|亿元)'))) == {'万元', '亿元'}
+        assert required_literals(re.compile(r'a?b*')) is None
+        assert required_literals(re.compile(r'unit', re.I)) is None
+
+    def test_combine(self):
+        patterns = [r'(?P<dst>\d+)元', r'单位[:：](?P<dst>\w+)', re.compile('HELLO', re.I), r'^\d']
+        texts = ['单位：万元', '10元', 'hello', '', '无匹配']
+        plain, combined = PatternCollection(patterns), PatternCollection(patterns, combine=True)
+        for text in texts:
+            for method in ('search', 'match', 'finditer'):
+                expected = [(m.re, m.span()) for m in getattr(plain, method)(text)]
+                assert expected == [(m.re, m.span()) for m in getattr(combined, method)(text)]
+        for collection in (plain, combined):
+            assert [m and m.group() for m in collection.nexts_batch(texts)] == ['单位：万元', '10元', 'hello', None, None]
+        elements = [{'index': idx, 'text': text} for idx, text in enumerate(texts)]
+        assert list(combined.scan_elements(elements)) == [0, 1, 2]
+        # 整批文本都不含字面量时直接排除对应正则
+        assert [m and m.group() for m in combined.nexts_batch(['10元', '无匹配'])] == ['10元', None]
+
+    def test_required_literals_parser_error(self, monkeypatch):
+        def broken_parse(*args, **kwargs):
+            raise AttributeError('parser changed')
+
+        compiled = re.compile(r'单位[:：](?P<dst>\w+)')
+        monkeypatch.setattr(pattern_module._parser, 'parse', broken_parse)
+        assert required_literals(compiled) is None
+        combined = PatternCollection([compiled], combine=True)
+        assert combined.nexts('单位：万元').group('dst') == '万元'
@@ -5,6 +5,7 @@ from pdfparser.pdftools.pdf_util import PDFUtil
 
 from remarkable.common.storage import localstorage
 from remarkable.models.new_file import NewFile
+from remarkable.plugins.fileapi.char_index import PARAGRAPH, TABLE, CharIndex, CharIndexBuilder
 from remarkable.plugins.fileapi.worker import (
     PDFCache,
     optimize_outline,
@@ -46,3 +47,25 @@ def test_pdf_cache(file_cache):
 
                     text, chars = file_cache.get_text_in_box(box, get_text)
                     assert text == keyword
+
+
+def test_char_index(tmp_path):
+    builder = CharIndexBuilder()
+    builder.add("甲", [0, 0, 10, 10], 1, 1, 1, PARAGRAPH)
+    builder.add("乙", [10, 0, 20, 10], 1, 1, 1, PARAGRAPH)
+    builder.add("\n", [10, 0, 20, 10], 1, 1, 1, PARAGRAPH)
+    builder.add("丙", [0, 0, 10, 10], 0, 0, 0, TABLE)
+    builder.add_separator("#_#", 0, 0)
+
+    path = tmp_path / "char_index"
+    offsets = builder.dump(path)
+    assert offsets == {"count": 8, "pages": {"0": [0, 4], "1": [4, 7]}}
+
+    char_index = CharIndex(path, offsets)
+    assert char_index.search_string() == "丙#_#甲乙\n"
+    chars = char_index.chars(char_index.rows_in_box(1, [0, 0, 15, 10]))
+    assert "".join(char["text"] for char in chars) == "甲乙\n"
+    assert chars[0] == {"page": 1, "text": "甲", "box": [0, 0, 10, 10], "index": 1, "index_type": "PARAGRAPH"}
+    # 分隔符不参与框选
+    assert [char["text"] for char in char_index.chars(char_index.rows_in_box(0, [-1, -1, 100, 100]))] == ["丙"]
+    assert not char_index.page_range(2)
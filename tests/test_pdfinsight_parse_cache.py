@@ -0,0 +1,32 @@
+import pytest
+
+from remarkable.common.constants import TableType
+from remarkable.common.pattern import PatternCollection
+from remarkable.config import project_root
+from remarkable.pdfinsight.parser import parse_table
+from remarkable.pdfinsight.reader import PdfinsightReader
+
+sample_path = f"{project_root}/data/tests/interdoc/octopus_1532_interdoc.zip"
+
+
+def test_parsed_table_cache():
+    reader = PdfinsightReader(sample_path)
+    element = next(reader.elements_iter(lambda e: e["class"] == "TABLE"))
+
+    table = parse_table(element, tabletype=TableType.ROW.value, pdfinsight_reader=reader)
+    assert parse_table(element, tabletype=TableType.ROW.value, pdfinsight_reader=reader) is table
+    assert (reader.parse_cache.hits, reader.parse_cache.misses) == (1, 1)
+    with pytest.raises(AttributeError):
+        table.title = None
+
+    # 参数不同或不是文档中的原始元素块时分别解析
+    assert parse_table(element, tabletype=TableType.KV.value, pdfinsight_reader=reader) is not table
+    titled = parse_table(
+        element,
+        tabletype=TableType.ROW.value,
+        pdfinsight_reader=reader,
+        special_title_patterns=PatternCollection([r"表"]),
+    )
+    assert titled is not table
+    assert parse_table({**element}, tabletype=TableType.ROW.value, pdfinsight_reader=reader) is not table
+    assert (reader.parse_cache.hits, reader.parse_cache.misses) == (1, 3)
@@ -0,0 +1,11 @@
+from remarkable.pdfinsight.spatial_index import first_max, overlap_ratios, to_boxes
+
+
+def test_overlap_ratios():
+    boxes = to_boxes([[0, 0, 10, 10], [5, 5, 5, 15], None, [0, 0, 20, 20]])
+    ratios = overlap_ratios([0, 0, 10, 10], boxes)
+    assert ratios.tolist() == [1, 0, 0, 0.25]
+    assert overlap_ratios([0, 0, 10, 10], boxes, base="min").tolist() == [1, 0, 0, 1]
+    assert first_max(ratios) == 0
+    assert first_max(overlap_ratios([100, 100, 110, 110], boxes)) is None
+
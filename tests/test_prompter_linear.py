@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from scipy.sparse import random as sparse_random
+
+from remarkable.prompter.linear import FusedLinearScorer
+
+
+def test_fused_linear_scorer():
+    rng = np.random.default_rng(42)
+    data = sparse_random(50, 30, density=0.1, format="csr", random_state=42)
+    coefficients = [rng.normal(size=30).astype(np.float32) for _ in range(3)]
+    intercepts = [0.5, -1.0, 0.0]
+    scorer = FusedLinearScorer(["a", "b", "c"], coefficients, intercepts)
+
+    scores = scorer.scores(data)
+    assert scores.shape == (50, 3)
+    for idx, (coef, intercept) in enumerate(zip(coefficients, intercepts)):
+        expected = 1 / (1 + np.exp(-(data.toarray() @ coef + intercept)))
+        assert np.allclose(scores[:, idx], expected, atol=1e-6)
+
+    with pytest.raises(ValueError):
+        scorer.scores(data[:, :10])
+
+
+def test_fused_linear_scorer_sklearn_parity():
+    linear_model = pytest.importorskip("sklearn.linear_model")
+    from remarkable.prompter.linear import weights_from_sklearn
+
+    data = sparse_random(80, 20, density=0.2, format="csr", random_state=1)
+    labels = (data.toarray().sum(axis=1) > np.median(data.toarray().sum(axis=1))).astype(int)
+    model = linear_model.LogisticRegression(random_state=42, class_weight="balanced").fit(data, labels)
+
+    coef, intercept = weights_from_sklearn(model)
+    scorer = FusedLinearScorer(["rule"], [coef], [intercept])
+    assert np.allclose(scorer.scores(data)[:, 0], model.predict_proba(data)[:, 1], atol=1e-5)
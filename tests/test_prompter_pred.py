@@ -0,0 +1,49 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from remarkable.prompter import utils
+
+
+def test_iter_pred_per_document(tmp_path, monkeypatch):
+    elements_dir = tmp_path / "1" / "0" / "elements"
+    elements_dir.mkdir(parents=True)
+    for doc_id, count in ((3, 2), (5, 3), (9, 1)):
+        data = {str(idx): {"page": 0, "outline": [0, 0, 1, 1], "text": f"{doc_id}-{idx}", "class": "PARAGRAPH"} for idx in range(count)}
+        (elements_dir / f"{doc_id}.json").write_text(json.dumps(data))
+    (elements_dir / "7.json").write_text("{}")
+    monkeypatch.setattr(utils, "get_config", lambda key, *args: str(tmp_path) if key == "training_cache_dir" else None)
+
+    model = SimpleNamespace(rules=["a"], predict_all=lambda data: np.asarray(data.toarray()[:, :1], dtype=float))
+    monkeypatch.setattr(utils.prompter_models, "get", lambda schema_id, vid: model)
+    extracted = []
+
+    def fake_load(schema_id, vid, model, direct=True, dict_data=None, **kwargs):
+        (doc_id, data), = dict_data.items()
+        extracted.append(doc_id)
+        rows = sorted(data.items(), key=lambda x: int(x[0]))
+        return {
+            "ids": [int(idx) for idx, _ in rows],
+            "texts": [item["text"] for _, item in rows],
+            "pages": [item["page"] + 1 for _, item in rows],
+            "outlines": [item["outline"] for _, item in rows],
+            "classes": [item["class"] for _, item in rows],
+            "pred_length": [len(rows)],
+            "pred_index": [doc_id],
+            "pred_data": csr_matrix(np.arange(len(rows), dtype=float).reshape(-1, 1)),
+        }
+
+    monkeypatch.setattr(utils, "_load_pred_elements", fake_load)
+
+    results = utils.iter_pred(1, 0, pred_start=4, pred_end=10)
+    # 惰性求值: 取出第一个文档的结果时只抽取了这一个文档的特征
+    doc_id, answers = next(results)
+    assert extracted == [doc_id]
+    expected = {5: [2, 1, 0], 9: [0]}
+    assert [item["element_index"] for item in answers["a"]] == expected[doc_id]
+    for doc_id, answers in results:
+        assert [item["element_index"] for item in answers["a"]] == expected[doc_id]
+    # 空文档和范围外的文档被跳过
+    assert sorted(extracted) == [5, 9]
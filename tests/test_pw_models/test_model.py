@@ -1,6 +1,6 @@
 import pytest
 
-from remarkable.pw_models.model import NewFileTree
+from remarkable.pw_models.model import FileTreeClosure, NewFileTree
 from remarkable.db import pw_db
 from remarkable.common.enums import TaskType
 
@@ -173,3 +173,43 @@ class TestNewFileTree:
         """测试当树节点不存在时返回 None"""
         result = await NewFileTree.find_default(-1)
         assert result is None
+
+
+class TestFileTreeClosure:
+    """file_tree 上的触发器维护闭包表"""
+
+    @staticmethod
+    async def ancestors(tree_id):
+        query = (
+            FileTreeClosure.select(FileTreeClosure.ancestor_id, FileTreeClosure.depth)
+            .where(FileTreeClosure.descendant_id == tree_id)
+            .order_by(FileTreeClosure.depth)
+            .tuples()
+        )
+        return list(await pw_db.execute(query))
+
+    @pytest.mark.gen_test
+    async def test_insert_move_delete(self):
+        async with pw_db.transaction() as txn:
+            root_a = await pw_db.create(NewFileTree, name="closure_root_a", pid=0, ptree_id=0, default_molds=[])
+            root_b = await pw_db.create(NewFileTree, name="closure_root_b", pid=0, ptree_id=0, default_molds=[])
+            child = await pw_db.create(NewFileTree, name="closure_child", pid=0, ptree_id=root_a.id, default_molds=[])
+            leaf = await pw_db.create(NewFileTree, name="closure_leaf", pid=0, ptree_id=child.id, default_molds=[])
+
+            # 新建
+            assert await self.ancestors(leaf.id) == [(leaf.id, 0), (child.id, 1), (root_a.id, 2)]
+            assert sorted(await pw_db.scalars(FileTreeClosure.descendants([root_a.id], min_depth=1))) == sorted(
+                [child.id, leaf.id]
+            )
+
+            # 移动: 整棵子树挂到新的上级下
+            await pw_db.execute(NewFileTree.update(ptree_id=root_b.id).where(NewFileTree.id == child.id))
+            assert await self.ancestors(child.id) == [(child.id, 0), (root_b.id, 1)]
+            assert await self.ancestors(leaf.id) == [(leaf.id, 0), (child.id, 1), (root_b.id, 2)]
+            assert list(await pw_db.scalars(FileTreeClosure.descendants([root_a.id], min_depth=1))) == []
+
+            # 物理删除
+            await pw_db.execute(NewFileTree.delete().where(NewFileTree.id == leaf.id))
+            assert await self.ancestors(leaf.id) == []
+            assert list(await pw_db.scalars(FileTreeClosure.descendants([child.id], min_depth=1))) == []
+            await txn.rollback()
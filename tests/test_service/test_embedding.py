@@ -0,0 +1,101 @@
+import pytest
+
+from remarkable.service.embedding import TOKEN_ENCODER, Tokenizer
+
+TEXTS = [
+    "",
+    "hello world",
+    "募集资金用途：本次发行募集资金扣除发行费用后，将全部用于补充流动资金。",
+    "基金管理人 Fund Manager 于2024年1月2日公告，管理费率为1.50%/年。",
+    "表情👍🏻和生僻字𠮷野家混排😀😀😀，测试多字节字符在 token 中间被截断",
+    "unbelievably internationalization\n\n  indentation\t制表符",
+    "１２３４５６７８９０，全角数字与　全角空格",
+]
+
+
+def old_binary_token_trim(text, n, token_func):
+    """改为按 token 截断前的二分查找实现"""
+    if n < 0:
+        return ""
+    num_token = token_func(text)
+    if num_token == 0 or num_token <= n:
+        return text
+    lb, ub = 0, len(text) - 1
+    while lb + 1 < ub:
+        mid = (lb + ub) // 2
+        if token_func(text[:mid]) > n:
+            ub = mid
+        else:
+            lb = mid
+    return text[:lb]
+
+
+def old_split_by_length(tokenizer, texts, max_token_length):
+    """改为批量编码前的逐个累加实现"""
+    token_lens = []
+    for text in texts:
+        token_len = tokenizer.token_length(text)
+        if sum(token_lens) + token_len >= max_token_length:
+            yield texts[: len(token_lens)]
+            texts = texts[len(token_lens) :]
+            token_lens = [token_len]
+        else:
+            token_lens.append(token_len)
+    if texts:
+        yield texts
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_trim_parity(text):
+    total = TOKEN_ENCODER.token_length(text)
+    for n in range(-1, total + 2):
+        trimmed = TOKEN_ENCODER.trim(text, n)
+        old = old_binary_token_trim(text, n, TOKEN_ENCODER.token_length)
+        assert text.startswith(trimmed)
+        if n >= total:
+            assert trimmed == old == text
+            continue
+        # 只在 token 边界截断, 被切开的多字节字符整体丢弃; 二分查找可以截到 token 中间, 最多多出一个 token
+        assert TOKEN_ENCODER.token_length(old) - 1 <= TOKEN_ENCODER.token_length(trimmed) <= max(n, 0)
+
+
+def test_trim_many():
+    for n in (0, 1, 5, 20):
+        assert TOKEN_ENCODER.trim_many(TEXTS, n) == [TOKEN_ENCODER.trim(text, n) for text in TEXTS]
+
+
+class TailEncoder:
+    """以 a 结尾时最后一个 a 多占一个 token, 模拟截断后的前缀重新编码 token 数变多"""
+
+    def encode(self, text):
+        return list(text) + (["~"] if text.endswith("a") else [])
+
+    def decode(self, tokens):
+        return "".join(token for token in tokens if token != "~")
+
+
+def test_trim_step_back():
+    tokenizer = Tokenizer()
+    tokenizer.encoder = TailEncoder()
+    token_length = tokenizer.token_length
+    for text, n, expected in [("xxaa y", 4, "xxa"), ("xxaa y", 3, "xx"), ("aaaa", 2, "a"), ("aaaa", 1, "")]:
+        assert tokenizer.trim(text, n) == expected == old_binary_token_trim(text, n, token_length)
+
+
+def test_split_by_length_parity():
+    texts = TEXTS * 3
+    lengths = TOKEN_ENCODER.token_lengths(texts)
+    assert lengths == [TOKEN_ENCODER.token_length(text) for text in texts]
+    for max_length in (1, 10, 30, 50, 100, sum(lengths) + 1):
+        groups = list(TOKEN_ENCODER.split_by_length(texts, max_length))
+        old_groups = list(old_split_by_length(TOKEN_ENCODER, texts, max_length))
+        # 旧实现在第一个文本就超长时会先产出一个空分组
+        assert groups == [group for group in old_groups if group]
+        assert sum(groups, []) == texts
+
+
+def test_split_by_length_oversized_first():
+    long_text = TEXTS[2] * 10
+    max_length = TOKEN_ENCODER.token_length(long_text)
+    assert list(TOKEN_ENCODER.split_by_length([long_text, "hello"], max_length)) == [[long_text], ["hello"]]
+    assert list(old_split_by_length(TOKEN_ENCODER, [long_text, "hello"], max_length)) == [[], [long_text], ["hello"]]
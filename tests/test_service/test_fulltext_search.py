@@ -0,0 +1,17 @@
+from remarkable.service.fulltext_search import count_grams, normalize_keyword, query_grams
+
+
+def test_count_grams():
+    counter = count_grams("募集资金#_#用途\n募集 资金\n")
+    assert counter["募集"] == 2
+    assert counter["资金"] == 2
+    assert counter["资"] == 2
+    # 单元格分隔符、换行和空格两侧的字符不组成 bigram
+    assert "金用" not in counter
+    assert "集资" in counter and counter["集资"] == 1
+    assert "#_" not in counter
+
+
+def test_query_grams():
+    assert query_grams(normalize_keyword("募集 资金")) == {"募集", "集资", "资金"}
+    assert query_grams("募") == {"募"}
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+
+from remarkable.service import llm_dispatcher as dispatcher_module
+from remarkable.service.llm_dispatcher import LLMDispatcher
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+class StubClient:
+    def __init__(self):
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self.replies = {}
+
+    async def send_message(self, messages, options=None, response_format_type="text"):
+        content = messages[-1]["content"]
+        self.calls.append(content)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return self.replies.get(content, json.dumps({"answer": content}))
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    client, rdb = StubClient(), FakeRedis()
+    monkeypatch.setattr(dispatcher_module, "AsyncOpenAIClient", lambda: client)
+    monkeypatch.setattr(dispatcher_module, "init_rdb", lambda: rdb)
+    return client, rdb
+
+
+def request(content, **kwargs):
+    return {"messages": [{"role": "user", "content": content}], **kwargs}
+
+
+@pytest.mark.gen_test
+async def test_concurrency_and_coalesce(stub):
+    client, _ = stub
+    dispatcher = LLMDispatcher(concurrency=2, cache_expire=0)
+    results = await dispatcher.gather([request(str(i % 5)) for i in range(10)])
+
+    assert results == [json.dumps({"answer": str(i % 5)}) for i in range(10)]
+    # 相同的请求只发一次, 同时进行的请求不超过并发上限
+    assert sorted(client.calls) == ["0", "1", "2", "3", "4"]
+    assert dispatcher.coalesced == 5
+    assert client.max_running == 2
+
+
+@pytest.mark.gen_test
+async def test_cache_only_valid_response(stub):
+    client, rdb = stub
+    dispatcher = LLMDispatcher(concurrency=2, cache_expire=60)
+    client.replies["bad"] = "not json"
+
+    assert await dispatcher.send(**request("good", validate=json.loads)) == json.dumps({"answer": "good"})
+    assert await dispatcher.send(**request("good", validate=json.loads)) == json.dumps({"answer": "good"})
+    assert client.calls == ["good"]
+    assert dispatcher.hits == 1
+
+    # 校验失败的响应原样返回但不缓存, 下次重新请求
+    assert await dispatcher.send(**request("bad", validate=json.loads)) == "not json"
+    assert await dispatcher.send(**request("bad", validate=json.loads)) == "not json"
+    assert client.calls == ["good", "bad", "bad"]
+    assert len(rdb.data) == 1
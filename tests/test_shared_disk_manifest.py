@@ -0,0 +1,66 @@
+import os
+
+from remarkable.service.cmfchina.shared_disk_manifest import SharedDiskManifest
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def hgetall(self, key):
+        return {k: str(v) for k, v in self.data.get(key, {}).items()}
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+
+def sync(root, rdb, full=False):
+    manifest = SharedDiskManifest(root, rdb=rdb)
+    changed = []
+    for path, rel, stat in manifest.scan(full=full):
+        changed.append(rel)
+        manifest.record_file(rel, stat, path.read_text())
+    return changed, manifest
+
+
+def test_shared_disk_manifest(tmp_path):
+    rdb = FakeRedis()
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a' / 'b').mkdir()
+    (tmp_path / 'x.pdf').write_text('x')
+    (tmp_path / 'a' / 'y.pdf').write_text('y')
+    (tmp_path / 'a' / 'b' / 'z.pdf').write_text('z')
+    (tmp_path / '.hidden').write_text('h')
+
+    changed, _ = sync(tmp_path, rdb)
+    assert sorted(changed) == ['a/b/z.pdf', 'a/y.pdf', 'x.pdf']
+    assert sync(tmp_path, rdb)[0] == []
+
+    # 新增文件只改变所在目录的 mtime
+    (tmp_path / 'a' / 'b' / 'w.pdf').write_text('w')
+    assert sync(tmp_path, rdb)[0] == ['a/b/w.pdf']
+
+    # 原地改写不改变目录 mtime, 增量同步时通过已知文件的 stat 发现
+    root_mtime = tmp_path.stat().st_mtime_ns
+    target = tmp_path / 'x.pdf'
+    target.write_text('xx')
+    os.utime(target, ns=(target.stat().st_atime_ns, target.stat().st_mtime_ns + 10**9))
+    assert tmp_path.stat().st_mtime_ns == root_mtime
+    assert sync(tmp_path, rdb)[0] == ['x.pdf']
+    assert sync(tmp_path, rdb)[0] == []
+    # 全量比对返回所有文件
+    assert sorted(sync(tmp_path, rdb, full=True)[0]) == ['a/b/w.pdf', 'a/b/z.pdf', 'a/y.pdf', 'x.pdf']
+
+    (tmp_path / 'a' / 'y.pdf').unlink()
+    (tmp_path / 'a' / 'b' / 'z.pdf').unlink()
+    (tmp_path / 'a' / 'b' / 'w.pdf').unlink()
+    (tmp_path / 'a' / 'b').rmdir()
+    changed, manifest = sync(tmp_path, rdb)
+    assert changed == []
+    assert sorted(manifest.files) == ['x.pdf']
+    assert sorted(manifest.dirs) == ['', 'a']
+    assert manifest.file_hash('x.pdf') == 'xx'